@@ -0,0 +1,309 @@
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tarfile
+import tempfile
+import time
+from modules import dados
+
+try:
+    import zstandard
+except ImportError:  # opcional: sem ele o backup sai em .tar.gz
+    zstandard = None
+
+# Backup completo da pasta dados/ (banco, JSONs e fotos) em um único arquivo
+# compactado, escrito em fluxo: a memória usada não depende do tamanho dos dados.
+
+PASTA_BACKUPS = os.path.join(dados.BASE_DIR, "backups")
+NOME_MANIFESTO = "MANIFESTO.json"
+NOME_BANCO = os.path.basename(dados.ARQUIVO_BANCO)
+TAMANHO_BLOCO = 1024 * 1024
+VERSAO_FORMATO = 1
+
+# Arquivos de trabalho do SQLite e temporários que não entram no backup
+_IGNORAR_SUFIXOS = ("-wal", "-shm", "-journal")
+_PREFIXO_TEMP = ".tmp_"
+
+
+class BackupInvalido(Exception):
+    """Arquivo de backup corrompido, incompleto ou que não confere com o manifesto"""
+
+
+# --- COMPACTAÇÃO ---
+def extensao_padrao():
+    return ".tar.zst" if zstandard is not None else ".tar.gz"
+
+
+def _abrir_escrita(arquivo, caminho):
+    if caminho.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError("Backup .zst requer o pacote 'zstandard'")
+        return zstandard.ZstdCompressor(level=3).stream_writer(arquivo, closefd=False)
+    return gzip.GzipFile(fileobj=arquivo, mode="wb", compresslevel=6)
+
+
+def _abrir_leitura(arquivo, caminho):
+    if caminho.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError("Backup .zst requer o pacote 'zstandard'")
+        return zstandard.ZstdDecompressor().stream_reader(arquivo, closefd=False)
+    return gzip.GzipFile(fileobj=arquivo, mode="rb")
+
+
+class _LeitorComHash(io.RawIOBase):
+    """Repassa a leitura de um arquivo calculando o SHA-256 no caminho"""
+
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+        self.hash = hashlib.sha256()
+
+    def readable(self):
+        return True
+
+    def readinto(self, destino):
+        bloco = self.arquivo.read(len(destino))
+        destino[:len(bloco)] = bloco
+        self.hash.update(bloco)
+        return len(bloco)
+
+
+# --- FOTO DOS DADOS (consistente) ---
+def _copiar_banco(destino):
+    """Cópia consistente do banco pela API de backup do SQLite (inclui o que está no WAL)"""
+    origem = sqlite3.connect(dados.ARQUIVO_BANCO, timeout=30)
+    copia = sqlite3.connect(destino)
+    try:
+        origem.backup(copia)
+    finally:
+        copia.close()
+        origem.close()
+
+
+def _ligar_ou_copiar(caminho, alvo):
+    """Hard link de `caminho` em `alvo` (cópia se o disco não suportar)"""
+    os.makedirs(os.path.dirname(alvo), exist_ok=True)
+    try:
+        os.link(caminho, alvo)
+    except OSError:
+        shutil.copy2(caminho, alvo)
+
+
+def _arquivos_dados(pasta):
+    """Caminhos relativos (com '/') de tudo em `pasta` que entra no backup"""
+    for raiz, subpastas, arquivos in os.walk(pasta):
+        subpastas[:] = sorted(d for d in subpastas if not d.startswith("."))
+        for nome in sorted(arquivos):
+            if nome.startswith(_PREFIXO_TEMP) or nome.endswith(_IGNORAR_SUFIXOS):
+                continue
+            relativo = os.path.relpath(os.path.join(raiz, nome), pasta)
+            yield relativo.replace(os.sep, "/")
+
+
+def _congelar_dados(destino):
+    """Copia um estado consistente de dados/ para `destino` (mesmo disco).
+
+    Com a trava de escrita presa: o banco é copiado pela API de backup do
+    SQLite e os demais arquivos viram hard links (instantâneo, sem copiar
+    bytes). Depois disso o backup segue sem segurar ninguém.
+    """
+    with dados._trava_escrita:
+        _copiar_banco(os.path.join(destino, NOME_BANCO))
+        for relativo in _arquivos_dados(dados.PASTA_DADOS):
+            if relativo == NOME_BANCO:
+                continue
+            _ligar_ou_copiar(os.path.join(dados.PASTA_DADOS, *relativo.split("/")),
+                             os.path.join(destino, *relativo.split("/")))
+
+
+# --- CRIAÇÃO ---
+def _adicionar(tar, nome, arquivo, tamanho, mtime):
+    info = tarfile.TarInfo(nome)
+    info.size = tamanho
+    info.mtime = int(mtime)
+    info.mode = 0o644
+    leitor = _LeitorComHash(arquivo)
+    tar.addfile(info, io.BufferedReader(leitor, TAMANHO_BLOCO))
+    return leitor.hash.hexdigest()
+
+
+def gerar_backup(saida, caminho_saida):
+    """Escreve o backup compactado no arquivo binário `saida` e devolve o manifesto.
+
+    A extensão de `caminho_saida` escolhe a compactação (.zst ou gzip).
+    O manifesto (tamanho e SHA-256 de cada arquivo) vai como último item do tar.
+    """
+    dados.conectar()  # garante o banco criado/migrado antes da cópia
+    temporaria = tempfile.mkdtemp(prefix=".backup_", dir=dados.PASTA_DADOS)
+    try:
+        _congelar_dados(temporaria)
+        manifesto = {"versao": VERSAO_FORMATO, "criado_em": time.strftime("%Y-%m-%dT%H:%M:%S"), "arquivos": {}}
+        compactado = _abrir_escrita(saida, caminho_saida)
+        with compactado, tarfile.open(fileobj=compactado, mode="w|", bufsize=TAMANHO_BLOCO) as tar:
+            for relativo in _arquivos_dados(temporaria):
+                caminho = os.path.join(temporaria, *relativo.split("/"))
+                info = os.stat(caminho)
+                with open(caminho, "rb") as arquivo:
+                    sha = _adicionar(tar, relativo, arquivo, info.st_size, info.st_mtime)
+                manifesto["arquivos"][relativo] = {"tamanho": info.st_size, "sha256": sha}
+            conteudo = json.dumps(manifesto, indent=2, ensure_ascii=False).encode("utf-8")
+            _adicionar(tar, NOME_MANIFESTO, io.BytesIO(conteudo), len(conteudo), time.time())
+        return manifesto
+    finally:
+        shutil.rmtree(temporaria, ignore_errors=True)
+
+
+def criar_backup(caminho=None):
+    """Gera o backup em `caminho` (padrão: backups/otica_AAAAMMDD_HHMMSS.tar.gz).
+
+    Grava em arquivo temporário e só renomeia no fim: um backup pela metade
+    nunca fica com o nome final. Devolve (caminho, manifesto).
+    """
+    if caminho is None:
+        caminho = os.path.join(PASTA_BACKUPS, f"otica_{time.strftime('%Y%m%d_%H%M%S')}{extensao_padrao()}")
+    pasta = os.path.dirname(os.path.abspath(caminho))
+    os.makedirs(pasta, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(prefix=_PREFIXO_TEMP, dir=pasta)
+    try:
+        with os.fdopen(fd, "wb") as saida:
+            manifesto = gerar_backup(saida, caminho)
+            saida.flush()
+            os.fsync(saida.fileno())
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    return caminho, manifesto
+
+
+def listar_backups():
+    """Backups em PASTA_BACKUPS: lista de (caminho, tamanho em bytes, mtime), mais novo primeiro"""
+    if not os.path.isdir(PASTA_BACKUPS):
+        return []
+    encontrados = []
+    for nome in os.listdir(PASTA_BACKUPS):
+        if nome.endswith((".tar.gz", ".tar.zst")) and not nome.startswith(_PREFIXO_TEMP):
+            caminho = os.path.join(PASTA_BACKUPS, nome)
+            info = os.stat(caminho)
+            encontrados.append((caminho, info.st_size, info.st_mtime))
+    return sorted(encontrados, key=lambda b: b[2], reverse=True)
+
+
+# --- VERIFICAÇÃO E RESTAURAÇÃO ---
+def _nome_seguro(nome):
+    partes = nome.split("/")
+    return bool(nome) and not nome.startswith("/") and ".." not in partes and "" not in partes
+
+
+def _percorrer(caminho, pasta_destino=None):
+    """Lê o backup inteiro conferindo cada arquivo; extrai em `pasta_destino` se vier.
+
+    Devolve o manifesto; levanta BackupInvalido se algo não conferir.
+    """
+    calculados = {}
+    manifesto = None
+    try:
+        with open(caminho, "rb") as bruto, _abrir_leitura(bruto, caminho) as fluxo, \
+                tarfile.open(fileobj=fluxo, mode="r|", bufsize=TAMANHO_BLOCO) as tar:
+            for membro in tar:
+                if not membro.isfile() or not _nome_seguro(membro.name):
+                    raise BackupInvalido(f"Item inesperado no backup: {membro.name}")
+                if membro.name == NOME_MANIFESTO:
+                    manifesto = json.loads(tar.extractfile(membro).read())
+                    continue
+                leitor = _LeitorComHash(tar.extractfile(membro))
+                if pasta_destino is None:
+                    while leitor.read(TAMANHO_BLOCO):
+                        pass
+                else:
+                    alvo = os.path.join(pasta_destino, *membro.name.split("/"))
+                    os.makedirs(os.path.dirname(alvo), exist_ok=True)
+                    with open(alvo, "wb") as saida:
+                        shutil.copyfileobj(leitor, saida, TAMANHO_BLOCO)
+                calculados[membro.name] = {"tamanho": membro.size, "sha256": leitor.hash.hexdigest()}
+    except (OSError, EOFError, tarfile.TarError, ValueError) as erro:
+        raise BackupInvalido(f"Não foi possível ler o backup: {erro}") from erro
+
+    if manifesto is None:
+        raise BackupInvalido("Backup sem manifesto (incompleto?)")
+    esperados = manifesto.get("arquivos", {})
+    diferentes = sorted(n for n in set(calculados) | set(esperados) if calculados.get(n) != esperados.get(n))
+    if diferentes:
+        raise BackupInvalido(f"Arquivos não conferem com o manifesto: {', '.join(diferentes[:10])}")
+    if NOME_BANCO not in calculados:
+        raise BackupInvalido("Backup sem o banco de dados")
+    return manifesto
+
+
+def verificar_backup(caminho):
+    """Confere checksums e manifesto sem extrair nada. Devolve o manifesto."""
+    return _percorrer(caminho)
+
+
+def restaurar_backup(caminho):
+    """Substitui dados/ pelo conteúdo do backup, só depois de validar tudo.
+
+    Extrai ao lado de dados/, confere checksums e a integridade do banco e
+    então troca as pastas por rename. A pasta antiga fica como
+    dados.antes_AAAAMMDD_HHMMSS. Devolve o caminho dessa pasta antiga.
+    """
+    extraida = pasta_restauracao()
+    try:
+        _percorrer(caminho, extraida)
+        return trocar_pasta_dados(extraida)
+    except BaseException:
+        shutil.rmtree(extraida, ignore_errors=True)
+        raise
+
+
+def pasta_restauracao():
+    """Pasta temporária ao lado de dados/ (mesmo disco, para a troca ser um rename)"""
+    return tempfile.mkdtemp(prefix=".restaurando_", dir=os.path.dirname(dados.PASTA_DADOS))
+
+
+def trocar_pasta_dados(extraida):
+    """Confere o banco de `extraida` e põe essa pasta no lugar de dados/.
+
+    A pasta atual fica como dados.antes_AAAAMMDD_HHMMSS (caminho devolvido).
+    """
+    banco = sqlite3.connect(os.path.join(extraida, NOME_BANCO))
+    try:
+        resultado = banco.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        banco.close()
+    if resultado != "ok":
+        raise BackupInvalido(f"Banco do backup está corrompido: {resultado}")
+
+    pasta_dados = dados.PASTA_DADOS
+    antiga = f"{pasta_dados}.antes_{time.strftime('%Y%m%d_%H%M%S')}"
+    # Sem nenhuma conexão aberta: no Windows não dá para renomear a pasta com o
+    # banco aberto, e no Linux as conexões seguiriam gravando na pasta antiga
+    with dados.banco_fechado():
+        if os.path.exists(pasta_dados):
+            os.replace(pasta_dados, antiga)
+        os.replace(extraida, pasta_dados)
+    return antiga
+
+
+# Uso: python -m modules.backup criar [arquivo] | verificar <arquivo> | restaurar <arquivo>
+if __name__ == "__main__":
+    comando, argumentos = (sys.argv[1], sys.argv[2:]) if len(sys.argv) > 1 else ("", [])
+    try:
+        if comando == "criar" and len(argumentos) <= 1:
+            destino, manifesto = criar_backup(*argumentos)
+            print(f"Backup criado: {destino} ({len(manifesto['arquivos'])} arquivos)")
+        elif comando == "verificar" and len(argumentos) == 1:
+            manifesto = verificar_backup(argumentos[0])
+            print(f"Backup OK: {len(manifesto['arquivos'])} arquivos, criado em {manifesto['criado_em']}")
+        elif comando == "restaurar" and len(argumentos) == 1:
+            print(f"Dados restaurados. Pasta anterior guardada em: {restaurar_backup(argumentos[0])}")
+        else:
+            print("Uso: python -m modules.backup criar [arquivo] | verificar <arquivo> | restaurar <arquivo>")
+    except BackupInvalido as erro:
+        print(f"Backup inválido: {erro}")
+        sys.exit(1)
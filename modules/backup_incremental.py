@@ -0,0 +1,408 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from modules import dados
+from modules.backup import (
+    PASTA_BACKUPS, NOME_BANCO, BackupInvalido, _arquivos_dados, _copiar_banco, _ligar_ou_copiar,
+    pasta_restauracao, trocar_pasta_dados,
+)
+
+# Snapshots incrementais de dados/ guardados por conteúdo (SHA-256):
+#   backups/incremental/objetos/ab/abcd...  blocos compactados, gravados uma vez só
+#   backups/incremental/snapshots/<id>.json  lista de blocos de cada arquivo
+# Foto que não mudou não é nem relida (tamanho + mtime iguais ao snapshot anterior);
+# o banco é fatiado em blocos de 64 KB e só as páginas alteradas viram blocos novos.
+
+PASTA_REPOSITORIO = os.path.join(PASTA_BACKUPS, "incremental")
+PASTA_OBJETOS = os.path.join(PASTA_REPOSITORIO, "objetos")
+PASTA_SNAPSHOTS = os.path.join(PASTA_REPOSITORIO, "snapshots")
+ARQUIVO_CONFIG = os.path.join(dados.PASTA_DADOS, "config_backup.json")
+
+BLOCO_BANCO = 64 * 1024             # múltiplo da página do SQLite: mudar um registro muda um bloco
+BLOCO_ARQUIVO = 4 * 1024 * 1024     # fotos e JSONs: na prática o arquivo inteiro é um bloco
+VERIFICAR_A_CADA = 30               # segundos entre conferências do agendador
+
+CONFIG_PADRAO = {
+    "ativo": True,
+    "intervalo_minutos": 60,
+    "manter_horas": 24,    # o último snapshot de cada uma das últimas 24 horas
+    "manter_dias": 7,      # ... de cada um dos últimos 7 dias
+    "manter_semanas": 4,   # ... de cada uma das últimas 4 semanas
+}
+_PERIODOS = (("manter_horas", "%Y%m%d%H"), ("manter_dias", "%Y%m%d"), ("manter_semanas", "%G%V"))
+
+_trava = threading.Lock()  # um snapshot / limpeza por vez no processo
+_agendador = {"rodando": False, "ultimo": None, "erro": None}
+
+
+# --- CONFIGURAÇÃO ---
+def carregar_config():
+    config = dict(CONFIG_PADRAO)
+    config.update(dados.carregar_json(ARQUIVO_CONFIG, {}))
+    return config
+
+
+def salvar_config(config):
+    dados.salvar_json_atomico(ARQUIVO_CONFIG, {chave: config[chave] for chave in CONFIG_PADRAO})
+
+
+# --- OBJETOS (blocos por conteúdo) ---
+def _caminho_objeto(sha):
+    return os.path.join(PASTA_OBJETOS, sha[:2], sha)
+
+
+def _gravar_objeto(bloco):
+    """Guarda o bloco se ainda não existir. Devolve (sha, bytes gravados em disco)."""
+    sha = hashlib.sha256(bloco).hexdigest()
+    caminho = _caminho_objeto(sha)
+    if os.path.exists(caminho):
+        return sha, 0
+    pasta = os.path.dirname(caminho)
+    os.makedirs(pasta, exist_ok=True)
+    compactado = zlib.compress(bloco, 6)
+    fd, temporario = tempfile.mkstemp(prefix=".tmp_", dir=pasta)
+    try:
+        with os.fdopen(fd, "wb") as saida:
+            saida.write(compactado)
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    return sha, len(compactado)
+
+
+def _ler_objeto(sha):
+    try:
+        with open(_caminho_objeto(sha), "rb") as f:
+            bloco = zlib.decompress(f.read())
+    except (OSError, zlib.error) as erro:
+        raise BackupInvalido(f"Bloco {sha[:12]} ilegível: {erro}") from erro
+    if hashlib.sha256(bloco).hexdigest() != sha:
+        raise BackupInvalido(f"Bloco {sha[:12]} não confere com o conteúdo")
+    return bloco
+
+
+def _guardar_arquivo(caminho, tamanho_bloco):
+    """Fatia o arquivo em blocos e guarda os novos. Devolve (lista de shas, bytes gravados)."""
+    blocos, gravados = [], 0
+    with open(caminho, "rb") as f:
+        while True:
+            bloco = f.read(tamanho_bloco)
+            if not bloco:
+                break
+            sha, novos = _gravar_objeto(bloco)
+            blocos.append(sha)
+            gravados += novos
+    return blocos, gravados
+
+
+def _montar_arquivo(entrada, destino):
+    """Remonta um arquivo do snapshot em `destino`, conferindo cada bloco"""
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    with open(destino, "wb") as saida:
+        for sha in entrada["blocos"]:
+            saida.write(_ler_objeto(sha))
+        tamanho = saida.tell()
+    if tamanho != entrada["tamanho"]:
+        raise BackupInvalido(f"{destino}: tamanho {tamanho}, esperado {entrada['tamanho']}")
+
+
+# --- SNAPSHOTS ---
+def _caminho_snapshot(id_snapshot):
+    return os.path.join(PASTA_SNAPSHOTS, f"{id_snapshot}.json")
+
+
+def abrir_snapshot(id_snapshot):
+    """Manifesto completo do snapshot (com a lista de blocos de cada arquivo)"""
+    manifesto = dados.carregar_json(_caminho_snapshot(id_snapshot), None)
+    if manifesto is None:
+        raise BackupInvalido(f"Snapshot {id_snapshot} não encontrado")
+    return manifesto
+
+
+def listar_snapshots():
+    """Snapshots do mais novo para o mais antigo: dicts com id, criado_em, epoch,
+    arquivos (quantidade), tamanho (total dos dados) e gravados (bytes novos no disco)"""
+    if not os.path.isdir(PASTA_SNAPSHOTS):
+        return []
+    resumos = []
+    for nome in os.listdir(PASTA_SNAPSHOTS):
+        if not nome.endswith(".json") or nome.startswith("."):
+            continue
+        manifesto = dados.carregar_json(os.path.join(PASTA_SNAPSHOTS, nome), None)
+        if manifesto is None:
+            continue
+        resumos.append({
+            "id": manifesto["id"],
+            "criado_em": manifesto["criado_em"],
+            "epoch": manifesto["epoch"],
+            "arquivos": len(manifesto["arquivos"]),
+            "tamanho": sum(e["tamanho"] for e in manifesto["arquivos"].values()),
+            "gravados": manifesto.get("gravados", 0),
+        })
+    return sorted(resumos, key=lambda r: r["epoch"], reverse=True)
+
+
+def _novo_id():
+    base = time.strftime("%Y%m%d_%H%M%S")
+    id_snapshot, n = base, 1
+    while os.path.exists(_caminho_snapshot(id_snapshot)):
+        n += 1
+        id_snapshot = f"{base}_{n}"
+    return id_snapshot
+
+
+def criar_snapshot():
+    """Tira um snapshot de dados/ guardando só o que mudou desde o anterior.
+
+    Devolve o resumo do snapshot criado, ou None se nada mudou.
+    """
+    with _trava:
+        return _criar_snapshot()
+
+
+def _criar_snapshot():
+    snapshots = listar_snapshots()
+    anteriores = abrir_snapshot(snapshots[0]["id"])["arquivos"] if snapshots else {}
+    dados.conectar()  # garante o banco criado/migrado antes da cópia
+    temporaria = tempfile.mkdtemp(prefix=".snapshot_", dir=dados.PASTA_DADOS)
+    try:
+        arquivos, pendentes = {}, []
+        with dados._trava_escrita:
+            # Só o que mudou é congelado (cópia do banco / hard link das fotos)
+            assinatura = [list(item) if item else None for item in dados._assinatura_banco()]
+            antigo = anteriores.get(NOME_BANCO)
+            if antigo is not None and antigo.get("assinatura") == assinatura:
+                arquivos[NOME_BANCO] = antigo
+            else:
+                _copiar_banco(os.path.join(temporaria, NOME_BANCO))
+                pendentes.append((NOME_BANCO, BLOCO_BANCO, {"assinatura": assinatura}))
+            for relativo in _arquivos_dados(dados.PASTA_DADOS):
+                if relativo == NOME_BANCO:
+                    continue
+                info = os.stat(os.path.join(dados.PASTA_DADOS, *relativo.split("/")))
+                antigo = anteriores.get(relativo)
+                if antigo is not None and (antigo["tamanho"], antigo["mtime_ns"]) == (info.st_size, info.st_mtime_ns):
+                    arquivos[relativo] = antigo
+                    continue
+                _ligar_ou_copiar(os.path.join(dados.PASTA_DADOS, *relativo.split("/")),
+                                 os.path.join(temporaria, *relativo.split("/")))
+                pendentes.append((relativo, BLOCO_ARQUIVO, {"mtime_ns": info.st_mtime_ns}))
+
+        # Fora da trava: leitura, hash e gravação dos blocos novos
+        gravados = 0
+        for relativo, tamanho_bloco, extras in pendentes:
+            caminho = os.path.join(temporaria, *relativo.split("/"))
+            blocos, novos = _guardar_arquivo(caminho, tamanho_bloco)
+            arquivos[relativo] = dict(extras, tamanho=os.path.getsize(caminho), blocos=blocos)
+            gravados += novos
+    finally:
+        shutil.rmtree(temporaria, ignore_errors=True)
+
+    mudou = set(arquivos) != set(anteriores) or any(
+        arquivos[nome]["blocos"] != anteriores[nome]["blocos"] for nome in arquivos
+    )
+    if snapshots and not mudou:
+        return None
+    agora = time.time()
+    manifesto = {
+        "id": _novo_id(),
+        "criado_em": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(agora)),
+        "epoch": agora,
+        "gravados": gravados,
+        "arquivos": arquivos,
+    }
+    dados.salvar_json_atomico(_caminho_snapshot(manifesto["id"]), manifesto, backups=0)
+    return {chave: manifesto[chave] for chave in ("id", "criado_em", "epoch", "gravados")}
+
+
+# --- RETENÇÃO ---
+def aplicar_retencao(config=None):
+    """Apaga os snapshots fora da política (horas/dias/semanas) e os blocos órfãos.
+
+    Devolve (snapshots apagados, blocos apagados). O mais recente nunca é apagado.
+    """
+    config = config or carregar_config()
+    with _trava:
+        snapshots = listar_snapshots()
+        manter = {snapshots[0]["id"]} if snapshots else set()
+        for chave, formato in _PERIODOS:
+            vistos = set()
+            for resumo in snapshots:  # do mais novo para o mais antigo: fica o último de cada período
+                periodo = time.strftime(formato, time.localtime(resumo["epoch"]))
+                if periodo not in vistos:
+                    vistos.add(periodo)
+                    if len(vistos) <= config[chave]:
+                        manter.add(resumo["id"])
+
+        apagados = [r["id"] for r in snapshots if r["id"] not in manter]
+        for id_snapshot in apagados:
+            os.remove(_caminho_snapshot(id_snapshot))
+        return apagados, (_coletar_objetos(manter) if apagados else 0)
+
+
+def _coletar_objetos(ids_mantidos):
+    """Apaga os blocos que nenhum snapshot mantido usa"""
+    usados = set()
+    for id_snapshot in ids_mantidos:
+        for entrada in abrir_snapshot(id_snapshot)["arquivos"].values():
+            usados.update(entrada["blocos"])
+    apagados = 0
+    for raiz, _, nomes in os.walk(PASTA_OBJETOS):
+        for nome in nomes:
+            if nome not in usados:
+                os.remove(os.path.join(raiz, nome))
+                apagados += 1
+    return apagados
+
+
+# --- COMPARAÇÃO ---
+def _linhas_diferentes(banco_a, banco_b):
+    """{tabela: (linhas só em B (novas/alteradas), linhas só em A (apagadas/antigas))}"""
+    conn = sqlite3.connect(banco_b)
+    try:
+        conn.execute("ATTACH DATABASE ? AS a", (banco_a,))
+        tabelas = [linha[0] for linha in conn.execute(
+            "SELECT name FROM main.sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' "
+            "AND name IN (SELECT name FROM a.sqlite_master WHERE type='table') ORDER BY name"
+        )]
+        diferencas = {}
+        for tabela in tabelas:
+            colunas_a = [c[1] for c in conn.execute(f'PRAGMA a.table_info("{tabela}")')]
+            colunas_b = [c[1] for c in conn.execute(f'PRAGMA main.table_info("{tabela}")')]
+            colunas = ", ".join(f'"{c}"' for c in colunas_b if c in colunas_a)
+            novas = conn.execute(
+                f'SELECT COUNT(*) FROM (SELECT {colunas} FROM main."{tabela}" EXCEPT SELECT {colunas} FROM a."{tabela}")'
+            ).fetchone()[0]
+            antigas = conn.execute(
+                f'SELECT COUNT(*) FROM (SELECT {colunas} FROM a."{tabela}" EXCEPT SELECT {colunas} FROM main."{tabela}")'
+            ).fetchone()[0]
+            if novas or antigas:
+                diferencas[tabela] = (novas, antigas)
+        return diferencas
+    finally:
+        conn.close()
+
+
+def comparar_snapshots(id_a, id_b):
+    """O que mudou de A para B: arquivos adicionados/removidos/alterados e,
+    se o banco mudou, quantas linhas de cada tabela diferem"""
+    arquivos_a = abrir_snapshot(id_a)["arquivos"]
+    arquivos_b = abrir_snapshot(id_b)["arquivos"]
+    resultado = {
+        "adicionados": sorted(set(arquivos_b) - set(arquivos_a)),
+        "removidos": sorted(set(arquivos_a) - set(arquivos_b)),
+        "alterados": sorted(n for n in set(arquivos_a) & set(arquivos_b)
+                            if arquivos_a[n]["blocos"] != arquivos_b[n]["blocos"]),
+        "tabelas": {},
+    }
+    if NOME_BANCO in resultado["alterados"]:
+        temporaria = tempfile.mkdtemp(prefix=".comparando_", dir=PASTA_REPOSITORIO)
+        try:
+            banco_a = os.path.join(temporaria, "a.db")
+            banco_b = os.path.join(temporaria, "b.db")
+            _montar_arquivo(arquivos_a[NOME_BANCO], banco_a)
+            _montar_arquivo(arquivos_b[NOME_BANCO], banco_b)
+            resultado["tabelas"] = _linhas_diferentes(banco_a, banco_b)
+        finally:
+            shutil.rmtree(temporaria, ignore_errors=True)
+    return resultado
+
+
+# --- RESTAURAÇÃO ---
+def restaurar_snapshot(id_snapshot):
+    """Remonta o snapshot ao lado de dados/, confere e troca as pastas.
+
+    A pasta atual fica como dados.antes_AAAAMMDD_HHMMSS (caminho devolvido).
+    """
+    arquivos = abrir_snapshot(id_snapshot)["arquivos"]
+    extraida = pasta_restauracao()
+    try:
+        for relativo, entrada in arquivos.items():
+            _montar_arquivo(entrada, os.path.join(extraida, *relativo.split("/")))
+        return trocar_pasta_dados(extraida)
+    except BaseException:
+        shutil.rmtree(extraida, ignore_errors=True)
+        raise
+
+
+# --- AGENDADOR ---
+def executar_agora():
+    """Snapshot + retenção, registrando o resultado no estado do agendador"""
+    try:
+        resumo = criar_snapshot()
+        aplicar_retencao()
+        erro = None
+    except Exception as falha:  # o agendador não pode morrer por causa de um snapshot
+        resumo, erro = None, f"{type(falha).__name__}: {falha}"
+    with _trava:
+        _agendador["ultimo"] = time.time()
+        _agendador["erro"] = erro
+    return resumo
+
+
+def _laco_agendador():
+    snapshots = listar_snapshots()
+    with _trava:
+        _agendador["ultimo"] = snapshots[0]["epoch"] if snapshots else None
+    while True:
+        config = carregar_config()
+        with _trava:
+            ultimo = _agendador["ultimo"]
+        if config["ativo"] and (ultimo is None or time.time() - ultimo >= config["intervalo_minutos"] * 60):
+            executar_agora()
+        time.sleep(VERIFICAR_A_CADA)
+
+
+def iniciar_agendador():
+    """Sobe (uma vez por processo) a thread que tira snapshots no intervalo configurado"""
+    with _trava:
+        if _agendador["rodando"]:
+            return False
+        _agendador["rodando"] = True
+    threading.Thread(target=_laco_agendador, name="snapshots", daemon=True).start()
+    return True
+
+
+def estado_agendador():
+    """Cópia do estado: rodando, ultimo (epoch) e erro da última execução"""
+    with _trava:
+        return dict(_agendador)
+
+
+# Uso: python -m modules.backup_incremental criar | listar | diff <id_a> [id_b] | restaurar <id> | limpar
+if __name__ == "__main__":
+    comando, argumentos = (sys.argv[1], sys.argv[2:]) if len(sys.argv) > 1 else ("", [])
+    try:
+        if comando == "criar" and not argumentos:
+            resumo = criar_snapshot()
+            print(f"Snapshot {resumo['id']}: {resumo['gravados']} bytes novos" if resumo else "Nada mudou desde o último snapshot")
+        elif comando == "listar" and not argumentos:
+            for r in listar_snapshots():
+                print(f"{r['id']}  {r['criado_em']}  {r['arquivos']:>6} arquivos  "
+                      f"{r['tamanho'] / 1024 / 1024:>9.1f} MB  +{r['gravados'] / 1024:.0f} KB gravados")
+        elif comando == "diff" and len(argumentos) in (1, 2):
+            id_b = argumentos[1] if len(argumentos) == 2 else listar_snapshots()[0]["id"]
+            resultado = comparar_snapshots(argumentos[0], id_b)
+            for rotulo, sinal in (("adicionados", "+"), ("removidos", "-"), ("alterados", "~")):
+                for nome in resultado[rotulo]:
+                    print(f"{sinal} {nome}")
+            for tabela, (novas, antigas) in resultado["tabelas"].items():
+                print(f"  {tabela}: {novas} linhas novas/alteradas, {antigas} apagadas/substituídas")
+        elif comando == "restaurar" and len(argumentos) == 1:
+            print(f"Dados restaurados. Pasta anterior guardada em: {restaurar_snapshot(argumentos[0])}")
+        elif comando == "limpar" and not argumentos:
+            apagados, blocos = aplicar_retencao()
+            print(f"{len(apagados)} snapshots e {blocos} blocos apagados")
+        else:
+            print("Uso: python -m modules.backup_incremental criar | listar | diff <id_a> [id_b] | restaurar <id> | limpar")
+    except BackupInvalido as erro:
+        print(f"Snapshot inválido: {erro}")
+        sys.exit(1)
@@ -0,0 +1,165 @@
+import bisect
+import re
+import unicodedata
+
+# Índice de texto em memória para buscas "enquanto digita" (clientes, produtos).
+# Sem acento e sem maiúsculas: "joao" acha "João", "sao" acha "SÃO".
+
+# Pontuação de cada termo da busca conforme o tipo de acerto
+PESO_EXATO = 3.0
+PESO_PREFIXO = 2.0
+PESO_TRECHO = 1.5
+SIMILARIDADE_MINIMA = 0.45
+
+
+def normalizar_texto(texto):
+    """Minúsculas e sem acentos ('Conceição' -> 'conceicao')"""
+    decomposto = unicodedata.normalize("NFKD", str(texto or ""))
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def tokenizar(texto):
+    """Palavras/números do texto normalizado ('123.456-7' vira um só token)"""
+    normal = normalizar_texto(texto)
+    # Junta números com máscara (CPF, telefone) antes de quebrar em palavras
+    normal = re.sub(r"(?<=\d)[.\-/() ]+(?=\d)", "", normal)
+    return re.findall(r"[a-z0-9]+", normal)
+
+
+def trigramas(token):
+    marcado = f"  {token} "
+    return {marcado[i:i + 3] for i in range(len(marcado) - 2)}
+
+
+def distancia_edicao(a, b, limite):
+    """Nº de edições (inclui trocar duas letras vizinhas) entre a e b; para cedo acima de `limite`"""
+    if abs(len(a) - len(b)) > limite:
+        return limite + 1
+    anterior2, anterior = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        atual = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            atual[j] = min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                atual[j] = min(atual[j], anterior2[j - 2] + 1)
+        if min(atual) > limite:
+            return limite + 1
+        anterior2, anterior = anterior, atual
+    return anterior[-1]
+
+
+class IndiceTexto:
+    """Índice invertido token -> ids, com busca por prefixo, trecho e semelhança.
+
+    Mantido de forma incremental: adicionar()/remover() mexem só nos tokens
+    do registro, então gravar um cliente não obriga a reindexar todos.
+    """
+
+    def __init__(self):
+        self.tokens_por_id = {}     # id -> set de tokens
+        self.ids_por_token = {}     # token -> set de ids
+        self.tokens_por_trigrama = {}
+        self.tokens_ordenados = []  # para achar prefixos com bisect
+
+    def __len__(self):
+        return len(self.tokens_por_id)
+
+    def adicionar(self, id_registro, texto):
+        self.remover(id_registro)
+        tokens = set(tokenizar(texto))
+        self.tokens_por_id[id_registro] = tokens
+        for token in tokens:
+            ids = self.ids_por_token.get(token)
+            if ids is None:
+                ids = self.ids_por_token[token] = set()
+                bisect.insort(self.tokens_ordenados, token)
+                for tri in trigramas(token):
+                    self.tokens_por_trigrama.setdefault(tri, set()).add(token)
+            ids.add(id_registro)
+
+    def remover(self, id_registro):
+        for token in self.tokens_por_id.pop(id_registro, ()):
+            ids = self.ids_por_token[token]
+            ids.discard(id_registro)
+            if ids:
+                continue
+            del self.ids_por_token[token]
+            pos = bisect.bisect_left(self.tokens_ordenados, token)
+            del self.tokens_ordenados[pos]
+            for tri in trigramas(token):
+                restantes = self.tokens_por_trigrama[tri]
+                restantes.discard(token)
+                if not restantes:
+                    del self.tokens_por_trigrama[tri]
+
+    def _candidatos(self, termo):
+        """{token: peso} dos tokens do índice que casam com um termo da busca"""
+        achados = {}
+        if termo in self.ids_por_token:
+            achados[termo] = PESO_EXATO
+        pos = bisect.bisect_left(self.tokens_ordenados, termo)
+        while pos < len(self.tokens_ordenados) and self.tokens_ordenados[pos].startswith(termo):
+            achados.setdefault(self.tokens_ordenados[pos], PESO_PREFIXO)
+            pos += 1
+        if len(termo) < 3:
+            return achados
+
+        # Trecho no meio do token (ex.: final do telefone): cruza os trigramas do termo, do mais raro ao mais comum
+        grupos = sorted(
+            (self.tokens_por_trigrama.get(termo[i:i + 3], set()) for i in range(len(termo) - 2)), key=len
+        )
+        for token in set.intersection(*grupos) if grupos[0] else ():
+            if termo in token:
+                achados.setdefault(token, PESO_TRECHO)
+        if achados or termo.isdigit():
+            return achados
+
+        # Token parecido (erro de digitação): trigramas em comum ou uma letra trocada/faltando
+        tris = trigramas(termo)
+        contagem = {}
+        for tri in tris:
+            for token in self.tokens_por_trigrama.get(tri, ()):
+                contagem[token] = contagem.get(token, 0) + 1
+        for token, comuns in contagem.items():
+            semelhanca = comuns / (len(tris) + len(trigramas(token)) - comuns)
+            if semelhanca < SIMILARIDADE_MINIMA and distancia_edicao(termo, token, 1) <= 1:
+                semelhanca = SIMILARIDADE_MINIMA
+            if semelhanca >= SIMILARIDADE_MINIMA:
+                achados[token] = semelhanca
+        return achados
+
+    def buscar(self, consulta):
+        """Lista de (pontuação, id) com TODOS os termos casando, melhor primeiro"""
+        termos = tokenizar(consulta)
+        if not termos:
+            return []
+        candidatos = [self._candidatos(termo) for termo in termos]
+        if not all(candidatos):
+            return []
+        # Começa pelo termo mais seletivo; os demais só conferem os ids que sobraram
+        candidatos.sort(key=lambda c: sum(len(self.ids_por_token[token]) for token in c))
+
+        pontos = {}
+        for token, peso in candidatos[0].items():
+            for id_registro in self.ids_por_token[token]:
+                if peso > pontos.get(id_registro, 0):
+                    pontos[id_registro] = peso
+        for deste_termo in candidatos[1:]:
+            filtrados = {}
+            if sum(len(self.ids_por_token[token]) for token in deste_termo) <= 4 * len(pontos):
+                for token, peso in deste_termo.items():
+                    for id_registro in self.ids_por_token[token]:
+                        if id_registro in pontos and peso > filtrados.get(id_registro, 0):
+                            filtrados[id_registro] = peso
+                pontos = {i: pontos[i] + peso for i, peso in filtrados.items()}
+            else:
+                # Termo comum (ex.: a marca): mais barato olhar os tokens de cada id restante
+                for id_registro, soma in pontos.items():
+                    comuns = self.tokens_por_id[id_registro] & deste_termo.keys()
+                    if comuns:
+                        filtrados[id_registro] = soma + max(deste_termo[t] for t in comuns)
+                pontos = filtrados
+            if not pontos:
+                return []
+        ordem = sorted((-p, i) for i, p in pontos.items())
+        return [(-p, i) for p, i in ordem]
@@ -0,0 +1,149 @@
+import csv
+import html
+import os
+import re
+import tempfile
+import time
+from urllib.parse import quote
+from modules import dados
+from modules.mensagem import compilar, valores_lote
+
+# Geração de campanhas de WhatsApp em lote: mensagem personalizada + link wa.me
+# para um público inteiro, gravados em fluxo num CSV ou numa "lista de cliques" HTML.
+# O texto fixo da mensagem é compilado e codificado para URL uma vez só por campanha.
+
+PASTA_CAMPANHAS = os.path.join(dados.BASE_DIR, "campanhas")
+DDD_PADRAO = "27"
+URL_WHATSAPP = "https://wa.me/{telefone}?text={texto}"
+LINHAS_POR_ESCRITA = 1000
+
+_NAO_DIGITO = re.compile(r"\D+")
+
+
+# --- TELEFONE E LINK ---
+def limpar_telefone(tel):
+    """Higieniza o telefone para o link do WhatsApp (None se não houver número)"""
+    nums = _NAO_DIGITO.sub("", str(tel or ""))
+    if not nums:
+        return None
+    if len(nums) in [8, 9]: nums = DDD_PADRAO + nums  # Assume o DDD da loja se não tiver
+    if len(nums) in [10, 11]: nums = "55" + nums        # Adiciona DDI Brasil
+    return nums
+
+
+def gerar_link(telefone, mensagem):
+    tel_limpo = limpar_telefone(telefone)
+    if not tel_limpo:
+        return None
+    return URL_WHATSAPP.format(telefone=tel_limpo, texto=quote(mensagem))
+
+
+# --- LOTE ---
+def gerar_linhas(clientes, texto, contexto=None):
+    """Gera {nome, telefone, mensagem, link} para cada cliente, em fluxo.
+
+    O texto é compilado uma vez (modules/mensagem.py) com os trechos fixos já
+    codificados para URL; por cliente só os valores dos campos são codificados
+    (quote(a + b) == quote(a) + quote(b)), e valores repetidos saem do cache.
+    """
+    modelo = compilar(texto)
+    formatar, formatar_url = modelo.formato.format, modelo.formato_url.format
+    valores_url = {}
+    for cliente, valores in valores_lote(modelo, clientes, contexto):
+        zap = (cliente.get("contato") or {}).get("whatsapp", "")
+        telefone = limpar_telefone(zap)
+        link = None
+        if telefone:
+            codificados = []
+            for valor in valores:
+                codificado = valores_url.get(valor)
+                if codificado is None:
+                    codificado = valores_url[valor] = quote(valor)
+                codificados.append(codificado)
+            link = URL_WHATSAPP.format(telefone=telefone, texto=formatar_url(*codificados))
+        yield {
+            "nome": cliente.get("nome", ""),
+            "telefone": zap or "",
+            "mensagem": formatar(*valores),
+            "link": link,
+        }
+
+
+# --- EXPORTAÇÃO ---
+_HTML_INICIO = """<!DOCTYPE html>
+<html lang="pt-br"><head><meta charset="utf-8"><title>{titulo}</title>
+<style>
+body {{ font-family: sans-serif; margin: 24px; }}
+table {{ border-collapse: collapse; width: 100%; }}
+td, th {{ border-bottom: 1px solid #ddd; padding: 6px; text-align: left; }}
+a {{ background: #25D366; color: #fff; padding: 4px 10px; border-radius: 4px; text-decoration: none; }}
+a:visited {{ background: #999; }}
+</style></head><body>
+<h2>{titulo}</h2>
+<table><tr><th>#</th><th>Cliente</th><th>Telefone</th><th></th></tr>
+"""
+_HTML_LINHA = '<tr><td>{n}</td><td>{nome}</td><td>{telefone}</td><td>{acao}</td></tr>\n'
+_HTML_FIM = "</table>\n<p>{resumo}</p></body></html>\n"
+
+
+def _escrever_csv(saida, linhas):
+    escritor = csv.writer(saida, delimiter=";")
+    escritor.writerow(["nome", "telefone", "mensagem", "link"])
+    total = sem_telefone = 0
+    bloco = []
+    for linha in linhas:
+        total += 1
+        sem_telefone += linha["link"] is None
+        bloco.append((linha["nome"], linha["telefone"], linha["mensagem"], linha["link"] or ""))
+        if len(bloco) >= LINHAS_POR_ESCRITA:
+            escritor.writerows(bloco)
+            bloco = []
+    escritor.writerows(bloco)
+    return total, sem_telefone
+
+
+def _escrever_html(saida, linhas, titulo):
+    saida.write(_HTML_INICIO.format(titulo=html.escape(titulo)))
+    total = sem_telefone = 0
+    bloco = []
+    for linha in linhas:
+        total += 1
+        if linha["link"]:
+            acao = f'<a href="{html.escape(linha["link"])}" target="_blank">Enviar</a>'
+        else:
+            acao, sem_telefone = "sem WhatsApp", sem_telefone + 1
+        bloco.append(_HTML_LINHA.format(n=total, nome=html.escape(linha["nome"]),
+                                        telefone=html.escape(linha["telefone"]), acao=acao))
+        if len(bloco) >= LINHAS_POR_ESCRITA:
+            saida.write("".join(bloco))
+            bloco = []
+    saida.write("".join(bloco))
+    saida.write(_HTML_FIM.format(resumo=f"{total} clientes, {total - sem_telefone} com link."))
+    return total, sem_telefone
+
+
+def exportar_campanha(clientes, texto, formato="csv", titulo="Campanha WhatsApp"):
+    """Grava a campanha inteira em campanhas/campanha_AAAAMMDD_HHMMSS.csv (ou .html).
+
+    Escreve em fluxo (a lista de mensagens nunca fica toda na memória), em
+    arquivo temporário renomeado no fim. Devolve (caminho, total, sem telefone).
+    """
+    if formato not in ("csv", "html"):
+        raise ValueError(f"Formato inválido: {formato}")
+    os.makedirs(PASTA_CAMPANHAS, exist_ok=True)
+    caminho = os.path.join(PASTA_CAMPANHAS, f"campanha_{time.strftime('%Y%m%d_%H%M%S')}.{formato}")
+    fd, temporario = tempfile.mkstemp(prefix=".tmp_", dir=PASTA_CAMPANHAS)
+    try:
+        # utf-8-sig: o Excel abre o CSV com acentos certos
+        with os.fdopen(fd, "w", encoding="utf-8-sig" if formato == "csv" else "utf-8", newline="") as saida:
+            linhas = gerar_linhas(clientes, texto)
+            if formato == "csv":
+                total, sem_telefone = _escrever_csv(saida, linhas)
+            else:
+                total, sem_telefone = _escrever_html(saida, linhas, titulo)
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    return caminho, total, sem_telefone
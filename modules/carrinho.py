@@ -0,0 +1,96 @@
+from modules.estoque import reservas_ativas
+from modules.produto import obter_produto
+from modules.venda import montar_item, subtotal_item
+
+# Carrinho do PDV e do Orçamento: um dict simples (cabe no session_state) com uma
+# linha por produto, na ordem em que entraram. Cada mudança mexe só na linha
+# alterada e corrige o total pela diferença, sem recalcular o carrinho inteiro.
+
+
+def novo_carrinho():
+    return {
+        "linhas": {},   # id do produto -> {produto_id, codigo, nome, quantidade, preco, desconto, subtotal}
+        "total": 0.0,
+        "pecas": 0,
+    }
+
+
+def _trocar_linha(carrinho, id_produto, nova):
+    """Põe `nova` no lugar da linha atual (None = retira) e corrige total e peças pela diferença"""
+    antiga = carrinho["linhas"].get(id_produto)
+    if antiga is not None:
+        carrinho["total"] -= antiga["subtotal"]
+        carrinho["pecas"] -= antiga["quantidade"]
+    if nova is None or nova["quantidade"] <= 0:
+        carrinho["linhas"].pop(id_produto, None)
+    else:
+        # Desconto no máximo o valor da linha (vale também quando a quantidade cai depois)
+        nova["desconto"] = round(min(nova["desconto"], nova["quantidade"] * nova["preco"]), 2)
+        nova["subtotal"] = subtotal_item(nova)
+        carrinho["linhas"][id_produto] = nova
+        carrinho["total"] += nova["subtotal"]
+        carrinho["pecas"] += nova["quantidade"]
+    carrinho["total"] = round(carrinho["total"], 2)
+
+
+# --- ALTERAÇÕES ---
+def adicionar(carrinho, produto, quantidade=1):
+    """Soma `quantidade` do produto (uma linha por produto, mesmo adicionado várias vezes)"""
+    atual = carrinho["linhas"].get(produto["id"])
+    if atual is not None:
+        nova = dict(atual, quantidade=atual["quantidade"] + int(quantidade))
+    else:
+        nova = dict(montar_item(produto, quantidade), desconto=0.0)
+    _trocar_linha(carrinho, produto["id"], nova)
+
+
+def alterar(carrinho, id_produto, quantidade=None, preco=None, desconto=None):
+    """Muda quantidade, preço unitário e/ou desconto (R$ na linha, até o valor dela). Quantidade 0 retira o item."""
+    atual = carrinho["linhas"].get(id_produto)
+    if atual is None:
+        return
+    nova = dict(atual)
+    if quantidade is not None:
+        nova["quantidade"] = max(int(quantidade), 0)
+    if preco is not None:
+        nova["preco"] = max(float(preco), 0.0)
+    if desconto is not None:
+        nova["desconto"] = max(float(desconto), 0.0)
+    _trocar_linha(carrinho, id_produto, nova)
+
+
+def remover(carrinho, id_produto):
+    _trocar_linha(carrinho, id_produto, None)
+
+
+def limpar(carrinho):
+    carrinho.update(novo_carrinho())
+
+
+# --- CONSULTAS ---
+def linhas(carrinho):
+    return list(carrinho["linhas"].values())
+
+
+def faltas(carrinho, id_cliente=None):
+    """[(linha, disponível)] das linhas com mais peças do que há livre no estoque.
+
+    Livre = estoque - reservas de orçamento de outros clientes (as do próprio
+    `id_cliente` contam como dele).
+    """
+    reservadas = reservas_ativas(excluir_cliente=id_cliente)
+    resultado = []
+    for id_produto, linha in carrinho["linhas"].items():
+        produto = obter_produto(id_produto)
+        disponivel = (produto["quantidade"] if produto else 0) - reservadas.get(id_produto, 0)
+        if linha["quantidade"] > disponivel:
+            resultado.append((linha, max(disponivel, 0)))
+    return resultado
+
+
+def itens_venda(carrinho):
+    """Linhas no formato de venda.montar_item (com o desconto), para registrar_venda"""
+    return [
+        {campo: linha[campo] for campo in ("produto_id", "codigo", "nome", "quantidade", "preco", "desconto")}
+        for linha in carrinho["linhas"].values()
+    ]
@@ -0,0 +1,275 @@
+import csv
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from modules import dados
+from modules.busca import normalizar_texto
+from modules.produto import TIPOS_PRODUTO
+
+try:
+    import openpyxl
+except ImportError:  # opcional: sem o openpyxl só CSV
+    openpyxl = None
+
+# Importação e exportação do catálogo em planilha (CSV ou XLSX), para carregar a
+# tabela de um fornecedor de uma vez. O arquivo é lido em blocos, cada bloco é
+# validado com operações de coluna do pandas (sem laço por linha) e os produtos
+# válidos entram numa transação só, casados pelo código.
+
+PASTA_EXPORTACOES = os.path.join(dados.BASE_DIR, "exportacoes")
+COLUNAS = ("codigo", "nome", "tipo", "marca", "quantidade", "preco")
+OBRIGATORIAS = ("codigo", "nome", "preco")  # sem quantidade = 0; sem tipo = tipo padrão
+LINHAS_POR_BLOCO = 10000
+LIMITE_EXEMPLOS = 1000  # linhas rejeitadas guardadas no relatório (a contagem é de todas)
+
+# Cabeçalhos aceitos além dos nomes das COLUNAS (já sem acento e em minúsculas)
+APELIDOS = {
+    "sku": "codigo", "cod": "codigo", "referencia": "codigo", "ref": "codigo",
+    "descricao": "nome", "produto": "nome",
+    "categoria": "tipo",
+    "fabricante": "marca",
+    "qtd": "quantidade", "qtde": "quantidade", "estoque": "quantidade",
+    "valor": "preco", "preco_venda": "preco", "preco_de_venda": "preco",
+}
+_TIPOS = {normalizar_texto(t): t for t in TIPOS_PRODUTO}
+_TIPOS["lente de contato"] = "Lente Contato"
+
+
+# --- LEITURA EM BLOCOS ---
+def _nome_coluna(cabecalho):
+    nome = normalizar_texto(cabecalho).strip().replace(" ", "_")
+    return APELIDOS.get(nome, nome)
+
+
+def abrir_planilha(arquivo):
+    """Arquivo binário a partir de um caminho ou de um upload (que já é um arquivo)"""
+    if isinstance(arquivo, (str, os.PathLike)):
+        return open(arquivo, "rb")
+    arquivo.seek(0)
+    return arquivo
+
+
+def _blocos_csv(arquivo):
+    inicio = arquivo.read(64 * 1024)
+    arquivo.seek(0)
+    try:
+        texto = inicio.decode("utf-8-sig")
+        codificacao = "utf-8-sig"
+    except UnicodeDecodeError:
+        texto, codificacao = inicio.decode("latin-1"), "latin-1"  # planilha salva pelo Excel antigo
+    primeira = texto.split("\n", 1)[0]
+    separador = ";" if primeira.count(";") >= primeira.count(",") else ","
+    yield from pd.read_csv(
+        arquivo, sep=separador, dtype=str, keep_default_na=False, encoding=codificacao,
+        chunksize=LINHAS_POR_BLOCO,
+    )
+
+
+def _celula(valor):
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))  # código 12345 não vira '12345.0'
+    return str(valor)
+
+
+def _blocos_xlsx(arquivo):
+    if openpyxl is None:
+        raise ValueError("Para importar .xlsx instale o openpyxl (pip install openpyxl) ou salve como CSV.")
+    livro = openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        linhas = livro.active.iter_rows(values_only=True)
+        cabecalho = [_celula(c) for c in next(linhas, ())]
+        bloco, numero = [], 0
+        for linha in linhas:
+            bloco.append([_celula(c) for c in linha[:len(cabecalho)]])
+            if len(bloco) >= LINHAS_POR_BLOCO:
+                yield pd.DataFrame(bloco, columns=cabecalho, index=range(numero, numero + len(bloco)))
+                numero, bloco = numero + len(bloco), []
+        yield pd.DataFrame(bloco, columns=cabecalho, index=range(numero, numero + len(bloco)))
+    finally:
+        livro.close()
+
+
+def blocos_planilha(arquivo, nome_arquivo):
+    """DataFrames de até LINHAS_POR_BLOCO linhas (tudo texto), com o cabeçalho original"""
+    if nome_arquivo.lower().endswith((".xlsx", ".xlsm")):
+        return _blocos_xlsx(arquivo)
+    return _blocos_csv(arquivo)
+
+
+# --- VALIDAÇÃO (por coluna, sem laço por linha) ---
+def _numero(serie):
+    """Texto -> número; aceita 'R$ 1.234,56', '1234,56' e '1234.56' (NaN se não for número)"""
+    texto = serie.str.replace(r"[R$\s]", "", regex=True)
+    brasileiro = texto.str.contains(",", regex=False)
+    texto = texto.where(~brasileiro, texto.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    return pd.to_numeric(texto, errors="coerce")
+
+
+def _validar(bloco, tipo_padrao, vistos):
+    """Separa o bloco em (válidos: DataFrame com COLUNAS, rejeitados: DataFrame com 'motivo')"""
+    bloco = bloco.rename(columns=_nome_coluna)
+    bloco = bloco.loc[:, ~bloco.columns.duplicated()]
+    faltando = [c for c in OBRIGATORIAS if c not in bloco.columns]
+    if faltando:
+        raise ValueError(f"Colunas obrigatórias ausentes: {', '.join(faltando)}")
+    for coluna in COLUNAS:
+        bloco[coluna] = bloco[coluna].astype(str).str.strip() if coluna in bloco.columns else ""
+
+    preco = _numero(bloco["preco"])
+    quantidade = _numero(bloco["quantidade"].replace("", "0"))
+    tipos = {t: _TIPOS.get(normalizar_texto(t).strip()) for t in bloco["tipo"].unique()}
+    tipo = bloco["tipo"].map(tipos)
+    if tipo_padrao:
+        tipo = tipo.where(bloco["tipo"] != "", tipo_padrao)
+    chave = bloco["codigo"].str.upper()
+
+    # Primeiro motivo que se aplica a cada linha ('' = válida)
+    motivo = pd.Series(np.select(
+        [
+            bloco["codigo"] == "",
+            bloco["nome"] == "",
+            preco.isna(),
+            preco < 0,
+            quantidade.isna() | (quantidade % 1 != 0),
+            quantidade < 0,
+            tipo.isna(),
+        ],
+        ["sem código", "sem nome", "preço inválido", "preço negativo", "quantidade inválida",
+         "quantidade negativa", "tipo desconhecido"],
+        default="",
+    ), index=bloco.index)
+    validas = motivo == ""
+    repetidas = validas & (chave.isin(vistos) | chave.where(validas).duplicated())
+    motivo = motivo.mask(repetidas, "código repetido no arquivo")
+    validas &= ~repetidas
+    vistos.update(chave[validas])
+
+    aceitos = pd.DataFrame({
+        "codigo": bloco["codigo"][validas],
+        "nome": bloco["nome"][validas],
+        "tipo": tipo[validas],
+        "marca": bloco["marca"][validas],
+        "quantidade": quantidade[validas].astype(int),
+        "preco": preco[validas].round(2),
+    })
+    rejeitados = bloco.loc[~validas, ["codigo", "nome"]].assign(motivo=motivo[~validas])
+    return aceitos, rejeitados
+
+
+# --- IMPORTAÇÃO ---
+def importar_produtos(arquivo, nome_arquivo, tipo_padrao=None, simular=False, usuario=""):
+    """Lê a planilha (caminho ou upload) e grava os produtos válidos pelo código.
+
+    Com `simular=True` só valida e conta o que seria inserido/atualizado.
+    Devolve o relatório: lidas, inseridos, atualizados, iguais, rejeitadas,
+    exemplos (até LIMITE_EXEMPLOS linhas rejeitadas: linha, código, nome, motivo) e segundos.
+    """
+    inicio = time.perf_counter()
+    relatorio = {"lidas": 0, "inseridos": 0, "atualizados": 0, "iguais": 0, "rejeitadas": 0, "exemplos": []}
+    aceitos, vistos = [], set()
+    entrada = abrir_planilha(arquivo)
+    try:
+        for bloco in blocos_planilha(entrada, nome_arquivo):
+            relatorio["lidas"] += len(bloco)
+            validos, rejeitados = _validar(bloco, tipo_padrao, vistos)
+            aceitos.extend(validos.to_dict("records"))
+            relatorio["rejeitadas"] += len(rejeitados)
+            vagas = LIMITE_EXEMPLOS - len(relatorio["exemplos"])
+            if vagas > 0 and len(rejeitados):
+                # Linha da planilha = posição + 2 (a 1ª é o cabeçalho)
+                relatorio["exemplos"].extend(
+                    {"linha": posicao + 2, **registro}
+                    for posicao, registro in zip(rejeitados.index[:vagas], rejeitados.head(vagas).to_dict("records"))
+                )
+    finally:
+        if entrada is not arquivo:
+            entrada.close()
+
+    if simular:
+        existentes = {str(p.get("codigo", "")).strip().upper(): p for p in dados.carregar_produtos()}
+        for produto in aceitos:
+            atual = existentes.get(produto["codigo"].upper())
+            if atual is None:
+                relatorio["inseridos"] += 1
+            elif any(atual.get(c) != produto[c] for c in COLUNAS):
+                relatorio["atualizados"] += 1
+            else:
+                relatorio["iguais"] += 1
+    else:
+        relatorio["inseridos"], relatorio["atualizados"], relatorio["iguais"] = dados.gravar_produtos_por_codigo(
+            aceitos, referencia=f"importação {os.path.basename(nome_arquivo)}", usuario=usuario
+        )
+    relatorio["segundos"] = round(time.perf_counter() - inicio, 2)
+    return relatorio
+
+
+# --- EXPORTAÇÃO ---
+def _escrever_csv(saida, cursor):
+    escritor = csv.writer(saida, delimiter=";")
+    escritor.writerow(COLUNAS)
+    total = 0
+    while True:
+        linhas = cursor.fetchmany(LINHAS_POR_BLOCO)
+        if not linhas:
+            return total
+        # Preço com vírgula: o Excel em português lê como número
+        escritor.writerows(tuple(linha[:5]) + (f"{linha[5]:.2f}".replace(".", ","),) for linha in linhas)
+        total += len(linhas)
+
+
+def _escrever_xlsx(caminho, cursor):
+    if openpyxl is None:
+        raise ValueError("Para exportar .xlsx instale o openpyxl (pip install openpyxl) ou use CSV.")
+    livro = openpyxl.Workbook(write_only=True)  # grava linha a linha, sem montar a planilha na memória
+    planilha = livro.create_sheet("Produtos")
+    planilha.append(COLUNAS)
+    total = 0
+    for linha in cursor:
+        planilha.append(tuple(linha))
+        total += 1
+    livro.save(caminho)
+    return total
+
+
+def exportar_produtos(formato="csv"):
+    """Grava o catálogo em exportacoes/produtos_AAAAMMDD_HHMMSS.csv (ou .xlsx), nas mesmas
+    colunas que a importação lê. Devolve (caminho, nº de produtos).
+    """
+    if formato not in ("csv", "xlsx"):
+        raise ValueError(f"Formato inválido: {formato}")
+    os.makedirs(PASTA_EXPORTACOES, exist_ok=True)
+    caminho = os.path.join(PASTA_EXPORTACOES, f"produtos_{time.strftime('%Y%m%d_%H%M%S')}.{formato}")
+    cursor = dados.conectar().execute(f"SELECT {', '.join(COLUNAS)} FROM produtos ORDER BY id")
+    fd, temporario = tempfile.mkstemp(prefix=".tmp_", dir=PASTA_EXPORTACOES)
+    try:
+        if formato == "csv":
+            with os.fdopen(fd, "w", encoding="utf-8-sig", newline="") as saida:
+                total = _escrever_csv(saida, cursor)
+        else:
+            os.close(fd)
+            total = _escrever_xlsx(temporario, cursor)
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    return caminho, total
+
+
+# Uso: python -m modules.catalogo importar planilha.csv [--simular] | exportar [csv|xlsx]
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "importar":
+        resultado = importar_produtos(sys.argv[2], sys.argv[2], simular="--simular" in sys.argv)
+        exemplos = resultado.pop("exemplos")
+        print(resultado)
+        for exemplo in exemplos[:20]:
+            print(f"  linha {exemplo['linha']}: {exemplo['motivo']} ({exemplo['codigo']} {exemplo['nome']})")
+    elif len(sys.argv) >= 2 and sys.argv[1] == "exportar":
+        print("Exportado: %s (%d produtos)" % exportar_produtos(sys.argv[2] if len(sys.argv) > 2 else "csv"))
+    else:
+        print("Uso: python -m modules.catalogo importar planilha.csv [--simular] | exportar [csv|xlsx]")
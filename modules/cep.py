@@ -0,0 +1,224 @@
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from modules.dados import conectar, transacao
+
+# Consulta de CEP com cache: memória (LRU) -> tabela `ceps` do banco -> provedores na internet.
+# A tabela guarda tanto a base offline importada (sem validade) quanto as respostas da
+# internet (com validade e descarte das menos usadas).
+
+TIMEOUT = (2, 4)                     # segundos para conectar / para ler a resposta
+VALIDADE = 90 * 24 * 3600            # resposta da internet vale 90 dias
+VALIDADE_INEXISTENTE = 24 * 3600     # "CEP não existe" vale 1 dia (pode ser CEP novo)
+LIMITE_BANCO = 50000                 # CEPs vindos da internet guardados no banco
+LIMITE_MEMORIA = 4096                # CEPs na memória do processo
+
+# Endereço do ViaCEP; pode apontar para um servidor local (testes, rede sem internet)
+URL_VIACEP = os.environ.get("URL_VIACEP", "https://viacep.com.br/ws/{cep}/json/")
+
+_trava = threading.Lock()
+_memoria = OrderedDict()             # cep -> endereço (ou None), na ordem de uso
+_sessao = None
+_executor = None
+
+
+# --- FORMATO ---
+def normalizar_cep(cep):
+    """Só os 8 dígitos do CEP, ou '' se não for um CEP válido"""
+    digitos = "".join(c for c in str(cep or "") if c.isdigit())
+    return digitos if len(digitos) == 8 else ""
+
+
+def _endereco(cep, logradouro="", bairro="", localidade="", uf=""):
+    return {
+        "cep": f"{cep[:5]}-{cep[5:]}",
+        "logradouro": logradouro or "",
+        "bairro": bairro or "",
+        "localidade": localidade or "",
+        "uf": uf or "",
+        "pais": "Brasil",
+    }
+
+
+# --- PROVEDORES ---
+# Provedor = função (cep, sessao, timeout) que devolve o endereço, None se o CEP
+# não existe, ou levanta exceção se não conseguiu responder (rede, formato).
+def provedor_viacep(cep, sessao, timeout):
+    resposta = sessao.get(URL_VIACEP.format(cep=cep), timeout=timeout)
+    resposta.raise_for_status()
+    dados = resposta.json()
+    if dados.get("erro"):
+        return None
+    return _endereco(cep, dados.get("logradouro"), dados.get("bairro"), dados.get("localidade"), dados.get("uf"))
+
+
+PROVEDORES = [("viacep", provedor_viacep)]
+
+
+def usar_provedores(provedores):
+    """Troca a lista de provedores [(nome, função), ...], na ordem de tentativa"""
+    PROVEDORES[:] = list(provedores)
+
+
+def _obter_sessao():
+    """Sessão HTTP única do processo (reaproveita conexões TLS entre consultas)"""
+    global _sessao
+    with _trava:
+        if _sessao is None:
+            sessao = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=1)
+            sessao.mount("https://", adaptador)
+            sessao.mount("http://", adaptador)
+            _sessao = sessao
+        return _sessao
+
+
+# --- CACHE ---
+def _lembrar(cep, endereco):
+    if endereco is None:
+        return  # "não existe" fica só no banco, que respeita a validade curta
+    with _trava:
+        _memoria[cep] = endereco
+        _memoria.move_to_end(cep)
+        while len(_memoria) > LIMITE_MEMORIA:
+            _memoria.popitem(last=False)
+
+
+def _ler_banco(cep):
+    """(endereço, origem, atualizado_em) guardado no banco, ou None"""
+    linha = conectar().execute(
+        "SELECT dados, origem, atualizado_em FROM ceps WHERE cep=?", (cep,)
+    ).fetchone()
+    if linha is None:
+        return None
+    endereco = json.loads(linha["dados"]) if linha["dados"] else None
+    return endereco, linha["origem"], linha["atualizado_em"]
+
+
+def _gravar_banco(cep, endereco, origem):
+    agora = time.time()
+    with transacao() as db:
+        db.execute(
+            "INSERT INTO ceps (cep, dados, origem, atualizado_em, usado_em) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (cep) DO UPDATE SET dados=excluded.dados, origem=excluded.origem, "
+            "atualizado_em=excluded.atualizado_em, usado_em=excluded.usado_em",
+            (cep, json.dumps(endereco, ensure_ascii=False) if endereco else None, origem, agora, agora),
+        )
+        # Descarta os CEPs da internet menos usados (a base offline nunca sai)
+        db.execute(
+            "DELETE FROM ceps WHERE origem != 'offline' AND cep IN ("
+            "SELECT cep FROM ceps WHERE origem != 'offline' ORDER BY usado_em DESC LIMIT -1 OFFSET ?)",
+            (LIMITE_BANCO,),
+        )
+
+
+def _marcar_uso(cep):
+    with transacao() as db:
+        db.execute("UPDATE ceps SET usado_em=? WHERE cep=?", (time.time(), cep))
+
+
+def _vencido(endereco, origem, atualizado_em):
+    if origem == "offline":
+        return False
+    validade = VALIDADE if endereco else VALIDADE_INEXISTENTE
+    return time.time() - atualizado_em > validade
+
+
+def limpar_memoria():
+    """Esvazia o cache em memória (o do banco continua)"""
+    with _trava:
+        _memoria.clear()
+
+
+# --- CONSULTA ---
+def buscar_cep(cep, usar_internet=True):
+    """Endereço do CEP (dict com logradouro, bairro, localidade, uf, pais) ou None.
+
+    Repetições saem da memória; depois do banco; só então da internet. Se a
+    internet falhar, devolve o que houver no banco mesmo vencido.
+    """
+    cep = normalizar_cep(cep)
+    if not cep:
+        return None
+    with _trava:
+        if cep in _memoria:
+            _memoria.move_to_end(cep)
+            return _memoria[cep]
+
+    guardado = _ler_banco(cep)
+    if guardado is not None and not _vencido(*guardado):
+        if guardado[1] != "offline":
+            _marcar_uso(cep)
+        _lembrar(cep, guardado[0])
+        return guardado[0]
+    if not usar_internet:
+        return guardado[0] if guardado else None
+
+    sessao = _obter_sessao()
+    for nome, provedor in list(PROVEDORES):
+        try:
+            endereco = provedor(cep, sessao, TIMEOUT)
+        except (requests.RequestException, ValueError):
+            continue  # fora do ar / resposta estranha: tenta o próximo
+        _gravar_banco(cep, endereco, nome)
+        _lembrar(cep, endereco)
+        return endereco
+
+    # Nenhum provedor respondeu: melhor um endereço antigo do que nenhum
+    return guardado[0] if guardado else None
+
+
+def buscar_cep_em_segundo_plano(cep):
+    """Dispara a consulta numa thread e devolve o Future (resultado = buscar_cep)"""
+    global _executor
+    with _trava:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cep")
+    return _executor.submit(buscar_cep, cep)
+
+
+# --- BASE OFFLINE ---
+def importar_tabela_ceps(caminho):
+    """Importa um CSV (cep;logradouro;bairro;localidade;uf, com cabeçalho) como base offline.
+
+    Aceita ';' ou ',' como separador. Devolve quantos CEPs foram gravados.
+    """
+    with open(caminho, encoding="utf-8-sig", newline="") as f:
+        amostra = f.read(4096)
+        f.seek(0)
+        leitor = csv.DictReader(f, dialect=csv.Sniffer().sniff(amostra, delimiters=";,"))
+        agora = time.time()
+        linhas = []
+        for registro in leitor:
+            cep = normalizar_cep(registro.get("cep"))
+            if not cep:
+                continue
+            endereco = _endereco(cep, registro.get("logradouro"), registro.get("bairro"),
+                                 registro.get("localidade") or registro.get("cidade"), registro.get("uf"))
+            linhas.append((cep, json.dumps(endereco, ensure_ascii=False), agora))
+
+    with transacao() as db:
+        db.executemany(
+            "INSERT INTO ceps (cep, dados, origem, atualizado_em, usado_em) VALUES (?, ?, 'offline', ?, 0) "
+            "ON CONFLICT (cep) DO UPDATE SET dados=excluded.dados, origem='offline', atualizado_em=excluded.atualizado_em",
+            linhas,
+        )
+    limpar_memoria()
+    return len(linhas)
+
+
+# Uso: python -m modules.cep importar ceps.csv   |   python -m modules.cep 29000-000
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "importar":
+        print("CEPs importados:", importar_tabela_ceps(sys.argv[2]))
+    elif len(sys.argv) == 2:
+        print(buscar_cep(sys.argv[1]))
+    else:
+        print("Uso: python -m modules.cep importar ceps.csv | python -m modules.cep <cep>")
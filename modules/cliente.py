@@ -0,0 +1,185 @@
+import threading
+from contextlib import contextmanager
+from modules import dados
+from modules.busca import IndiceTexto
+from modules.foto import descartar_se_orfa
+
+# Índices em memória sobre o snapshot compartilhado de clientes.
+# São remendados a cada gravação (só os ids alterados), não refeitos.
+_trava = threading.Lock()
+_indices = {
+    "base": None,        # tupla de registros que está indexada
+    "por_id": {},
+    "por_cpf": {},       # cpf (só dígitos) -> set de ids
+    "por_whatsapp": {},  # whatsapp normalizado -> set de ids
+    "texto": IndiceTexto(),  # nome, CPF e telefones (busca "enquanto digita")
+}
+
+
+# --- NORMALIZAÇÃO ---
+def somente_digitos(texto):
+    return "".join(c for c in str(texto or "") if c.isdigit())
+
+
+def normalizar_cpf(cpf):
+    """CPF só com dígitos (ou '' se vazio)"""
+    return somente_digitos(cpf)
+
+
+def normalizar_whatsapp(numero):
+    """Número sem DDI 55 e sem máscara, para comparar '27 99999-0000' com '5527999990000'"""
+    nums = somente_digitos(numero)
+    if len(nums) in [12, 13] and nums.startswith("55"):
+        nums = nums[2:]
+    return nums
+
+
+# --- ÍNDICES ---
+def _indexar(cliente):
+    _indices["por_id"][cliente["id"]] = cliente
+    cpf = normalizar_cpf(cliente.get("cpf"))
+    if cpf:
+        _indices["por_cpf"].setdefault(cpf, set()).add(cliente["id"])
+    zap = normalizar_whatsapp((cliente.get("contato") or {}).get("whatsapp"))
+    if zap:
+        _indices["por_whatsapp"].setdefault(zap, set()).add(cliente["id"])
+    contato = cliente.get("contato") or {}
+    _indices["texto"].adicionar(
+        cliente["id"],
+        f"{cliente.get('nome', '')}, {cpf}, {zap}, {somente_digitos(contato.get('telefone'))}",
+    )
+
+
+def _desindexar(id_cliente):
+    cliente = _indices["por_id"].pop(id_cliente, None)
+    if cliente is None:
+        return
+    _indices["texto"].remover(id_cliente)
+    for nome_indice, chave in [
+        ("por_cpf", normalizar_cpf(cliente.get("cpf"))),
+        ("por_whatsapp", normalizar_whatsapp((cliente.get("contato") or {}).get("whatsapp"))),
+    ]:
+        ids = _indices[nome_indice].get(chave)
+        if ids:
+            ids.discard(id_cliente)
+            if not ids:
+                del _indices[nome_indice][chave]
+
+
+def _alcancar(snap):
+    """Põe os índices em dia com `snap` (remenda no lugar). Chamar com _trava presa."""
+    if _indices["base"] is snap.registros:
+        return _indices
+    alterados = snap.alterados_desde(_indices["base"]) if _indices["base"] is not None else None
+    if alterados is not None:
+        # Só alguns clientes mudaram desde a última indexação
+        for id_cliente in alterados:
+            _desindexar(id_cliente)
+            posicao = snap.posicoes.get(id_cliente)
+            if posicao is not None:
+                _indexar(snap.registros[posicao])
+    else:
+        _indices["por_id"] = {}
+        _indices["por_cpf"] = {}
+        _indices["por_whatsapp"] = {}
+        _indices["texto"] = IndiceTexto()
+        for cliente in snap.registros:
+            _indexar(cliente)
+    _indices["base"] = snap.registros
+    return _indices
+
+
+@contextmanager
+def _consulta():
+    """Índices em dia com _trava presa durante o bloco: outra sessão gravando
+    não remenda os dicts/sets enquanto a consulta os percorre"""
+    snap = dados.snapshot("clientes")
+    with _trava:
+        yield _alcancar(snap)
+
+
+# --- CONSULTAS ---
+def listar_clientes():
+    """Todos os clientes (dicts somente leitura, ordenados por id)"""
+    return dados.carregar_dados()
+
+
+def ids_clientes():
+    """Ids de todos os clientes, na ordem de cadastro (para selectbox)"""
+    return [c["id"] for c in dados.snapshot("clientes").registros]
+
+
+def obter_cliente(id_cliente):
+    """Cliente pelo id, ou None"""
+    with _consulta() as indices:
+        return indices["por_id"].get(id_cliente)
+
+
+def rotulo_cliente(id_cliente):
+    """Texto 'id - nome' usado nas listas de seleção"""
+    cliente = obter_cliente(id_cliente)
+    return f"{id_cliente} - {cliente['nome']}" if cliente else str(id_cliente)
+
+
+def buscar_por_cpf(cpf):
+    """Clientes com este CPF (pode haver mais de um cadastro)"""
+    with _consulta() as indices:
+        ids = indices["por_cpf"].get(normalizar_cpf(cpf), ())
+        return [indices["por_id"][i] for i in sorted(ids)]
+
+
+def buscar_por_whatsapp(numero):
+    """Clientes com este WhatsApp (aceita com ou sem máscara/DDI)"""
+    with _consulta() as indices:
+        ids = indices["por_whatsapp"].get(normalizar_whatsapp(numero), ())
+        return [indices["por_id"][i] for i in sorted(ids)]
+
+
+def buscar_clientes(consulta, limite=20, inicio=0):
+    """Busca por nome, CPF ou telefone, sem acento e tolerante a erro de digitação.
+
+    Devolve (clientes da página, total de achados). Consulta vazia lista
+    todos por ordem de cadastro. `limite=None` devolve todos os achados.
+    """
+    fim = None if limite is None else inicio + limite
+    if not str(consulta or "").strip():
+        registros = dados.snapshot("clientes").registros
+        return list(registros[inicio:fim]), len(registros)
+    with _consulta() as indices:
+        ids = [id_cliente for _, id_cliente in indices["texto"].buscar(consulta)]
+        return [indices["por_id"][i] for i in ids[inicio:fim]], len(ids)
+
+
+# --- GRAVAÇÃO ---
+def cadastrar_cliente(cliente):
+    """Cadastra e devolve o id gerado pela sequência"""
+    return dados.inserir_cliente(cliente)
+
+
+def alterar_cliente(original, campos):
+    """Grava só `campos` sobre a ficha atual do cliente (ver dados.alterar_cliente)"""
+    dados.alterar_cliente(original, campos)
+    foto_antiga = original.get("foto")
+    if "foto" in campos and foto_antiga and foto_antiga != campos["foto"]:
+        descartar_se_orfa(foto_antiga)
+
+
+def excluir_cliente(id_cliente):
+    """Remove o cliente (as vendas continuam no livro, sem vínculo) e a foto, se ninguém mais usa"""
+    foto = (obter_cliente(id_cliente) or {}).get("foto")
+    dados.excluir_cliente(id_cliente)
+    if foto:
+        descartar_se_orfa(foto)
+
+
+def unir_clientes(id_principal, ids_repetidos):
+    """Une cadastros repetidos no principal (vendas, receitas e orçamentos vão junto).
+
+    Fotos dos repetidos que não ficaram na ficha principal são descartadas.
+    """
+    fotos = [(obter_cliente(i) or {}).get("foto") for i in ids_repetidos]
+    principal = dados.unir_clientes(id_principal, ids_repetidos)
+    for foto in fotos:
+        if foto and foto != principal.get("foto"):
+            descartar_se_orfa(foto)
+    return principal
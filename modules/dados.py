@@ -1,41 +1,1252 @@
-import json
-import os
-
-# Caminho absoluto para garantir que funciona em qualquer pasta
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
-# Arquivos de Banco de Dados
-ARQUIVO_CLIENTES = os.path.join(BASE_DIR, 'dados', 'clientes.json')
-ARQUIVO_PRODUTOS = os.path.join(BASE_DIR, 'dados', 'produtos.json') # Novo!
-
-# --- FUNÇÕES DE CLIENTES ---
-def carregar_dados():
-    """Lê o JSON de Clientes"""
-    if not os.path.exists(ARQUIVO_CLIENTES):
-        return []
-    try:
-        with open(ARQUIVO_CLIENTES, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except:
-        return []
-
-def salvar_dados(lista_clientes):
-    """Salva a lista de Clientes"""
-    with open(ARQUIVO_CLIENTES, 'w', encoding='utf-8') as f:
-        json.dump(lista_clientes, f, indent=4, ensure_ascii=False)
-
-# --- FUNÇÕES DE ESTOQUE (NOVAS) ---
-def carregar_produtos():
-    """Lê o JSON de Produtos (Estoque)"""
-    if not os.path.exists(ARQUIVO_PRODUTOS):
-        return []
-    try:
-        with open(ARQUIVO_PRODUTOS, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except:
-        return []
-
-def salvar_produtos(lista_produtos):
-    """Salva a lista de Produtos"""
-    with open(ARQUIVO_PRODUTOS, 'w', encoding='utf-8') as f:
-        json.dump(lista_produtos, f, indent=4, ensure_ascii=False)
\ No newline at end of file
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import weakref
+from contextlib import contextmanager
+from modules.datas import dia_iso, data_hora_iso, agora_iso
+
+# Caminho absoluto para garantir que funciona em qualquer pasta
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTA_DADOS = os.path.join(BASE_DIR, 'dados')
+
+# Banco de Dados (SQLite em modo WAL)
+ARQUIVO_BANCO = os.path.join(PASTA_DADOS, 'otica.db')
+
+# Arquivos JSON antigos (importados automaticamente na primeira execução)
+ARQUIVO_CLIENTES = os.path.join(PASTA_DADOS, 'clientes.json')
+ARQUIVO_PRODUTOS = os.path.join(PASTA_DADOS, 'produtos.json')
+ARQUIVO_USUARIOS = os.path.join(PASTA_DADOS, 'usuarios.json')
+
+# Listas que ficam em tabelas próprias e não dentro do registro do cliente
+LISTAS_CLIENTE = {
+    "historico_vendas": "vendas",
+    "receitas": "receitas",
+    "historico_orcamentos": "orcamentos",
+}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS clientes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome TEXT NOT NULL DEFAULT '',
+    cpf TEXT NOT NULL DEFAULT '',
+    whatsapp TEXT NOT NULL DEFAULT '',
+    nascimento TEXT NOT NULL DEFAULT '',
+    versao INTEGER NOT NULL DEFAULT 1,
+    dados TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_clientes_nome ON clientes(nome);
+CREATE INDEX IF NOT EXISTS idx_clientes_cpf ON clientes(cpf);
+CREATE INDEX IF NOT EXISTS idx_clientes_whatsapp ON clientes(whatsapp);
+
+CREATE TABLE IF NOT EXISTS vendas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    cliente_id INTEGER REFERENCES clientes(id) ON DELETE SET NULL,
+    data TEXT NOT NULL DEFAULT '',
+    total REAL NOT NULL DEFAULT 0,
+    dados TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_vendas_cliente ON vendas(cliente_id);
+CREATE INDEX IF NOT EXISTS idx_vendas_data ON vendas(data);
+
+CREATE TABLE IF NOT EXISTS receitas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    cliente_id INTEGER NOT NULL REFERENCES clientes(id) ON DELETE CASCADE,
+    data TEXT NOT NULL DEFAULT '',
+    dados TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_receitas_cliente ON receitas(cliente_id);
+
+CREATE TABLE IF NOT EXISTS orcamentos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    cliente_id INTEGER NOT NULL REFERENCES clientes(id) ON DELETE CASCADE,
+    data TEXT NOT NULL DEFAULT '',
+    total REAL NOT NULL DEFAULT 0,
+    dados TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_orcamentos_cliente ON orcamentos(cliente_id);
+
+CREATE TABLE IF NOT EXISTS produtos (
+    id INTEGER PRIMARY KEY,
+    codigo TEXT NOT NULL DEFAULT '',
+    nome TEXT NOT NULL DEFAULT '',
+    tipo TEXT NOT NULL DEFAULT '',
+    marca TEXT NOT NULL DEFAULT '',
+    quantidade INTEGER NOT NULL DEFAULT 0,
+    preco REAL NOT NULL DEFAULT 0,
+    versao INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_produtos_codigo ON produtos(codigo);
+CREATE INDEX IF NOT EXISTS idx_produtos_nome ON produtos(nome);
+CREATE INDEX IF NOT EXISTS idx_produtos_tipo ON produtos(tipo);
+
+CREATE TABLE IF NOT EXISTS usuarios (
+    usuario TEXT PRIMARY KEY,
+    senha TEXT NOT NULL,
+    nome TEXT NOT NULL DEFAULT '',
+    perfil TEXT NOT NULL DEFAULT 'vendedor'
+);
+
+CREATE TABLE IF NOT EXISTS ceps (
+    cep TEXT PRIMARY KEY,
+    dados TEXT,                          -- NULL = CEP que não existe
+    origem TEXT NOT NULL DEFAULT '',     -- 'offline' (tabela importada) ou nome do provedor
+    atualizado_em REAL NOT NULL DEFAULT 0,
+    usado_em REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_ceps_usado ON ceps(usado_em);
+
+CREATE TABLE IF NOT EXISTS geocodigos (
+    endereco TEXT PRIMARY KEY,           -- endereço normalizado
+    lat REAL,                            -- NULL = endereço não encontrado
+    lon REAL,
+    atualizado_em REAL NOT NULL DEFAULT 0
+);
+
+-- Diário do estoque: só recebe linhas novas (ver GATILHOS). Sem FK no produto,
+-- para o histórico continuar lá depois que ele for excluído.
+CREATE TABLE IF NOT EXISTS movimentos_estoque (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    produto_id INTEGER NOT NULL,
+    data TEXT NOT NULL,                  -- AAAA-MM-DDTHH:MM:SS
+    tipo TEXT NOT NULL,                  -- ver TIPOS_MOVIMENTO
+    quantidade INTEGER NOT NULL,         -- + entrou, - saiu
+    saldo INTEGER NOT NULL,              -- estoque do produto logo depois do movimento
+    referencia TEXT NOT NULL DEFAULT '', -- ex: 'venda 12'
+    usuario TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_movimentos_produto ON movimentos_estoque(produto_id, data);
+CREATE INDEX IF NOT EXISTS idx_movimentos_data ON movimentos_estoque(data);
+
+-- Estoque de cada produto no fim de cada mês fechado (ponto de partida das consultas por data)
+CREATE TABLE IF NOT EXISTS fechamentos_estoque (
+    mes TEXT NOT NULL,                   -- AAAA-MM
+    produto_id INTEGER NOT NULL,
+    quantidade INTEGER NOT NULL,
+    PRIMARY KEY (mes, produto_id)
+);
+-- Meses já fechados (um mês com o estoque todo zerado não deixa linha na tabela acima)
+CREATE TABLE IF NOT EXISTS meses_fechados (
+    mes TEXT PRIMARY KEY                 -- AAAA-MM
+);
+
+-- Reservas de orçamento: seguram peças sem mexer na quantidade do produto
+CREATE TABLE IF NOT EXISTS reservas_estoque (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    produto_id INTEGER NOT NULL REFERENCES produtos(id) ON DELETE CASCADE,
+    quantidade INTEGER NOT NULL,
+    cliente_id INTEGER REFERENCES clientes(id) ON DELETE CASCADE,
+    referencia TEXT NOT NULL DEFAULT '',
+    criada_em TEXT NOT NULL,
+    expira_em TEXT NOT NULL,
+    situacao TEXT NOT NULL DEFAULT 'ativa'  -- ativa, baixada (virou venda), cancelada
+);
+CREATE INDEX IF NOT EXISTS idx_reservas_situacao ON reservas_estoque(situacao, produto_id);
+
+CREATE TABLE IF NOT EXISTS agregados_vendas (
+    dimensao TEXT NOT NULL,
+    chave TEXT NOT NULL,
+    total REAL NOT NULL DEFAULT 0,
+    qtde INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimensao, chave)
+);
+"""
+
+# Dia (AAAA-MM-DD) de uma venda; aceita ISO e o antigo DD/MM/AAAA HH:MM
+_SQL_DIA_VENDA = """(CASE WHEN {col} LIKE '__/__/____%'
+    THEN substr({col}, 7, 4) || '-' || substr({col}, 4, 2) || '-' || substr({col}, 1, 2)
+    ELSE substr({col}, 1, 10) END)"""
+
+# Indicadores do Dashboard: cada venda nova soma nos totais (geral, dia, mês,
+# vendedor e forma de pagamento) dentro da mesma transação que a gravou.
+GATILHOS = f"""
+CREATE TRIGGER IF NOT EXISTS trg_vendas_agregados AFTER INSERT ON vendas
+BEGIN
+    INSERT INTO agregados_vendas (dimensao, chave, total, qtde) VALUES
+        ('geral', '', NEW.total, 1),
+        ('dia', {_SQL_DIA_VENDA.format(col="NEW.data")}, NEW.total, 1),
+        ('mes', substr({_SQL_DIA_VENDA.format(col="NEW.data")}, 1, 7), NEW.total, 1),
+        ('vendedor', NEW.vendedor, NEW.total, 1),
+        ('pagamento', NEW.pagamento, NEW.total, 1)
+    ON CONFLICT (dimensao, chave) DO UPDATE SET
+        total = total + excluded.total,
+        qtde = qtde + excluded.qtde;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movimentos_sem_alteracao BEFORE UPDATE ON movimentos_estoque
+BEGIN
+    SELECT RAISE(ABORT, 'movimentos de estoque não podem ser alterados');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movimentos_sem_exclusao BEFORE DELETE ON movimentos_estoque
+BEGIN
+    SELECT RAISE(ABORT, 'movimentos de estoque não podem ser apagados');
+END;
+"""
+
+DIMENSOES_VENDAS = {
+    "geral": "''",
+    "dia": _SQL_DIA_VENDA.format(col="data"),
+    "mes": f"substr({_SQL_DIA_VENDA.format(col='data')}, 1, 7)",
+    "vendedor": "vendedor",
+    "pagamento": "pagamento",
+}
+
+# Colunas criadas depois da primeira versão do banco: (tabela, coluna, definição)
+COLUNAS_NOVAS = [
+    ("clientes", "versao", "INTEGER NOT NULL DEFAULT 1"),
+    ("produtos", "versao", "INTEGER NOT NULL DEFAULT 1"),
+    ("vendas", "pagamento", "TEXT NOT NULL DEFAULT ''"),
+    ("vendas", "vendedor", "TEXT NOT NULL DEFAULT ''"),
+    ("receitas", "data_exame", "TEXT NOT NULL DEFAULT ''"),  # data da receita em AAAA-MM-DD
+]
+
+# Índices sobre colunas novas (só podem ser criados depois delas)
+INDICES_NOVOS = """
+CREATE INDEX IF NOT EXISTS idx_receitas_exame ON receitas(cliente_id, data_exame);
+"""
+
+# Uma conexão por thread (o Streamlit roda cada sessão em uma thread)
+_local = threading.local()
+_trava_esquema = threading.Lock()
+_esquema_pronto = False
+_geracao = 0  # muda quando o arquivo do banco é trocado (restauração de backup)
+_trava_abertura = threading.RLock()  # ninguém abre conexão enquanto o arquivo está sendo trocado
+_trava_conexoes = threading.Lock()
+_conexoes = weakref.WeakSet()  # conexões abertas de todas as threads (para banco_fechado)
+
+# Escritas do mesmo processo fazem fila aqui; entre processos quem trava é o
+# próprio SQLite (BEGIN IMMEDIATE). Leitores nunca esperam (modo WAL).
+_trava_escrita = threading.RLock()
+
+# Cache em memória compartilhado por todas as sessões do processo
+_trava_cache = threading.Lock()
+_trava_carga = threading.Lock()
+_cache = {}
+
+
+# --- CONEXÃO ---
+class _Conexao(sqlite3.Connection):
+    """Conexão que aceita weakref (sqlite3.Connection não aceita)"""
+
+
+def conectar():
+    """Devolve a conexão SQLite da thread atual, criando o banco se preciso"""
+    global _esquema_pronto
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        if getattr(_local, "geracao", 0) == _geracao:
+            return conn
+        conn.close()  # o banco foi trocado: abre de novo no arquivo atual
+
+    with _trava_abertura:
+        os.makedirs(PASTA_DADOS, exist_ok=True)
+        # check_same_thread=False só para banco_fechado poder fechá-la de outra thread
+        conn = sqlite3.connect(ARQUIVO_BANCO, timeout=30, isolation_level=None,
+                               factory=_Conexao, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+
+        with _trava_esquema:
+            if not _esquema_pronto:
+                conn.executescript(ESQUEMA)
+                _adicionar_colunas_novas(conn)
+                conn.executescript(GATILHOS)
+                _backfill_agregados(conn)
+                _aplicar_migracoes(conn)
+                _esquema_pronto = True
+        with _trava_conexoes:
+            _conexoes.add(conn)
+
+    _local.conn = conn
+    _local.geracao = _geracao
+    return conn
+
+
+def reabrir_banco():
+    """Faz todas as threads reabrirem o banco e descarta o cache (após trocar o arquivo)"""
+    global _geracao, _esquema_pronto
+    with _trava_esquema:
+        _geracao += 1
+        _esquema_pronto = False
+    with _trava_cache:
+        _cache.clear()
+
+
+@contextmanager
+def banco_fechado():
+    """Bloco em que o arquivo do banco pode ser movido ou trocado.
+
+    Espera as escritas em andamento, fecha a conexão de todas as threads (e com
+    ela os arquivos -wal/-shm) e só deixa abrir de novo no fim do bloco.
+    """
+    with _trava_escrita, _trava_abertura:
+        try:
+            # O que estiver só no WAL vai para o arquivo do banco antes de fechar
+            conectar().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error:
+            pass
+        reabrir_banco()
+        with _trava_conexoes:
+            abertas = list(_conexoes)
+        for conn in abertas:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        try:
+            yield
+        finally:
+            reabrir_banco()
+
+
+def _adicionar_colunas_novas(conn):
+    novas = set()
+    for tabela, coluna, definicao in COLUNAS_NOVAS:
+        existentes = [linha["name"] for linha in conn.execute(f"PRAGMA table_info({tabela})")]
+        if coluna not in existentes:
+            conn.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}")
+            novas.add((tabela, coluna))
+
+    if ("vendas", "pagamento") in novas:
+        # Preenche as colunas novas com o que já estava no JSON de cada venda
+        linhas = conn.execute("SELECT id, dados FROM vendas").fetchall()
+        for linha in linhas:
+            venda = json.loads(linha["dados"])
+            conn.execute(
+                "UPDATE vendas SET pagamento=?, vendedor=? WHERE id=?",
+                (_forma_pagamento(venda.get("pagamento", "")), str(venda.get("vendedor", "")), linha["id"]),
+            )
+    if ("receitas", "data_exame") in novas:
+        linhas = conn.execute("SELECT id, data FROM receitas").fetchall()
+        conn.executemany(
+            "UPDATE receitas SET data_exame=? WHERE id=?",
+            [(dia_iso(linha["data"]), linha["id"]) for linha in linhas],
+        )
+    conn.executescript(INDICES_NOVOS)
+
+
+# --- MIGRAÇÕES DE DADOS (uma vez por banco, controladas por PRAGMA user_version) ---
+def _importar_json_antigo(conn):
+    """Importa clientes.json, produtos.json e usuarios.json da versão antiga; depois do
+    COMMIT eles viram *.migrado (não voltam a ser lidos nem se o banco ficar vazio)"""
+    pasta = os.path.dirname(ARQUIVO_BANCO)
+    arquivos = [os.path.join(pasta, os.path.basename(caminho))
+                for caminho in (ARQUIVO_CLIENTES, ARQUIVO_PRODUTOS, ARQUIVO_USUARIOS)]
+    clientes, produtos, usuarios = (carregar_json(caminho, []) for caminho in arquivos)
+    if conn.execute("SELECT 1 FROM clientes LIMIT 1").fetchone() is None:
+        for cliente in clientes:
+            _gravar_cliente(conn, cliente, novo=True)
+    if conn.execute("SELECT 1 FROM produtos LIMIT 1").fetchone() is None:
+        for produto in produtos:
+            _gravar_produto(conn, produto, novo=True)
+    if conn.execute("SELECT 1 FROM usuarios LIMIT 1").fetchone() is None:
+        for usuario in usuarios:
+            _gravar_usuario(conn, usuario)
+
+    def renomear():
+        for caminho in arquivos:
+            if os.path.exists(caminho):
+                os.replace(caminho, caminho + ".migrado")
+    return renomear
+
+
+def _datas_para_iso(conn):
+    """Datas antigas (DD/MM/AAAA, DD/MM/AAAA HH:MM) viram ISO na coluna e no JSON"""
+    alvos = [
+        ("clientes", "nascimento", dia_iso),
+        ("receitas", "data", dia_iso),
+        ("orcamentos", "data", dia_iso),
+        ("vendas", "data", data_hora_iso),
+    ]
+    for tabela, coluna, converter in alvos:
+        mudancas = []
+        for linha in conn.execute(f"SELECT id, {coluna}, dados FROM {tabela}"):
+            registro = json.loads(linha["dados"])
+            antigo = registro.get(coluna, linha[coluna])
+            novo = converter(antigo) if antigo else ""
+            if novo and novo != antigo:
+                registro[coluna] = novo
+                mudancas.append((novo, _json(registro), linha["id"]))
+        conn.executemany(f"UPDATE {tabela} SET {coluna}=?, dados=? WHERE id=?", mudancas)
+    conn.execute(
+        "UPDATE receitas SET data_exame=data "
+        "WHERE data_exame='' AND data GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"
+    )
+
+
+def _iniciar_movimentos(conn):
+    """Abre o diário do estoque com o saldo atual de cada produto (movimento 'inicial')"""
+    agora = agora_iso()
+    conn.execute(
+        "INSERT INTO movimentos_estoque (produto_id, data, tipo, quantidade, saldo) "
+        "SELECT id, ?, 'inicial', quantidade, quantidade FROM produtos WHERE quantidade != 0 "
+        "AND id NOT IN (SELECT produto_id FROM movimentos_estoque)",
+        (agora,),
+    )
+
+
+def _marcar_meses_fechados(conn):
+    """Bancos que já tinham fechamentos antes da tabela meses_fechados"""
+    conn.execute("INSERT OR IGNORE INTO meses_fechados (mes) SELECT DISTINCT mes FROM fechamentos_estoque")
+
+
+# A posição na lista (+1) é a versão do banco depois dela. Uma migração pode devolver
+# uma função para rodar depois do COMMIT (mexer em arquivos fora do banco).
+MIGRACOES = [_importar_json_antigo, _datas_para_iso, _iniciar_movimentos, _marcar_meses_fechados]
+
+
+def _aplicar_migracoes(conn):
+    versao = conn.execute("PRAGMA user_version").fetchone()[0]
+    for numero, migracao in enumerate(MIGRACOES, start=1):
+        if numero <= versao:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            depois = migracao(conn)
+            conn.execute(f"PRAGMA user_version={numero}")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if depois:
+            depois()
+
+
+def _forma_pagamento(texto):
+    """'PIX (1x)' -> 'PIX' (vendas antigas guardavam as parcelas junto)"""
+    return re.sub(r"\s*\(\d+x\)\s*$", "", str(texto or ""))
+
+
+# --- TRANSAÇÕES E CONCORRÊNCIA ---
+class ConflitoVersao(Exception):
+    """O registro foi alterado por outra sessão depois de ser lido"""
+
+
+class EstoqueInsuficiente(Exception):
+    """A baixa deixaria o estoque negativo"""
+
+
+class ProdutoNaoEncontrado(Exception):
+    """O produto não existe (foi excluído por outra sessão?)"""
+
+
+class _Transacao:
+    """Abre BEGIN IMMEDIATE e faz COMMIT/ROLLBACK ao sair do bloco.
+
+    Dentro de outra transação da mesma thread vira só parte dela, então as
+    funções de gravação podem ser combinadas em um único `with transacao():`.
+    """
+
+    def __init__(self):
+        self.conn = None
+        self.externa = False
+        self.assinatura_inicio = None
+
+    def __enter__(self):
+        _trava_escrita.acquire()
+        try:
+            # Só depois da trava: banco_fechado pode ter fechado a conexão enquanto esperávamos
+            self.conn = conectar()
+            self.externa = not self.conn.in_transaction
+            if self.externa:
+                self.conn.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            _trava_escrita.release()
+            raise
+        if self.externa:
+            self.assinatura_inicio = _assinatura_banco()
+            _local.alterados = {}
+        return self.conn
+
+    def __exit__(self, tipo_erro, erro, tb):
+        try:
+            if self.externa:
+                alterados, _local.alterados = _local.alterados, None
+                if tipo_erro is None:
+                    self.conn.execute("COMMIT")
+                    _aplicar_alteracoes(self.assinatura_inicio, alterados)
+                else:
+                    self.conn.execute("ROLLBACK")
+        finally:
+            _trava_escrita.release()
+        return False
+
+
+def transacao():
+    """Bloco de leitura-alteração-gravação atômico: `with transacao() as db:`"""
+    return _Transacao()
+
+
+class _Leitura:
+    """Snapshot consistente entre várias consultas (não bloqueia escritores)"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.externa = False
+
+    def __enter__(self):
+        self.externa = not self.conn.in_transaction
+        if self.externa:
+            self.conn.execute("BEGIN")
+        return self.conn
+
+    def __exit__(self, tipo_erro, erro, tb):
+        if self.externa:
+            self.conn.execute("COMMIT")
+        return False
+
+
+# --- CACHE DE LEITURA ---
+# Acima disso, em vez de remendar linha a linha, o snapshot é relido inteiro
+LIMITE_REMENDO = 500
+# Quantos remendos seguidos o snapshot lembra (índices que ficaram para trás alcançam sem refazer tudo)
+PROFUNDIDADE_HISTORICO = 32
+
+
+class Snapshot:
+    """Registros em cache de uma tabela + o que mudou desde o snapshot anterior.
+
+    Quem mantém índices próprios (ex: modules/cliente.py) pede
+    alterados_desde(base que já indexou): se a base ainda estiver no
+    histórico, basta reprocessar esses ids em vez de varrer tudo de novo.
+    """
+
+    __slots__ = ("chave", "registros", "posicoes", "anterior", "alterados", "historico")
+
+    def __init__(self, chave, registros, posicoes=None, anterior=None, alterados=frozenset(), historico=()):
+        self.chave = chave
+        self.registros = registros
+        self.posicoes = posicoes if posicoes is not None else {r["id"]: i for i, r in enumerate(registros)}
+        self.anterior = anterior
+        self.alterados = alterados
+        # ((registros anteriores, ids alterados desde eles), ...), do mais recente ao mais antigo
+        self.historico = historico
+
+    def alterados_desde(self, base):
+        """Ids que mudaram desde os registros `base`, ou None se base for antiga demais"""
+        if base is self.registros:
+            return set()
+        ids = set()
+        for registros, alterados in self.historico:
+            ids |= alterados
+            if registros is base:
+                return ids
+        return None
+
+
+def _assinatura_banco():
+    """mtime/tamanho do banco e do WAL (pega escritas feitas por outros processos)"""
+    assinatura = []
+    for caminho in (ARQUIVO_BANCO, ARQUIVO_BANCO + "-wal"):
+        try:
+            info = os.stat(caminho)
+            assinatura.append((info.st_mtime_ns, info.st_size))
+        except OSError:
+            assinatura.append(None)
+    return tuple(assinatura)
+
+
+def _leitores():
+    return {"clientes": _ler_clientes, "produtos": _ler_produtos}
+
+
+def marcar_alteracao(tabela, id_registro=None):
+    """Anota, na transação atual, que um registro em cache mudou.
+
+    `tabela` é o nome do snapshot ("clientes" ou "produtos"); sem id, o
+    snapshot inteiro é descartado no COMMIT.
+    """
+    alterados = getattr(_local, "alterados", None)
+    if alterados is None or (tabela in alterados and alterados[tabela] is None):
+        return
+    if id_registro is None:
+        alterados[tabela] = None
+    else:
+        alterados.setdefault(tabela, set()).add(id_registro)
+
+
+def _remendar(snap, ids, chave, leitor):
+    """Novo snapshot trocando só as linhas `ids` (relidas do banco)"""
+    novos = {r["id"]: r for r in leitor(ids)}
+    registros = list(snap.registros)
+    posicoes = snap.posicoes
+    removidos = {i for i in ids if i not in novos and i in posicoes}
+    acrescentados = sorted(i for i in novos if i not in posicoes)
+
+    for id_registro, registro in novos.items():
+        if id_registro in posicoes:
+            registros[posicoes[id_registro]] = registro
+    if removidos:
+        registros = [r for r in registros if r["id"] not in removidos]
+        posicoes = None
+    elif acrescentados:
+        posicoes = dict(posicoes)
+        for n, id_registro in enumerate(acrescentados, start=len(registros)):
+            posicoes[id_registro] = n
+    registros.extend(novos[i] for i in acrescentados)
+    alterados = frozenset(ids)
+    historico = ((snap.registros, alterados),) + snap.historico[:PROFUNDIDADE_HISTORICO - 1]
+    return Snapshot(chave, tuple(registros), posicoes, snap.registros, alterados, historico)
+
+
+def _aplicar_alteracoes(assinatura_inicio, alterados):
+    """Depois do COMMIT: remenda os snapshots afetados em vez de relê-los"""
+    nova = _assinatura_banco()
+    leitores = _leitores()
+    with _trava_carga:
+        for nome, snap in list(_cache.items()):
+            if snap.chave != assinatura_inicio:
+                # Alguém de fora gravou antes de nós: relê na próxima consulta
+                _cache.pop(nome, None)
+            elif nome not in alterados:
+                snap.chave = nova
+            elif alterados[nome] is None or len(alterados[nome]) > LIMITE_REMENDO:
+                _cache.pop(nome, None)
+            else:
+                remendado = _remendar(snap, alterados[nome], nova, leitores[nome])
+                with _trava_cache:
+                    _cache[nome] = remendado
+
+
+def snapshot(nome):
+    """Snapshot compartilhado de "clientes" ou "produtos", lendo o banco só se ele mudou"""
+    conectar()
+    chave = _assinatura_banco()
+    snap = _cache.get(nome)
+    if snap is not None and snap.chave == chave:
+        return snap
+
+    # Só uma sessão lê o banco; as outras esperam e reaproveitam o resultado
+    with _trava_carga:
+        chave = _assinatura_banco()
+        snap = _cache.get(nome)
+        if snap is not None and snap.chave == chave:
+            return snap
+        snap = Snapshot(chave, tuple(_leitores()[nome]()))
+        with _trava_cache:
+            _cache[nome] = snap
+        return snap
+
+
+# --- ARQUIVOS JSON (gravação atômica) ---
+def salvar_json_atomico(caminho, dados, backups=1):
+    """Grava o JSON em arquivo temporário + fsync + os.replace.
+
+    Quem lê nunca vê um arquivo pela metade. Com `backups` > 0 a versão
+    anterior é mantida em `caminho.bak`, `caminho.bak2`, ...
+    """
+    pasta = os.path.dirname(caminho)
+    os.makedirs(pasta, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(prefix=".tmp_", suffix=".json", dir=pasta)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, indent=4, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        if backups > 0 and os.path.exists(caminho):
+            _rodar_backups(caminho, backups)
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    _fsync_pasta(pasta)
+
+
+def _nome_backup(caminho, n):
+    return f"{caminho}.bak" if n == 1 else f"{caminho}.bak{n}"
+
+
+def _rodar_backups(caminho, backups):
+    for n in range(backups, 1, -1):
+        anterior = _nome_backup(caminho, n - 1)
+        if os.path.exists(anterior):
+            os.replace(anterior, _nome_backup(caminho, n))
+    # Hard link: o .bak aponta para a versão atual sem copiar bytes
+    destino = _nome_backup(caminho, 1)
+    if os.path.exists(destino):
+        os.remove(destino)
+    try:
+        os.link(caminho, destino)
+    except OSError:
+        with open(caminho, 'rb') as origem, open(destino, 'wb') as copia:
+            copia.write(origem.read())
+
+
+def _fsync_pasta(pasta):
+    """Garante que o rename chegou ao disco (no Windows não é suportado)"""
+    try:
+        fd = os.open(pasta, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def carregar_json(caminho, padrao):
+    """Lê um JSON; se estiver corrompido tenta o .bak antes de usar o padrão"""
+    for candidato in (caminho, _nome_backup(caminho, 1)):
+        if not os.path.exists(candidato):
+            continue
+        try:
+            with open(candidato, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            continue
+    return padrao
+
+
+def _backfill_agregados(conn):
+    """Bancos criados antes dos indicadores: calcula uma vez a partir das vendas"""
+    vazio = conn.execute("SELECT 1 FROM agregados_vendas LIMIT 1").fetchone() is None
+    if vazio and conn.execute("SELECT 1 FROM vendas LIMIT 1").fetchone() is not None:
+        conn.execute("BEGIN IMMEDIATE")
+        _recalcular_agregados(conn)
+        conn.execute("COMMIT")
+
+
+def _recalcular_agregados(conn):
+    conn.execute("DELETE FROM agregados_vendas")
+    for dimensao, expressao in DIMENSOES_VENDAS.items():
+        conn.execute(
+            f"INSERT INTO agregados_vendas (dimensao, chave, total, qtde) "
+            f"SELECT ?, {expressao}, SUM(total), COUNT(*) FROM vendas GROUP BY {expressao}",
+            (dimensao,),
+        )
+
+
+def reconstruir_agregados():
+    """Refaz do zero os indicadores de vendas a partir do livro de vendas"""
+    with transacao() as conn:
+        _recalcular_agregados(conn)
+
+
+def _json(dados):
+    return json.dumps(dados, ensure_ascii=False, separators=(",", ":"))
+
+
+# --- FUNÇÕES DE CLIENTES ---
+def _conferir_versao(conn, tabela, id_registro, cur):
+    """Depois de um UPDATE ... AND versao=?, decide entre conflito e inexistente"""
+    if cur.rowcount == 0:
+        existe = conn.execute(f"SELECT 1 FROM {tabela} WHERE id=?", (id_registro,)).fetchone()
+        if existe:
+            raise ConflitoVersao(f"{tabela} {id_registro} foi alterado por outra sessão")
+
+
+def _colunas_cliente(cliente):
+    """(nome, cpf, whatsapp, nascimento, dados) da linha em `clientes` (listas filhas ficam de fora)"""
+    registro = {k: v for k, v in cliente.items() if k not in ("id", "versao") and k not in LISTAS_CLIENTE}
+    if registro.get("nascimento"):
+        registro["nascimento"] = dia_iso(registro["nascimento"]) or str(registro["nascimento"])
+    return (
+        str(cliente.get("nome", "")),
+        str(cliente.get("cpf", "") or ""),
+        str((cliente.get("contato") or {}).get("whatsapp", "") or ""),
+        str(registro.get("nascimento", "") or ""),
+        _json(registro),
+    )
+
+
+def _gravar_cliente(conn, cliente, novo=False):
+    """Grava o registro do cliente e, se vierem no dict, as listas filhas.
+
+    Se o dict trouxer "versao" (vem de carregar_dados), a gravação só
+    acontece se ninguém tiver alterado o cliente desde a leitura.
+    """
+    colunas = _colunas_cliente(cliente)
+    id_cliente = cliente.get("id")
+    if novo:
+        cur = conn.execute(
+            "INSERT INTO clientes (id, nome, cpf, whatsapp, nascimento, dados) VALUES (?, ?, ?, ?, ?, ?)",
+            (id_cliente,) + colunas,
+        )
+        id_cliente = cur.lastrowid
+    else:
+        sql = "UPDATE clientes SET nome=?, cpf=?, whatsapp=?, nascimento=?, dados=?, versao=versao+1 WHERE id=?"
+        parametros = colunas + (id_cliente,)
+        if cliente.get("versao") is not None:
+            sql += " AND versao=?"
+            parametros += (cliente["versao"],)
+        _conferir_versao(conn, "clientes", id_cliente, conn.execute(sql, parametros))
+    marcar_alteracao("clientes", id_cliente)
+
+    for chave, tabela in LISTAS_CLIENTE.items():
+        if chave not in cliente:
+            continue
+        if tabela == "vendas":
+            # O livro de vendas só cresce: entram apenas as vendas ainda sem id
+            for item in cliente[chave]:
+                if item.get("id") is None:
+                    _inserir_filho(conn, tabela, id_cliente, item)
+            continue
+        itens = list(cliente[chave])
+        if not novo:
+            gravados = [json.loads(linha["dados"]) for linha in conn.execute(
+                f"SELECT dados FROM {tabela} WHERE cliente_id=? ORDER BY id", (id_cliente,))]
+            if itens[:len(gravados)] == gravados:
+                # Lista igual ou só com itens novos no fim: as linhas (e seus ids) ficam como estão
+                itens = itens[len(gravados):]
+            else:
+                conn.execute(f"DELETE FROM {tabela} WHERE cliente_id=?", (id_cliente,))
+        for item in itens:
+            _inserir_filho(conn, tabela, id_cliente, item)
+    return id_cliente
+
+
+def _inserir_filho(conn, tabela, id_cliente, item):
+    # Anexar ao histórico também conta como alteração do cliente
+    conn.execute("UPDATE clientes SET versao=versao+1 WHERE id=?", (id_cliente,))
+    if id_cliente is not None:
+        marcar_alteracao("clientes", id_cliente)
+    # Datas sempre em ISO, mesmo que venham no formato antigo
+    data = str(item.get("data", "") or "")
+    data = (data_hora_iso(data) if tabela == "vendas" else dia_iso(data)) or data
+    if data != item.get("data", ""):
+        item = {**item, "data": data}
+    total = float(item.get("total", item.get("valor_total", 0)) or 0)
+    if tabela == "receitas":
+        cur = conn.execute(
+            "INSERT INTO receitas (cliente_id, data, data_exame, dados) VALUES (?, ?, ?, ?)",
+            (id_cliente, data, dia_iso(data), _json(item)),
+        )
+    elif tabela == "vendas":
+        registro = {k: v for k, v in item.items() if k != "id"}
+        cur = conn.execute(
+            "INSERT INTO vendas (cliente_id, data, total, pagamento, vendedor, dados) VALUES (?, ?, ?, ?, ?, ?)",
+            (id_cliente, data, total, _forma_pagamento(item.get("pagamento", "")), str(item.get("vendedor", "")), _json(registro)),
+        )
+    else:
+        cur = conn.execute(
+            f"INSERT INTO {tabela} (cliente_id, data, total, dados) VALUES (?, ?, ?, ?)",
+            (id_cliente, data, total, _json(item)),
+        )
+    return cur.lastrowid
+
+
+def _filtro_ids(coluna, ids):
+    """Trecho WHERE para ler só alguns registros (ou todos, se ids for None)"""
+    if ids is None:
+        return "", ()
+    ids = tuple(ids)
+    return f" AND {coluna} IN ({','.join('?' * len(ids))})", ids
+
+
+def _ler_clientes(ids=None):
+    clientes = []
+    por_id = {}
+    filtro_cliente, parametros = _filtro_ids("id", ids)
+    filtro_filho, _ = _filtro_ids("cliente_id", ids)
+    with _Leitura(conectar()) as conn:
+        sql = f"SELECT id, versao, dados FROM clientes WHERE 1=1{filtro_cliente} ORDER BY id"
+        for linha in conn.execute(sql, parametros):
+            cliente = {"id": linha["id"]}
+            cliente.update(json.loads(linha["dados"]))
+            cliente["versao"] = linha["versao"]
+            for chave in LISTAS_CLIENTE:
+                cliente[chave] = []
+            clientes.append(cliente)
+            por_id[linha["id"]] = cliente
+
+        for chave, tabela in LISTAS_CLIENTE.items():
+            sql = f"SELECT id, cliente_id, dados FROM {tabela} WHERE cliente_id IS NOT NULL{filtro_filho} ORDER BY id"
+            for linha in conn.execute(sql, parametros):
+                cliente = por_id.get(linha["cliente_id"])
+                if cliente is not None:
+                    item = json.loads(linha["dados"])
+                    if tabela == "vendas":
+                        item["id"] = linha["id"]
+                    cliente[chave].append(item)
+    return clientes
+
+
+def carregar_dados():
+    """Lista de Clientes (com vendas, receitas e orçamentos).
+
+    Os dicts vêm do cache compartilhado: trate-os como somente leitura e
+    grave as mudanças com as funções de inserir/atualizar/excluir.
+    """
+    return list(snapshot("clientes").registros)
+
+
+def inserir_cliente(cliente):
+    """Cadastra um cliente e devolve o id gerado"""
+    with transacao() as conn:
+        return _gravar_cliente(conn, cliente, novo=True)
+
+
+def inserir_clientes(clientes):
+    """Cadastra vários clientes novos numa transação só (importação em lote).
+
+    Os ids são dados aqui, em sequência, numa passada só (sem um INSERT por
+    vez esperando o lastrowid). Listas filhas não entram. Devolve os ids, na ordem.
+    """
+    with transacao() as conn:
+        linha = conn.execute(
+            "SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name='clientes'), 0), "
+            "COALESCE((SELECT MAX(id) FROM clientes), 0)) + 1"
+        ).fetchone()
+        ids = list(range(linha[0], linha[0] + len(clientes)))
+        conn.executemany(
+            "INSERT INTO clientes (id, nome, cpf, whatsapp, nascimento, dados) VALUES (?, ?, ?, ?, ?, ?)",
+            ((id_cliente,) + _colunas_cliente(cliente) for id_cliente, cliente in zip(ids, clientes)),
+        )
+        if len(ids) > LIMITE_REMENDO:
+            marcar_alteracao("clientes")
+        else:
+            for id_cliente in ids:
+                marcar_alteracao("clientes", id_cliente)
+    return ids
+
+
+def alterar_cliente(original, campos):
+    """Grava só `campos` por cima da ficha atual do cliente lido como `original`.
+
+    Se outra sessão gravou no meio (uma venda, outro campo da ficha) a alteração
+    é refeita sobre a versão nova; ConflitoVersao só se ela mexeu nestes campos.
+    """
+    if not campos:
+        return
+    with transacao() as conn:
+        linha = conn.execute("SELECT versao, dados FROM clientes WHERE id=?", (original["id"],)).fetchone()
+        if linha is None:
+            raise ConflitoVersao(f"clientes {original['id']} foi excluído por outra sessão")
+        ficha = json.loads(linha["dados"])
+        if linha["versao"] != original.get("versao") and any(ficha.get(c) != original.get(c) for c in campos):
+            raise ConflitoVersao(f"clientes {original['id']} foi alterado por outra sessão")
+        _gravar_cliente(conn, {**ficha, **campos, "id": original["id"], "versao": linha["versao"]})
+
+
+def excluir_cliente(id_cliente):
+    """Remove o cliente (receitas e orçamentos vão junto)"""
+    with transacao() as conn:
+        conn.execute("DELETE FROM clientes WHERE id=?", (id_cliente,))
+        marcar_alteracao("clientes", id_cliente)
+
+
+# Tabelas cujas linhas pertencem a um cliente (levadas junto quando dois cadastros se unem)
+TABELAS_DO_CLIENTE = ("vendas", "receitas", "orcamentos", "reservas_estoque")
+# Blocos da ficha que vêm inteiros ou não vêm (não mistura rua de um com CEP do outro)
+BLOCOS_INTEIROS = ("endereco", "geo")
+
+
+def _vazio(valor):
+    if isinstance(valor, dict):
+        return not any(not _vazio(v) for v in valor.values())
+    return valor is None or valor == "" or valor == []
+
+
+def _completar_ficha(principal, outro):
+    """Preenche o que está vazio no `principal` com o que houver no `outro` (nunca troca dado)"""
+    for chave, valor in outro.items():
+        atual = principal.get(chave)
+        if _vazio(valor) or (not _vazio(atual) and not isinstance(atual, dict)):
+            continue
+        if isinstance(atual, dict) and isinstance(valor, dict) and chave not in BLOCOS_INTEIROS:
+            _completar_ficha(atual, valor)
+        elif _vazio(atual):
+            principal[chave] = valor
+
+
+def unir_clientes(id_principal, ids_repetidos):
+    """Junta cadastros repetidos no `id_principal`, numa transação só.
+
+    Vendas, receitas, orçamentos e reservas dos repetidos passam para o
+    principal, os campos vazios da ficha principal são completados pelos
+    repetidos (na ordem dada) e os repetidos são excluídos. Levanta
+    ConflitoVersao se algum deles já não existir. Devolve a ficha principal gravada.
+    """
+    ids_repetidos = [i for i in dict.fromkeys(ids_repetidos) if i != id_principal]
+    if not ids_repetidos:
+        raise ValueError("Escolha ao menos um cadastro para unir ao principal")
+    marcas = ",".join("?" * len(ids_repetidos))
+    with transacao() as conn:
+        fichas = {
+            linha["id"]: json.loads(linha["dados"])
+            for linha in conn.execute(f"SELECT id, dados FROM clientes WHERE id IN (?,{marcas})",
+                                      [id_principal] + ids_repetidos)
+        }
+        faltando = [i for i in [id_principal] + ids_repetidos if i not in fichas]
+        if faltando:
+            raise ConflitoVersao(f"clientes {', '.join(map(str, faltando))} já foram unidos ou excluídos por outra sessão")
+        principal = fichas[id_principal]
+        for id_repetido in ids_repetidos:
+            _completar_ficha(principal, fichas[id_repetido])
+        principal["id"] = id_principal
+        for tabela in TABELAS_DO_CLIENTE:
+            conn.execute(f"UPDATE {tabela} SET cliente_id=? WHERE cliente_id IN ({marcas})", [id_principal] + ids_repetidos)
+        _gravar_cliente(conn, principal)
+        conn.execute(f"DELETE FROM clientes WHERE id IN ({marcas})", ids_repetidos)
+        for id_repetido in ids_repetidos:
+            marcar_alteracao("clientes", id_repetido)
+    return principal
+
+
+def gravar_coordenadas(coordenadas):
+    """Grava {id_cliente: {"lat", "lon", "endereco"}} no campo "geo" dos clientes.
+
+    Não muda a versão: a coordenada é derivada do endereço, então não deve
+    dar conflito com quem está editando a ficha ao mesmo tempo.
+    """
+    with transacao() as conn:
+        for id_cliente, geo in coordenadas.items():
+            linha = conn.execute("SELECT dados FROM clientes WHERE id=?", (id_cliente,)).fetchone()
+            if linha is None:
+                continue
+            registro = json.loads(linha["dados"])
+            registro["geo"] = geo
+            conn.execute("UPDATE clientes SET dados=? WHERE id=?", (_json(registro), id_cliente))
+            marcar_alteracao("clientes", id_cliente)
+
+
+def inserir_venda(id_cliente, venda):
+    """Acrescenta uma venda ao livro de vendas (id_cliente pode ser None)"""
+    with transacao() as conn:
+        return _inserir_filho(conn, "vendas", id_cliente, venda)
+
+
+def inserir_receita(id_cliente, receita):
+    """Registra uma receita no prontuário do cliente"""
+    with transacao() as conn:
+        return _inserir_filho(conn, "receitas", id_cliente, receita)
+
+
+def inserir_orcamento(id_cliente, orcamento):
+    """Registra um orçamento no histórico do cliente"""
+    with transacao() as conn:
+        return _inserir_filho(conn, "orcamentos", id_cliente, orcamento)
+
+
+# --- FUNÇÕES DE ESTOQUE ---
+CAMPOS_PRODUTO = ("codigo", "nome", "tipo", "marca", "quantidade", "preco")
+
+# Motivos de movimento no diário do estoque (movimentos_estoque.tipo)
+TIPOS_MOVIMENTO = {
+    "inicial": "Saldo inicial",
+    "entrada": "Entrada (compra/recebimento)",
+    "venda": "Venda",
+    "devolucao": "Devolução de cliente",
+    "ajuste": "Ajuste de inventário",
+    "exclusao": "Produto excluído",
+}
+
+
+def _registrar_movimento(conn, id_produto, quantidade, saldo, tipo, referencia="", usuario=""):
+    if quantidade:
+        conn.execute(
+            "INSERT INTO movimentos_estoque (produto_id, data, tipo, quantidade, saldo, referencia, usuario) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (id_produto, agora_iso(), tipo, int(quantidade), int(saldo), str(referencia or ""), str(usuario or "")),
+        )
+
+
+def _gravar_produto(conn, produto, novo=False, usuario=""):
+    valores = (
+        str(produto.get("codigo", "")),
+        str(produto.get("nome", "")),
+        str(produto.get("tipo", "")),
+        str(produto.get("marca", "") or ""),
+        int(produto.get("quantidade", 0)),
+        float(produto.get("preco", 0)),
+    )
+    quantidade = valores[4]
+    id_produto = produto.get("id")
+    if novo:
+        if id_produto is None:
+            # Mantém a numeração dos produtos a partir de 1000
+            id_produto = conn.execute("SELECT COALESCE(MAX(id), 999) + 1 FROM produtos").fetchone()[0]
+        conn.execute(
+            "INSERT INTO produtos (id, codigo, nome, tipo, marca, quantidade, preco) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (id_produto,) + valores,
+        )
+        _registrar_movimento(conn, id_produto, quantidade, quantidade, "inicial", usuario=usuario)
+    else:
+        antigo = conn.execute("SELECT quantidade FROM produtos WHERE id=?", (id_produto,)).fetchone()
+        sql = "UPDATE produtos SET codigo=?, nome=?, tipo=?, marca=?, quantidade=?, preco=?, versao=versao+1 WHERE id=?"
+        parametros = valores + (id_produto,)
+        if produto.get("versao") is not None:
+            sql += " AND versao=?"
+            parametros += (produto["versao"],)
+        cur = conn.execute(sql, parametros)
+        _conferir_versao(conn, "produtos", id_produto, cur)
+        if cur.rowcount and antigo is not None:
+            # Quantidade digitada na mão = ajuste de inventário
+            _registrar_movimento(conn, id_produto, quantidade - antigo["quantidade"], quantidade, "ajuste", usuario=usuario)
+    marcar_alteracao("produtos", id_produto)
+    return id_produto
+
+
+def _excluir_produto(conn, id_produto, usuario=""):
+    antigo = conn.execute("SELECT quantidade FROM produtos WHERE id=?", (id_produto,)).fetchone()
+    conn.execute("DELETE FROM produtos WHERE id=?", (id_produto,))
+    if antigo is not None:
+        _registrar_movimento(conn, id_produto, -antigo["quantidade"], 0, "exclusao", usuario=usuario)
+    marcar_alteracao("produtos", id_produto)
+
+
+def _ler_produtos(ids=None):
+    filtro, parametros = _filtro_ids("id", ids)
+    sql = f"SELECT id, codigo, nome, tipo, marca, quantidade, preco, versao FROM produtos WHERE 1=1{filtro} ORDER BY id"
+    return [dict(linha) for linha in conectar().execute(sql, parametros)]
+
+
+def carregar_produtos():
+    """Lista de Produtos (Estoque), vinda do cache compartilhado (somente leitura)"""
+    return list(snapshot("produtos").registros)
+
+
+def gravar_produtos_por_codigo(produtos, referencia="", usuario=""):
+    """Insere ou atualiza produtos pelo código (importação em lote), numa transação só.
+
+    O código é comparado sem espaços nas pontas e sem diferença de maiúsculas;
+    se estiver repetido no banco, vale o produto de menor id, e se repetir na
+    lista vale a primeira ocorrência. Novos recebem ids em sequência e mudanças
+    de quantidade entram no diário (inicial/ajuste). Devolve (inseridos, atualizados, iguais).
+    """
+    agora = agora_iso()
+    with transacao() as conn:
+        por_codigo = {}
+        for linha in conn.execute("SELECT id, codigo, nome, tipo, marca, quantidade, preco FROM produtos ORDER BY id DESC"):
+            por_codigo[str(linha["codigo"]).strip().upper()] = dict(linha)
+        proximo = conn.execute("SELECT COALESCE(MAX(id), 999) + 1 FROM produtos").fetchone()[0]
+        novos, mudados, movimentos, vistos = [], [], [], set()
+        iguais = 0
+        for produto in produtos:
+            valores = (
+                str(produto.get("codigo", "")).strip(),
+                str(produto.get("nome", "")),
+                str(produto.get("tipo", "")),
+                str(produto.get("marca", "") or ""),
+                int(produto.get("quantidade", 0)),
+                float(produto.get("preco", 0)),
+            )
+            chave = valores[0].upper()
+            if chave in vistos:
+                continue
+            vistos.add(chave)
+            quantidade = valores[4]
+            atual = por_codigo.get(chave)
+            if atual is None:
+                novos.append((proximo,) + valores)
+                if quantidade:
+                    movimentos.append((proximo, agora, "inicial", quantidade, quantidade, referencia, usuario))
+                proximo += 1
+            elif tuple(atual[c] for c in CAMPOS_PRODUTO) != valores:
+                mudados.append(valores + (atual["id"],))
+                if quantidade != atual["quantidade"]:
+                    movimentos.append((atual["id"], agora, "ajuste", quantidade - atual["quantidade"], quantidade,
+                                       referencia, usuario))
+            else:
+                iguais += 1
+        conn.executemany(
+            "INSERT INTO produtos (id, codigo, nome, tipo, marca, quantidade, preco) VALUES (?, ?, ?, ?, ?, ?, ?)", novos
+        )
+        conn.executemany(
+            "UPDATE produtos SET codigo=?, nome=?, tipo=?, marca=?, quantidade=?, preco=?, versao=versao+1 WHERE id=?",
+            mudados,
+        )
+        conn.executemany(
+            "INSERT INTO movimentos_estoque (produto_id, data, tipo, quantidade, saldo, referencia, usuario) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            movimentos,
+        )
+        for linha in novos:
+            marcar_alteracao("produtos", linha[0])
+        for linha in mudados:
+            marcar_alteracao("produtos", linha[-1])
+    return len(novos), len(mudados), iguais
+
+
+def inserir_produto(produto, usuario=""):
+    """Cadastra um produto e devolve o id gerado"""
+    with transacao() as conn:
+        return _gravar_produto(conn, produto, novo=True, usuario=usuario)
+
+
+def alterar_produto(original, campos, usuario=""):
+    """Grava só `campos` por cima do produto atual lido como `original` (ver alterar_cliente).
+    Mudança na quantidade entra no diário como ajuste."""
+    if not campos:
+        return
+    with transacao() as conn:
+        atual = conn.execute("SELECT * FROM produtos WHERE id=?", (original["id"],)).fetchone()
+        if atual is None:
+            raise ProdutoNaoEncontrado(f"Produto {original['id']} não encontrado")
+        atual = dict(atual)
+        if atual["versao"] != original.get("versao") and any(atual[c] != original.get(c) for c in campos):
+            raise ConflitoVersao(f"produtos {original['id']} foi alterado por outra sessão")
+        _gravar_produto(conn, {**atual, **campos}, usuario=usuario)
+
+
+def excluir_produto(id_produto, usuario=""):
+    """Remove um produto do estoque"""
+    with transacao() as conn:
+        _excluir_produto(conn, id_produto, usuario)
+
+
+def movimentar_estoque(itens, tipo, referencia="", usuario=""):
+    """Soma (ou tira) peças do estoque e registra no diário. `itens` é uma lista de
+    (id_produto, quantidade), com quantidade negativa para saída.
+
+    A conta é feita no próprio UPDATE, então duas sessões simultâneas não
+    se sobrescrevem; se alguma saída deixar o estoque negativo (EstoqueInsuficiente) ou o produto
+    não existir (ProdutoNaoEncontrado) nada é gravado.
+    """
+    if tipo not in TIPOS_MOVIMENTO:
+        raise ValueError(f"Tipo de movimento inválido: {tipo}")
+    # Um UPDATE por produto, mesmo que ele venha em mais de uma linha
+    por_produto = {}
+    for id_produto, qtd in itens:
+        por_produto[id_produto] = por_produto.get(id_produto, 0) + int(qtd)
+    with transacao() as conn:
+        for id_produto, qtd in por_produto.items():
+            if not qtd:
+                continue
+            linha = conn.execute(
+                "UPDATE produtos SET quantidade = quantidade + ?, versao = versao + 1 "
+                "WHERE id=? AND quantidade + ? >= 0 RETURNING quantidade",
+                (qtd, id_produto, qtd),
+            ).fetchone()
+            if linha is None:
+                if conn.execute("SELECT 1 FROM produtos WHERE id=?", (id_produto,)).fetchone() is None:
+                    raise ProdutoNaoEncontrado(f"Produto {id_produto} não encontrado")
+                raise EstoqueInsuficiente(f"Estoque insuficiente para o produto {id_produto}")
+            _registrar_movimento(conn, id_produto, qtd, linha["quantidade"], tipo, referencia, usuario)
+            marcar_alteracao("produtos", id_produto)
+
+
+def baixar_estoque(itens, referencia="", usuario=""):
+    """Dá baixa de uma venda. `itens` é uma lista de (id_produto, quantidade)."""
+    movimentar_estoque([(id_produto, -int(qtd)) for id_produto, qtd in itens], "venda", referencia, usuario)
+
+
+# --- FUNÇÕES DE USUÁRIOS ---
+def _gravar_usuario(conn, usuario):
+    conn.execute(
+        "INSERT OR REPLACE INTO usuarios (usuario, senha, nome, perfil) VALUES (?, ?, ?, ?)",
+        (str(usuario["usuario"]), str(usuario["senha"]), usuario.get("nome", ""), usuario.get("perfil", "vendedor")),
+    )
+
+
+def carregar_usuarios():
+    """Lê os Usuários do sistema"""
+    conn = conectar()
+    sql = "SELECT usuario, senha, nome, perfil FROM usuarios ORDER BY rowid"
+    return [dict(linha) for linha in conn.execute(sql)]
+
+
+def salvar_usuarios(lista_usuarios):
+    """Salva a lista de Usuários"""
+    with transacao() as conn:
+        conn.execute("DELETE FROM usuarios")
+        for usuario in lista_usuarios:
+            _gravar_usuario(conn, usuario)
@@ -0,0 +1,81 @@
+from datetime import date, datetime
+
+# Datas gravadas sempre em ISO: dia 'AAAA-MM-DD', data e hora 'AAAA-MM-DDTHH:MM:SS'.
+# Texto ISO ordena certo e é lido por date.fromisoformat (rápido, formato fixo).
+# Os formatos antigos (DD/MM/AAAA ...) só são aceitos na entrada: migração e importação.
+
+FORMATO_DIA = "%Y-%m-%d"
+FORMATO_DATA_HORA = "%Y-%m-%dT%H:%M:%S"
+
+_FORMATOS_ANTIGOS = ("%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d")
+
+
+# --- ENTRADA (qualquer formato conhecido -> ISO) ---
+def interpretar(texto):
+    """datetime de um texto em ISO ou num dos formatos antigos, ou None"""
+    texto = str(texto or "").strip()
+    if not texto:
+        return None
+    try:
+        return datetime.fromisoformat(texto)
+    except ValueError:
+        pass
+    for formato in _FORMATOS_ANTIGOS:
+        try:
+            return datetime.strptime(texto, formato)
+        except ValueError:
+            continue
+    return None
+
+
+def dia_iso(texto):
+    """'AAAA-MM-DD' de qualquer formato aceito ('' se não for uma data válida)"""
+    if isinstance(texto, date):
+        return texto.strftime(FORMATO_DIA)
+    valor = interpretar(texto)
+    return valor.strftime(FORMATO_DIA) if valor else ""
+
+
+def data_hora_iso(texto):
+    """'AAAA-MM-DDTHH:MM:SS' de qualquer formato aceito ('' se não for uma data válida)"""
+    if isinstance(texto, datetime):
+        return texto.strftime(FORMATO_DATA_HORA)
+    valor = interpretar(texto)
+    return valor.strftime(FORMATO_DATA_HORA) if valor else ""
+
+
+def hoje_iso():
+    return date.today().strftime(FORMATO_DIA)
+
+
+def agora_iso():
+    return datetime.now().strftime(FORMATO_DATA_HORA)
+
+
+# --- LEITURA (valores já gravados em ISO) ---
+def para_dia(iso):
+    """date de um texto ISO (com ou sem hora), ou None"""
+    try:
+        return date.fromisoformat(str(iso or "")[:10])
+    except ValueError:
+        return None
+
+
+def formatar_br(iso, com_hora=False):
+    """'AAAA-MM-DD[THH:MM...]' -> 'DD/MM/AAAA[ HH:MM]' sem interpretar a data; '-' se vazio"""
+    iso = str(iso or "")
+    if len(iso) < 10 or iso[4] != "-" or iso[7] != "-":
+        return iso or "-"
+    texto = f"{iso[8:10]}/{iso[5:7]}/{iso[:4]}"
+    if com_hora and len(iso) >= 16:
+        texto += f" {iso[11:16]}"
+    return texto
+
+
+def idade(nascimento, hoje=None):
+    """Idade em anos completos a partir do nascimento em ISO, ou None"""
+    nasc = para_dia(nascimento)
+    if nasc is None:
+        return None
+    hoje = hoje or date.today()
+    return hoje.year - nasc.year - ((hoje.month, hoje.day) < (nasc.month, nasc.day))
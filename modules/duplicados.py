@@ -0,0 +1,117 @@
+import sys
+import time
+from itertools import combinations
+from modules import dados
+from modules.busca import tokenizar, trigramas
+from modules.cliente import normalizar_cpf, normalizar_whatsapp, somente_digitos
+
+# Cadastros repetidos do mesmo cliente (digitado de novo no PDV, importado duas
+# vezes...). Comparar todos com todos seria n² pares; em vez disso cada cliente
+# gera algumas chaves de bloco (CPF, final do telefone, primeiro + último nome,
+# primeiro nome + nascimento) e só quem divide uma chave é comparado.
+#
+# A nota do par (0 a 1) soma os sinais: nome parecido (trigramas em comum),
+# mesmo CPF, telefone em comum e mesmo nascimento. CPFs diferentes descartam o par.
+
+MINIMO_SUGESTAO = 0.6
+LIMITE_BLOCO = 50        # chave com mais clientes que isso é comum demais para indicar repetição
+DIGITOS_TELEFONE = 8     # compara o final: '27 9999-0000', '(27) 99999-0000' e '+55 ...' batem
+PALAVRAS_IGNORADAS = {"da", "de", "do", "das", "dos", "e"}
+
+PESO_NOME = 0.45
+PESO_CPF = 0.35
+PESO_TELEFONE = 0.25
+PESO_NASCIMENTO = 0.15
+PENALIDADE_NASCIMENTO = 0.2  # as duas fichas têm nascimento e ele é diferente
+
+
+# --- PERFIL DE COMPARAÇÃO ---
+def _perfil(cliente):
+    """(nome normalizado, trigramas do nome, cpf, telefones, nascimento)"""
+    tokens = [t for t in tokenizar(cliente.get("nome")) if t not in PALAVRAS_IGNORADAS]
+    nome = " ".join(tokens)
+    contato = cliente.get("contato") or {}
+    telefones = set()
+    for numero in (normalizar_whatsapp(contato.get("whatsapp")), somente_digitos(contato.get("telefone"))):
+        if len(numero) >= DIGITOS_TELEFONE:
+            telefones.add(numero[-DIGITOS_TELEFONE:])
+    return nome, trigramas(nome), normalizar_cpf(cliente.get("cpf")), telefones, str(cliente.get("nascimento") or "")[:10]
+
+
+def _chaves(perfil):
+    nome, _, cpf, telefones, nascimento = perfil
+    chaves = [f"t:{t}" for t in telefones]
+    if cpf:
+        chaves.append(f"c:{cpf}")
+    tokens = nome.split()
+    if len(tokens) >= 2:
+        chaves.append(f"n:{tokens[0]} {tokens[-1]}")
+    if tokens and nascimento:
+        chaves.append(f"d:{tokens[0]} {nascimento}")
+    return chaves
+
+
+def pontuar(perfil_a, perfil_b):
+    """(nota de 0 a 1, motivos) de dois perfis serem o mesmo cliente"""
+    nome_a, tri_a, cpf_a, tel_a, nasc_a = perfil_a
+    nome_b, tri_b, cpf_b, tel_b, nasc_b = perfil_b
+    if cpf_a and cpf_b and cpf_a != cpf_b:
+        return 0.0, []
+    motivos = []
+    nome = 2 * len(tri_a & tri_b) / (len(tri_a) + len(tri_b)) if tri_a and tri_b else 0.0
+    nota = PESO_NOME * nome
+    if nome >= 0.99:
+        motivos.append("mesmo nome")
+    elif nome >= 0.6:
+        motivos.append("nome parecido")
+    if cpf_a and cpf_a == cpf_b:
+        nota += PESO_CPF
+        motivos.append("mesmo CPF")
+    if tel_a & tel_b:
+        nota += PESO_TELEFONE
+        motivos.append("mesmo telefone")
+    if nasc_a and nasc_b:
+        if nasc_a == nasc_b:
+            nota += PESO_NASCIMENTO
+            motivos.append("mesmo nascimento")
+        else:
+            nota -= PENALIDADE_NASCIMENTO
+    return round(min(max(nota, 0.0), 1.0), 3), motivos
+
+
+# --- BUSCA ---
+def sugestoes(minimo=MINIMO_SUGESTAO, clientes=None):
+    """Pares de cadastros que parecem o mesmo cliente, da nota maior para a menor.
+
+    Cada sugestão: {"ids": (menor id, maior id), "nota", "motivos"}.
+    `clientes` padrão = todos (snapshot compartilhado).
+    """
+    if clientes is None:
+        clientes = dados.snapshot("clientes").registros
+    perfis, blocos = {}, {}
+    for cliente in clientes:
+        perfil = perfis[cliente["id"]] = _perfil(cliente)
+        for chave in _chaves(perfil):
+            blocos.setdefault(chave, []).append(cliente["id"])
+
+    pares = set()
+    for ids in blocos.values():
+        if 1 < len(ids) <= LIMITE_BLOCO:
+            pares.update(combinations(sorted(ids), 2))
+
+    resultado = []
+    for id_a, id_b in pares:
+        nota, motivos = pontuar(perfis[id_a], perfis[id_b])
+        if nota >= minimo:
+            resultado.append({"ids": (id_a, id_b), "nota": nota, "motivos": motivos})
+    resultado.sort(key=lambda s: (-s["nota"], s["ids"]))
+    return resultado
+
+
+# Uso: python -m modules.duplicados [nota mínima]
+if __name__ == "__main__":
+    inicio = time.perf_counter()
+    achados = sugestoes(float(sys.argv[1]) if len(sys.argv) > 1 else MINIMO_SUGESTAO)
+    print(f"{len(achados)} pares em {time.perf_counter() - inicio:.2f} s")
+    for achado in achados[:30]:
+        print(f"  {achado['ids'][0]} ~ {achado['ids'][1]}  {achado['nota']:.2f}  {', '.join(achado['motivos'])}")
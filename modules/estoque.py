@@ -0,0 +1,275 @@
+import sys
+from datetime import date, timedelta
+from modules import dados
+from modules.datas import agora_iso, para_dia
+
+# Diário do estoque (tabela movimentos_estoque, gravada em modules/dados.py a cada
+# venda, entrada, ajuste ...) e o que se consulta nele: movimentos de um período,
+# estoque numa data passada e reservas de orçamento.
+#
+# Cada movimento guarda o saldo do produto logo depois dele, então "estoque do
+# produto X no dia D" é uma busca no índice (produto, data). Para o catálogo
+# inteiro, o fechamento do mês anterior (fechamentos_estoque, meses_fechados) é o ponto de partida
+# e só os movimentos do mês corrente são lidos.
+
+DIAS_RESERVA = 7
+
+
+def _dia(valor):
+    dia = valor if isinstance(valor, date) else para_dia(valor)
+    if dia is None:
+        raise ValueError(f"Data inválida: {valor}")
+    return dia
+
+
+def _limite(dia):
+    """Início do dia seguinte em ISO: data < limite pega o dia inteiro"""
+    return (_dia(dia) + timedelta(days=1)).isoformat()
+
+
+# --- DIÁRIO ---
+def movimentos(desde=None, ate=None, id_produto=None, tipo=None, limite=None):
+    """Movimentos do diário, dos mais novos para os mais antigos.
+
+    `desde`/`ate` (date ou 'AAAA-MM-DD') incluem o dia inteiro.
+    """
+    filtros, parametros = [], []
+    if id_produto is not None:
+        filtros.append("produto_id=?")
+        parametros.append(id_produto)
+    if desde:
+        filtros.append("data>=?")
+        parametros.append(_dia(desde).isoformat())
+    if ate:
+        filtros.append("data<?")
+        parametros.append(_limite(ate))
+    if tipo:
+        filtros.append("tipo=?")
+        parametros.append(tipo)
+    sql = "SELECT * FROM movimentos_estoque"
+    if filtros:
+        sql += " WHERE " + " AND ".join(filtros)
+    sql += " ORDER BY data DESC, id DESC"
+    if limite:
+        sql += " LIMIT ?"
+        parametros.append(int(limite))
+    return [dict(linha) for linha in dados.conectar().execute(sql, parametros)]
+
+
+def resumo_movimentos(desde=None, ate=None):
+    """{tipo: {"movimentos", "entrou", "saiu"}} do período, somado no banco"""
+    sql = ("SELECT tipo, COUNT(*) AS n, SUM(MAX(quantidade, 0)) AS entrou, SUM(MIN(quantidade, 0)) AS saiu "
+           "FROM movimentos_estoque WHERE data>=? AND data<? GROUP BY tipo")
+    inicio = _dia(desde).isoformat() if desde else ""
+    fim = _limite(ate) if ate else "9999"
+    return {
+        linha["tipo"]: {"movimentos": linha["n"], "entrou": linha["entrou"], "saiu": -linha["saiu"]}
+        for linha in dados.conectar().execute(sql, (inicio, fim))
+    }
+
+
+# --- ESTOQUE EM UMA DATA ---
+def estoque_do_produto_em(id_produto, dia):
+    """Peças do produto no fim do `dia` (0 antes do primeiro movimento)"""
+    linha = dados.conectar().execute(
+        "SELECT saldo FROM movimentos_estoque WHERE produto_id=? AND data<? ORDER BY data DESC, id DESC LIMIT 1",
+        (id_produto, _limite(dia)),
+    ).fetchone()
+    return linha["saldo"] if linha else 0
+
+
+def _primeiro_do_mes_seguinte(mes):
+    ano, numero = int(mes[:4]), int(mes[5:7])
+    return date(ano + numero // 12, numero % 12 + 1, 1)
+
+
+def _ultimos_saldos(conn, inicio, fim):
+    """{produto: saldo do último movimento com inicio <= data < fim}"""
+    return {
+        linha["produto_id"]: linha["saldo"]
+        for linha in conn.execute(
+            "SELECT produto_id, saldo FROM movimentos_estoque WHERE id IN ("
+            "SELECT MAX(id) FROM movimentos_estoque WHERE data>=? AND data<? GROUP BY produto_id)",
+            (inicio, fim),
+        )
+    }
+
+
+def _fechamento(conn, mes):
+    return {linha["produto_id"]: linha["quantidade"] for linha in conn.execute(
+        "SELECT produto_id, quantidade FROM fechamentos_estoque WHERE mes=?", (mes,))}
+
+
+def fechar_meses(hoje=None):
+    """Grava o fechamento de cada mês já terminado que ainda não tem. Devolve quantos fechou.
+
+    Fechamento do mês = fechamento anterior + último saldo de quem se mexeu no mês
+    (produtos zerados só aparecem no mês em que zeraram).
+    """
+    mes_atual = (hoje or date.today()).isoformat()[:7]
+    with dados.transacao() as conn:
+        ultimo = conn.execute("SELECT MAX(mes) FROM meses_fechados").fetchone()[0]
+        if ultimo is None:
+            primeiro = conn.execute("SELECT MIN(data) FROM movimentos_estoque").fetchone()[0]
+            if primeiro is None:
+                return 0
+            mes, anterior = primeiro[:7], {}
+        else:
+            mes, anterior = _primeiro_do_mes_seguinte(ultimo).isoformat()[:7], _fechamento(conn, ultimo)
+        fechados = 0
+        while mes < mes_atual:
+            fim = _primeiro_do_mes_seguinte(mes).isoformat()
+            mexidos = _ultimos_saldos(conn, f"{mes}-01", fim)
+            saldos = {i: q for i, q in anterior.items() if q}
+            saldos.update(mexidos)
+            conn.executemany(
+                "INSERT OR REPLACE INTO fechamentos_estoque (mes, produto_id, quantidade) VALUES (?, ?, ?)",
+                [(mes, i, q) for i, q in saldos.items()],
+            )
+            conn.execute("INSERT OR IGNORE INTO meses_fechados (mes) VALUES (?)", (mes,))
+            anterior, mes, fechados = saldos, fim[:7], fechados + 1
+        return fechados
+
+
+def _falta_fechar(conn, hoje=None):
+    """Só leitura: há mês terminado, com movimento, ainda sem fechamento?"""
+    inicio_mes = (hoje or date.today()).replace(day=1)
+    ultimo = conn.execute("SELECT MAX(mes) FROM meses_fechados").fetchone()[0]
+    if ultimo is None:
+        primeiro = conn.execute("SELECT MIN(data) FROM movimentos_estoque").fetchone()[0]
+        return primeiro is not None and primeiro < inicio_mes.isoformat()
+    return _primeiro_do_mes_seguinte(ultimo) < inicio_mes
+
+
+def estoque_em(dia):
+    """{id do produto: peças} do catálogo inteiro no fim do `dia` (só os diferentes de zero)"""
+    dia = _dia(dia)
+    conn = dados.conectar()
+    # A consulta é de leitura: a transação de escrita só abre se faltar fechar algum mês
+    if _falta_fechar(conn):
+        fechar_meses()
+    linha = conn.execute(
+        "SELECT MAX(mes) FROM meses_fechados WHERE mes<?", (dia.isoformat()[:7],)
+    ).fetchone()
+    mes = linha[0]
+    saldos = _fechamento(conn, mes) if mes else {}
+    inicio = _primeiro_do_mes_seguinte(mes).isoformat() if mes else ""
+    saldos.update(_ultimos_saldos(conn, inicio, _limite(dia)))
+    return {i: q for i, q in saldos.items() if q}
+
+
+# --- RESERVAS DE ORÇAMENTO ---
+def _reservas_ativas(conn, excluir_cliente=None):
+    sql = "SELECT produto_id, SUM(quantidade) AS qtd FROM reservas_estoque WHERE situacao='ativa' AND expira_em>?"
+    parametros = [agora_iso()]
+    if excluir_cliente is not None:
+        sql += " AND (cliente_id IS NULL OR cliente_id!=?)"
+        parametros.append(excluir_cliente)
+    sql += " GROUP BY produto_id"
+    return {linha["produto_id"]: linha["qtd"] for linha in conn.execute(sql, parametros)}
+
+
+def reservas_ativas(excluir_cliente=None):
+    """{id do produto: peças reservadas e ainda no prazo} (sem as do `excluir_cliente`)"""
+    return _reservas_ativas(dados.conectar(), excluir_cliente)
+
+
+def reservar(itens, id_cliente, referencia="", dias=DIAS_RESERVA):
+    """Segura peças para um orçamento, sem mexer no estoque. `itens` é [(id_produto, qtd)].
+
+    Reserva só o que está livre (estoque - outras reservas). Devolve [(id_produto, reservado)].
+    """
+    agora = agora_iso()
+    expira = f"{(date.today() + timedelta(days=int(dias))).isoformat()}T23:59:59"
+    reservados = []
+    with dados.transacao() as conn:
+        ocupadas = _reservas_ativas(conn)
+        for id_produto, qtd in itens:
+            linha = conn.execute("SELECT quantidade FROM produtos WHERE id=?", (id_produto,)).fetchone()
+            livre = (linha["quantidade"] if linha else 0) - ocupadas.get(id_produto, 0)
+            quantidade = min(int(qtd), livre)
+            if quantidade <= 0:
+                continue
+            conn.execute(
+                "INSERT INTO reservas_estoque (produto_id, quantidade, cliente_id, referencia, criada_em, expira_em) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (id_produto, quantidade, id_cliente, str(referencia or ""), agora, expira),
+            )
+            ocupadas[id_produto] = ocupadas.get(id_produto, 0) + quantidade
+            reservados.append((id_produto, quantidade))
+    return reservados
+
+
+def registrar_orcamento(id_cliente, orcamento, reservar_itens=False, dias=DIAS_RESERVA):
+    """Grava o orçamento no histórico do cliente e, se pedido, reserva as peças na mesma
+    transação (um erro na reserva não deixa o orçamento gravado sem ela).
+
+    Devolve (id do orçamento, [(id_produto, reservado)]).
+    """
+    reservados = []
+    with dados.transacao():
+        id_orcamento = dados.inserir_orcamento(id_cliente, orcamento)
+        if reservar_itens:
+            reservados = reservar([(i["produto_id"], i["quantidade"]) for i in orcamento["itens"]],
+                                  id_cliente, referencia=f"orçamento {id_orcamento}", dias=dias)
+    return id_orcamento, reservados
+
+
+def listar_reservas(id_cliente=None, somente_ativas=True):
+    sql = "SELECT * FROM reservas_estoque WHERE 1=1"
+    parametros = []
+    if somente_ativas:
+        sql += " AND situacao='ativa' AND expira_em>?"
+        parametros.append(agora_iso())
+    if id_cliente is not None:
+        sql += " AND cliente_id=?"
+        parametros.append(id_cliente)
+    sql += " ORDER BY id DESC"
+    return [dict(linha) for linha in dados.conectar().execute(sql, parametros)]
+
+
+def cancelar_reserva(id_reserva):
+    with dados.transacao() as conn:
+        conn.execute("UPDATE reservas_estoque SET situacao='cancelada' WHERE id=? AND situacao='ativa'", (id_reserva,))
+
+
+def baixar_reservas(id_cliente, itens):
+    """Consome as reservas do cliente com o que foi vendido. `itens` é [(id_produto, qtd vendida)].
+
+    Gasta as reservas mais antigas primeiro; a que sobrar em parte é dividida:
+    o vendido vira uma reserva 'baixada' e o resto continua 'ativa'.
+    """
+    agora = agora_iso()
+    with dados.transacao() as conn:
+        for id_produto, qtd in itens:
+            restante = int(qtd)
+            reservas = conn.execute(
+                "SELECT * FROM reservas_estoque WHERE situacao='ativa' AND expira_em>? AND cliente_id=? "
+                "AND produto_id=? ORDER BY id",
+                (agora, id_cliente, id_produto),
+            ).fetchall()
+            for reserva in reservas:
+                if restante <= 0:
+                    break
+                if reserva["quantidade"] <= restante:
+                    conn.execute("UPDATE reservas_estoque SET situacao='baixada' WHERE id=?", (reserva["id"],))
+                    restante -= reserva["quantidade"]
+                    continue
+                conn.execute("UPDATE reservas_estoque SET quantidade=quantidade-? WHERE id=?", (restante, reserva["id"]))
+                conn.execute(
+                    "INSERT INTO reservas_estoque (produto_id, quantidade, cliente_id, referencia, criada_em, expira_em, situacao) "
+                    "VALUES (?, ?, ?, ?, ?, ?, 'baixada')",
+                    (id_produto, restante, id_cliente, reserva["referencia"], reserva["criada_em"], reserva["expira_em"]),
+                )
+                restante = 0
+
+
+# Uso: python -m modules.estoque fechar | em AAAA-MM-DD
+if __name__ == "__main__":
+    if sys.argv[1:] == ["fechar"]:
+        print("Meses fechados:", fechar_meses())
+    elif len(sys.argv) == 3 and sys.argv[1] == "em":
+        for id_produto, quantidade in sorted(estoque_em(sys.argv[2]).items()):
+            print(id_produto, quantidade)
+    else:
+        print("Uso: python -m modules.estoque fechar | em AAAA-MM-DD")
@@ -0,0 +1,187 @@
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from modules import dados
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # opcional: sem o Pillow a foto é guardada como veio, sem miniaturas
+    Image = None
+
+# Fotos dos clientes guardadas pelo conteúdo: dados/fotos/<hash>.jpg, já reduzidas.
+# Miniaturas em tamanhos fixos ficam em dados/fotos/.miniaturas (fora dos backups,
+# pois são refeitas a partir da foto) e as mais pedidas ficam na memória.
+
+PASTA_FOTOS = os.path.join(dados.PASTA_DADOS, "fotos")
+PASTA_MINIATURAS = os.path.join(PASTA_FOTOS, ".miniaturas")
+LADO_MAXIMO = 1280                   # maior lado da foto guardada (px)
+QUALIDADE_JPEG = 85
+TAMANHOS = {"lista": 96, "perfil": 256}
+LIMITE_MEMORIA = 32 * 1024 * 1024    # bytes de miniaturas na memória do processo
+
+_trava = threading.Lock()
+_memoria = OrderedDict()             # (nome, tamanho) -> bytes, na ordem de uso
+_bytes_memoria = 0
+
+
+# --- GRAVAÇÃO ---
+def _gravar_atomico(caminho, conteudo):
+    """Temporário + os.replace: quem lê (ou um backup em andamento) nunca vê a foto pela metade"""
+    pasta = os.path.dirname(caminho)
+    os.makedirs(pasta, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(prefix=".tmp_", dir=pasta)
+    try:
+        with os.fdopen(fd, "wb") as saida:
+            saida.write(conteudo)
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+def _extensao_original(conteudo):
+    return ".png" if conteudo[:8] == b"\x89PNG\r\n\x1a\n" else ".jpg"
+
+
+def _reduzir(conteudo, lado):
+    """JPEG com o maior lado <= `lado`, girado conforme o EXIF do celular"""
+    imagem = Image.open(io.BytesIO(conteudo))
+    imagem.draft("RGB", (lado, lado))  # JPEG: decodifica já reduzido (bem mais rápido)
+    imagem = ImageOps.exif_transpose(imagem)
+    if imagem.mode != "RGB":
+        imagem = imagem.convert("RGB")
+    imagem.thumbnail((lado, lado), Image.LANCZOS)
+    saida = io.BytesIO()
+    imagem.save(saida, "JPEG", quality=QUALIDADE_JPEG, optimize=True, progressive=True)
+    return saida.getvalue()
+
+
+def salvar_foto(conteudo):
+    """Reduz, recodifica e guarda a foto enviada. Devolve o nome do arquivo (campo "foto").
+
+    A mesma foto enviada duas vezes (ou para dois clientes) vira um arquivo só.
+    """
+    if Image is not None:
+        try:
+            conteudo, extensao = _reduzir(conteudo, LADO_MAXIMO), ".jpg"
+        except (OSError, ValueError) as erro:
+            raise ValueError("Arquivo de imagem inválido") from erro
+    else:
+        extensao = _extensao_original(conteudo)
+    nome = hashlib.sha256(conteudo).hexdigest()[:32] + extensao
+    caminho = os.path.join(PASTA_FOTOS, nome)
+    if not os.path.exists(caminho):
+        _gravar_atomico(caminho, conteudo)
+    return nome
+
+
+# --- LEITURA (miniaturas) ---
+def _lembrar(chave, conteudo):
+    global _bytes_memoria
+    with _trava:
+        if chave in _memoria:
+            return
+        _memoria[chave] = conteudo
+        _bytes_memoria += len(conteudo)
+        while _bytes_memoria > LIMITE_MEMORIA and len(_memoria) > 1:
+            _, antigo = _memoria.popitem(last=False)
+            _bytes_memoria -= len(antigo)
+
+
+def _esquecer(nome):
+    global _bytes_memoria
+    with _trava:
+        for chave in [c for c in _memoria if c[0] == nome]:
+            _bytes_memoria -= len(_memoria.pop(chave))
+
+
+def _caminho_miniatura(nome, lado):
+    return os.path.join(PASTA_MINIATURAS, f"{os.path.splitext(nome)[0]}_{lado}.jpg")
+
+
+def miniatura(nome, tamanho="perfil"):
+    """Bytes da miniatura da foto (memória -> disco -> gerada na hora), ou None se não houver foto.
+
+    Sem o Pillow devolve a própria foto.
+    """
+    if not nome or os.path.basename(nome) != nome:
+        return None
+    chave = (nome, tamanho)
+    with _trava:
+        if chave in _memoria:
+            _memoria.move_to_end(chave)
+            return _memoria[chave]
+
+    original = os.path.join(PASTA_FOTOS, nome)
+    if Image is None:
+        caminho = original
+    else:
+        caminho = _caminho_miniatura(nome, TAMANHOS[tamanho])
+        if not os.path.exists(caminho):
+            if not os.path.exists(original):
+                return None
+            with open(original, "rb") as f:
+                try:
+                    reduzida = _reduzir(f.read(), TAMANHOS[tamanho])
+                except (OSError, ValueError):
+                    return None
+            _gravar_atomico(caminho, reduzida)
+    try:
+        with open(caminho, "rb") as f:
+            conteudo = f.read()
+    except OSError:
+        return None
+    _lembrar(chave, conteudo)
+    return conteudo
+
+
+# --- LIMPEZA ---
+def _fotos_em_uso():
+    return {c.get("foto") for c in dados.snapshot("clientes").registros if c.get("foto")}
+
+
+def _apagar(nome):
+    _esquecer(nome)
+    for caminho in [os.path.join(PASTA_FOTOS, nome)] + [_caminho_miniatura(nome, lado) for lado in TAMANHOS.values()]:
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass
+
+
+def descartar_se_orfa(nome):
+    """Apaga a foto (e as miniaturas) se nenhum cliente usa mais. Devolve True se apagou."""
+    if not nome or os.path.basename(nome) != nome or nome in _fotos_em_uso():
+        return False
+    _apagar(nome)
+    return True
+
+
+def limpar_orfas():
+    """Apaga todas as fotos e miniaturas que nenhum cliente usa. Devolve quantas fotos saíram."""
+    if not os.path.isdir(PASTA_FOTOS):
+        return 0
+    em_uso = _fotos_em_uso()
+    orfas = [n for n in os.listdir(PASTA_FOTOS)
+             if not n.startswith(".") and os.path.isfile(os.path.join(PASTA_FOTOS, n)) and n not in em_uso]
+    for nome in orfas:
+        _apagar(nome)
+    if os.path.isdir(PASTA_MINIATURAS):
+        nomes_base = {os.path.splitext(n)[0] for n in em_uso}
+        for nome in os.listdir(PASTA_MINIATURAS):
+            if not nome.startswith(".") and nome.rsplit("_", 1)[0] not in nomes_base:
+                os.remove(os.path.join(PASTA_MINIATURAS, nome))
+    return len(orfas)
+
+
+# Uso: python -m modules.foto limpar
+if __name__ == "__main__":
+    if sys.argv[1:] == ["limpar"]:
+        print("Fotos órfãs apagadas:", limpar_orfas())
+    else:
+        print("Uso: python -m modules.foto limpar")
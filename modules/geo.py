@@ -0,0 +1,232 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from geopy.exc import GeopyError
+from geopy.geocoders import ArcGIS
+from modules.busca import normalizar_texto
+from modules.cliente import listar_clientes
+from modules.dados import conectar, transacao, gravar_coordenadas, snapshot
+
+# Coordenadas dos clientes: cache endereço -> (lat, lon) na tabela `geocodigos`,
+# coordenada gravada na ficha (campo "geo") e um lote em segundo plano para
+# quem ainda não tem. O mapa só lê o que já está gravado (nada de rede ao desenhar).
+
+TIMEOUT = 5                          # segundos por consulta ao ArcGIS
+INTERVALO_MINIMO = 0.25              # entre duas consultas, somando todas as threads
+VALIDADE_NAO_ACHADO = 7 * 24 * 3600  # endereço não encontrado: tenta de novo depois de 7 dias
+LIMITE_MEMORIA = 4096
+THREADS_LOTE = 4
+GRAVAR_A_CADA = 50                   # coordenadas por transação no lote
+
+_trava = threading.Lock()
+_trava_ritmo = threading.Lock()
+_proxima_consulta = 0.0
+_memoria = OrderedDict()             # endereço normalizado -> (lat, lon)
+_geocodificador = None
+_lote = {"rodando": False, "total": 0, "feitos": 0, "achados": 0, "inicio": None, "fim": None}
+_trava_pendentes = threading.Lock()
+_pendentes = {"base": None, "ids": {}}  # id -> endereço de quem está sem coordenada, em dia com `base`
+
+
+# --- ENDEREÇO ---
+def texto_endereco(cliente):
+    """Endereço para geocodificar ('' se não houver); sem rua/cidade, usa o CEP"""
+    end = cliente.get("endereco") or {}
+    partes = [end.get("logradouro"), end.get("numero"), end.get("municipio"), end.get("estado")]
+    partes = [str(p).strip() for p in partes if str(p or "").strip()]
+    if len(", ".join(partes)) > 15:
+        return ", ".join(partes + [end.get("pais") or "Brasil"])
+    cep = str(end.get("cep") or "").strip()
+    return f"{cep}, Brasil" if cep else ""
+
+
+def _normalizar(endereco):
+    return re.sub(r"\s+", " ", normalizar_texto(endereco)).strip()
+
+
+# --- GEOCODIFICAÇÃO COM CACHE ---
+def _esperar_vez():
+    """Espaça as consultas ao serviço (limite de uso), mesmo com várias threads"""
+    global _proxima_consulta
+    with _trava_ritmo:
+        agora = time.monotonic()
+        espera = _proxima_consulta - agora
+        _proxima_consulta = max(agora, _proxima_consulta) + INTERVALO_MINIMO
+    if espera > 0:
+        time.sleep(espera)
+
+
+def _consultar_servico(endereco):
+    """(lat, lon), (None, None) se não achou; levanta GeopyError se o serviço falhou"""
+    global _geocodificador
+    with _trava:
+        if _geocodificador is None:
+            _geocodificador = ArcGIS(timeout=TIMEOUT)
+    _esperar_vez()
+    local = _geocodificador.geocode(endereco)
+    return (local.latitude, local.longitude) if local else (None, None)
+
+
+def _lembrar(chave, coordenada):
+    with _trava:
+        _memoria[chave] = coordenada
+        _memoria.move_to_end(chave)
+        while len(_memoria) > LIMITE_MEMORIA:
+            _memoria.popitem(last=False)
+
+
+def geocodificar(endereco, usar_internet=True):
+    """(lat, lon) do endereço, ou (None, None). Repetições não vão à internet."""
+    chave = _normalizar(endereco)
+    if not chave:
+        return None, None
+    with _trava:
+        if chave in _memoria:
+            _memoria.move_to_end(chave)
+            return _memoria[chave]
+
+    linha = conectar().execute(
+        "SELECT lat, lon, atualizado_em FROM geocodigos WHERE endereco=?", (chave,)
+    ).fetchone()
+    if linha is not None:
+        if linha["lat"] is not None:
+            _lembrar(chave, (linha["lat"], linha["lon"]))
+            return linha["lat"], linha["lon"]
+        if time.time() - linha["atualizado_em"] < VALIDADE_NAO_ACHADO:
+            return None, None
+    if not usar_internet:
+        return None, None
+
+    try:
+        lat, lon = _consultar_servico(endereco)
+    except GeopyError:
+        return None, None  # fora do ar / limite: não guarda, tenta de novo depois
+    with transacao() as db:
+        db.execute(
+            "INSERT OR REPLACE INTO geocodigos (endereco, lat, lon, atualizado_em) VALUES (?, ?, ?, ?)",
+            (chave, lat, lon, time.time()),
+        )
+    if lat is not None:
+        _lembrar(chave, (lat, lon))
+    return lat, lon
+
+
+# --- COORDENADAS DOS CLIENTES ---
+def _geo_em_dia(cliente, endereco):
+    geo = cliente.get("geo")
+    return bool(geo) and geo.get("endereco") == endereco and geo.get("lat") is not None
+
+
+def coordenadas_cliente(cliente, usar_internet=True):
+    """(lat, lon) do cliente: da ficha se o endereço não mudou; senão geocodifica e grava"""
+    endereco = texto_endereco(cliente)
+    if not endereco:
+        return None, None
+    if _geo_em_dia(cliente, endereco):
+        return cliente["geo"]["lat"], cliente["geo"]["lon"]
+    lat, lon = geocodificar(endereco, usar_internet)
+    if lat is not None:
+        gravar_coordenadas({cliente["id"]: {"lat": lat, "lon": lon, "endereco": endereco}})
+    return lat, lon
+
+
+def _sem_coordenada():
+    """{id: endereço} dos pendentes, em dia com o snapshot de clientes.
+
+    Como os índices de modules/cliente.py: só os clientes alterados desde o
+    último snapshot visto têm o endereço montado de novo.
+    """
+    snap = snapshot("clientes")
+    with _trava_pendentes:
+        base = _pendentes["base"]
+        if base is snap.registros:
+            return _pendentes["ids"]
+        alterados = snap.alterados_desde(base) if base is not None else None
+        if alterados is None:
+            ids, revisar = {}, snap.registros
+        else:
+            ids, revisar = dict(_pendentes["ids"]), []
+            for id_cliente in alterados:
+                ids.pop(id_cliente, None)
+                if id_cliente in snap.posicoes:
+                    revisar.append(snap.registros[snap.posicoes[id_cliente]])
+        for cliente in revisar:
+            endereco = texto_endereco(cliente)
+            if endereco and not _geo_em_dia(cliente, endereco):
+                ids[cliente["id"]] = endereco
+        _pendentes.update(base=snap.registros, ids=ids)
+        return ids
+
+
+def clientes_sem_coordenada():
+    """[(id, endereço)] dos clientes com endereço cuja coordenada falta ou ficou velha (endereço mudou)"""
+    return sorted(_sem_coordenada().items())
+
+
+def total_sem_coordenada():
+    """Quantos são os clientes_sem_coordenada(), sem montar a lista (para a tela)"""
+    return len(_sem_coordenada())
+
+
+def pontos_mapa():
+    """Lista de {lat, lon, nome} com as coordenadas já gravadas (sem acessar a rede)"""
+    return [
+        {"lat": c["geo"]["lat"], "lon": c["geo"]["lon"], "nome": c.get("nome", "")}
+        for c in listar_clientes()
+        if c.get("geo") and c["geo"].get("lat") is not None
+    ]
+
+
+# --- LOTE EM SEGUNDO PLANO ---
+def _rodar_lote():
+    buffer = {}
+    try:
+        pendentes = clientes_sem_coordenada()
+        with _trava:
+            _lote["total"] = len(pendentes)
+        # Clientes no mesmo endereço (família, empresa) custam uma consulta só
+        ids_por_endereco = {}
+        for id_cliente, endereco in pendentes:
+            ids_por_endereco.setdefault(endereco, []).append(id_cliente)
+        with ThreadPoolExecutor(max_workers=THREADS_LOTE, thread_name_prefix="geo") as executor:
+            futuros = {executor.submit(geocodificar, endereco): endereco for endereco in ids_por_endereco}
+            for futuro in as_completed(futuros):
+                endereco = futuros[futuro]
+                lat, lon = futuro.result()
+                ids = ids_por_endereco[endereco]
+                with _trava:
+                    _lote["feitos"] += len(ids)
+                    _lote["achados"] += len(ids) if lat is not None else 0
+                if lat is not None:
+                    for id_cliente in ids:
+                        buffer[id_cliente] = {"lat": lat, "lon": lon, "endereco": endereco}
+                if len(buffer) >= GRAVAR_A_CADA:
+                    gravar_coordenadas(buffer)
+                    buffer = {}
+        if buffer:
+            gravar_coordenadas(buffer)
+    finally:
+        with _trava:
+            _lote["rodando"] = False
+            _lote["fim"] = time.time()
+
+
+def iniciar_lote():
+    """Geocodifica em segundo plano todos os clientes sem coordenada.
+
+    Devolve False se já houver um lote rodando. Acompanhe com estado_lote().
+    """
+    with _trava:
+        if _lote["rodando"]:
+            return False
+        _lote.update(rodando=True, total=0, feitos=0, achados=0, inicio=time.time(), fim=None)
+    threading.Thread(target=_rodar_lote, name="geo-lote", daemon=True).start()
+    return True
+
+
+def estado_lote():
+    """Cópia do andamento do lote: rodando, total, feitos, achados, inicio, fim"""
+    with _trava:
+        return dict(_lote)
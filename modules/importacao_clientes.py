@@ -0,0 +1,250 @@
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from modules import dados
+from modules.busca import normalizar_texto
+from modules.campanha import limpar_telefone
+from modules.catalogo import abrir_planilha, blocos_planilha
+from modules.cep import buscar_cep
+from modules.cliente import buscar_por_cpf, buscar_por_whatsapp, normalizar_whatsapp
+from modules.datas import dia_iso
+
+# Importação de clientes em lote (planilha CSV ou XLSX de outro sistema). Mesmo
+# caminho do catálogo: leitura em blocos, normalização e validação por coluna,
+# e os novos entram numa transação só, com os ids dados de uma vez.
+#
+# Cliente que já existe (mesmo CPF ou mesmo WhatsApp, conferido nos índices em
+# memória de modules/cliente.py) ou que se repete no arquivo não entra de novo.
+# Opcionalmente o endereço é completado pelo CEP: cada CEP diferente é consultado
+# uma vez só, várias ao mesmo tempo, passando pelo cache de modules/cep.py.
+
+COLUNAS = ("nome", "cpf", "rg", "nascimento", "telefone", "whatsapp",
+           "cep", "logradouro", "numero", "bairro", "municipio", "estado")
+CAMPOS_ENDERECO = ("logradouro", "bairro", "municipio", "estado")
+CONSULTAS_CEP_SIMULTANEAS = 8
+LIMITE_EXEMPLOS = 1000  # linhas recusadas guardadas no relatório (a contagem é de todas)
+
+# Cabeçalhos aceitos além dos nomes das COLUNAS (já sem acento e em minúsculas)
+APELIDOS = {
+    "cliente": "nome", "nome_completo": "nome",
+    "data_nascimento": "nascimento", "data_de_nascimento": "nascimento", "aniversario": "nascimento",
+    "fone": "telefone", "tel": "telefone", "telefone_fixo": "telefone",
+    "celular": "whatsapp", "zap": "whatsapp", "wpp": "whatsapp",
+    "endereco": "logradouro", "rua": "logradouro",
+    "num": "numero", "n": "numero",
+    "cidade": "municipio",
+    "uf": "estado",
+}
+
+
+def _nome_coluna(cabecalho):
+    nome = normalizar_texto(cabecalho).strip().replace(" ", "_").replace(".", "")
+    return APELIDOS.get(nome, nome)
+
+
+def _digitos(serie):
+    return serie.str.replace(r"\D+", "", regex=True)
+
+
+def _mapear_unicos(serie, funcao):
+    """Aplica `funcao` uma vez por valor diferente (DDD, datas e CEPs se repetem muito)"""
+    return serie.map({valor: funcao(valor) for valor in serie.unique()})
+
+
+def _datas(serie):
+    """Texto -> 'AAAA-MM-DD' ('' se vazio, None se não for data). DD/MM/AAAA e ISO
+    saem direto do pandas; outros formatos passam por dia_iso, uma vez por valor.
+    """
+    data = pd.to_datetime(serie, format="%d/%m/%Y", errors="coerce")
+    data = data.fillna(pd.to_datetime(serie.str[:10], format="%Y-%m-%d", errors="coerce"))
+    iso = data.dt.strftime("%Y-%m-%d").astype(object).where(data.notna(), None)
+    resto = iso.isna() & (serie != "")
+    iso[resto] = _mapear_unicos(serie[resto], lambda d: dia_iso(d) or None)
+    return iso.where(serie != "", "")
+
+
+# --- NORMALIZAÇÃO E VALIDAÇÃO (por coluna, sem laço por linha) ---
+def _normalizar(bloco):
+    """Bloco só com as COLUNAS, já normalizadas, + colunas auxiliares de validação"""
+    bloco = bloco.rename(columns=_nome_coluna)
+    bloco = bloco.loc[:, ~bloco.columns.duplicated()]
+    if "nome" not in bloco.columns:
+        raise ValueError("Coluna obrigatória ausente: nome")
+    if "cpf" not in bloco.columns and "whatsapp" not in bloco.columns:
+        raise ValueError("A planilha precisa de uma coluna de CPF ou de WhatsApp")
+    normal = pd.DataFrame(index=bloco.index)
+    for coluna in COLUNAS:
+        normal[coluna] = bloco[coluna].astype(str).str.strip() if coluna in bloco.columns else ""
+    normal["nome"] = normal["nome"].str.replace(r"\s+", " ", regex=True)
+
+    # CPF só com dígitos; o Excel costuma comer o zero da frente
+    cpf = _digitos(normal["cpf"])
+    curto = cpf.str.len().between(9, 10)
+    normal["cpf"] = cpf.where(~curto, cpf.str.zfill(11))
+
+    # WhatsApp como o link da campanha entende (DDD da loja se faltar), gravado sem o 55
+    zap = _mapear_unicos(normal["whatsapp"], lambda tel: normalizar_whatsapp(limpar_telefone(tel)))
+    normal["zap_valido"] = zap.str.len().isin([10, 11]) | (normal["whatsapp"] == "")
+    normal["whatsapp"] = zap.where(normal["zap_valido"], normal["whatsapp"])
+    normal["telefone"] = _digitos(normal["telefone"])
+
+    nascimento = _datas(normal["nascimento"])
+    normal["nascimento_valido"] = nascimento.notna()
+    normal["nascimento"] = nascimento.fillna(normal["nascimento"])
+
+    cep = _digitos(normal["cep"])
+    normal["cep"] = normal["cep"].where(cep.str.len() != 8, cep.str[:5] + "-" + cep.str[5:])
+    normal["estado"] = normal["estado"].str.upper()
+    return normal
+
+
+def _cadastrados(valores, buscar):
+    """Quais destes valores já estão no cadastro (cada valor diferente consultado uma vez no índice)"""
+    return {valor for valor in set(valores) if buscar(valor)}
+
+
+def _validar(bloco, vistos_cpf, vistos_zap):
+    """Separa o bloco em (aceitos: DataFrame normalizado, recusados: DataFrame com 'motivo', nº de duplicados)"""
+    normal = _normalizar(bloco)
+    cpf, zap = normal["cpf"], normal["whatsapp"]
+
+    # Primeiro motivo que se aplica a cada linha ('' = válida)
+    motivo = pd.Series(np.select(
+        [
+            normal["nome"] == "",
+            (cpf != "") & (cpf.str.len() != 11),
+            ~normal["zap_valido"],
+            ~normal["nascimento_valido"],
+            (cpf == "") & (zap == ""),
+        ],
+        ["sem nome", "CPF inválido", "WhatsApp inválido", "nascimento inválido", "sem CPF nem WhatsApp"],
+        default="",
+    ), index=normal.index)
+    validas = motivo == ""
+
+    # Duplicados: contra o cadastro (índice hash) e contra o próprio arquivo
+    com_cpf, com_zap = validas & (cpf != ""), validas & (zap != "")
+    duplicados = [
+        (com_cpf & cpf.isin(_cadastrados(cpf[com_cpf], buscar_por_cpf)), "CPF já cadastrado"),
+        (com_zap & zap.isin(_cadastrados(zap[com_zap], buscar_por_whatsapp)), "WhatsApp já cadastrado"),
+        (com_cpf & (cpf.isin(vistos_cpf) | cpf.where(com_cpf).duplicated()), "CPF repetido no arquivo"),
+        (com_zap & (zap.isin(vistos_zap) | zap.where(com_zap).duplicated()), "WhatsApp repetido no arquivo"),
+    ]
+    repetidas = pd.Series(False, index=normal.index)
+    for mascara, texto in duplicados:
+        motivo = motivo.mask(mascara & ~repetidas, texto)
+        repetidas |= mascara
+    validas &= ~repetidas
+    vistos_cpf.update(cpf[validas & (cpf != "")])
+    vistos_zap.update(zap[validas & (zap != "")])
+
+    recusados = normal.loc[~validas, ["nome", "cpf", "whatsapp"]].assign(motivo=motivo[~validas])
+    return normal[validas], recusados, int(repetidas.sum())
+
+
+def _montar_clientes(aceitos):
+    """DataFrame normalizado -> dicts no formato do cadastro (o mesmo do formulário)"""
+    return [
+        {
+            "nome": nome, "cpf": cpf, "rg": rg, "nascimento": nascimento,
+            "contato": {"telefone": telefone, "whatsapp": whatsapp},
+            "endereco": {
+                "cep": cep, "logradouro": logradouro, "numero": numero, "bairro": bairro,
+                "municipio": municipio, "estado": estado, "pais": "Brasil",
+            },
+            "historico_vendas": [],
+            "receitas": [],
+        }
+        for nome, cpf, rg, nascimento, telefone, whatsapp, cep, logradouro, numero, bairro, municipio, estado
+        in aceitos[list(COLUNAS)].itertuples(index=False, name=None)
+    ]
+
+
+# --- ENDEREÇO PELO CEP ---
+def completar_enderecos(clientes):
+    """Preenche logradouro, bairro, município e UF vazios pelo CEP.
+
+    Cada CEP diferente é consultado uma vez (buscar_cep: memória, banco e só
+    então internet), CONSULTAS_CEP_SIMULTANEAS ao mesmo tempo. O que veio na
+    planilha nunca é trocado. Devolve (CEPs consultados, clientes completados).
+    """
+    pendentes = [
+        c for c in clientes
+        if len(c["endereco"]["cep"]) == 9 and not all(c["endereco"][campo] for campo in CAMPOS_ENDERECO)
+    ]
+    ceps = list({c["endereco"]["cep"] for c in pendentes})
+    if not ceps:
+        return 0, 0
+    with ThreadPoolExecutor(max_workers=CONSULTAS_CEP_SIMULTANEAS, thread_name_prefix="cep_lote") as executor:
+        achados = dict(zip(ceps, executor.map(buscar_cep, ceps)))
+    completados = 0
+    for cliente in pendentes:
+        achado = achados.get(cliente["endereco"]["cep"])
+        if not achado:
+            continue
+        endereco = cliente["endereco"]
+        for campo, origem in (("logradouro", "logradouro"), ("bairro", "bairro"),
+                              ("municipio", "localidade"), ("estado", "uf")):
+            if not endereco[campo]:
+                endereco[campo] = achado.get(origem, "")
+        completados += 1
+    return len(ceps), completados
+
+
+# --- IMPORTAÇÃO ---
+def importar_clientes(arquivo, nome_arquivo, completar_cep=False, simular=False):
+    """Lê a planilha (caminho ou upload) e cadastra os clientes novos.
+
+    Com `simular=True` só valida, confere duplicados e conta o que entraria.
+    Devolve o relatório: lidas, novos, duplicados, recusadas (inclui os
+    duplicados), ceps, enderecos, ids (primeiro e último, ou None), exemplos
+    (até LIMITE_EXEMPLOS: linha, nome, cpf, whatsapp, motivo) e segundos.
+    """
+    inicio = time.perf_counter()
+    relatorio = {"lidas": 0, "novos": 0, "duplicados": 0, "recusadas": 0,
+                 "ceps": 0, "enderecos": 0, "ids": None, "exemplos": []}
+    vistos_cpf, vistos_zap = set(), set()
+    clientes = []
+    entrada = abrir_planilha(arquivo)
+    try:
+        for bloco in blocos_planilha(entrada, nome_arquivo):
+            relatorio["lidas"] += len(bloco)
+            aceitos, recusados, duplicados = _validar(bloco, vistos_cpf, vistos_zap)
+            clientes.extend(_montar_clientes(aceitos))
+            relatorio["duplicados"] += duplicados
+            relatorio["recusadas"] += len(recusados)
+            vagas = LIMITE_EXEMPLOS - len(relatorio["exemplos"])
+            if vagas > 0 and len(recusados):
+                # Linha da planilha = posição + 2 (a 1ª é o cabeçalho)
+                relatorio["exemplos"].extend(
+                    {"linha": posicao + 2, **registro}
+                    for posicao, registro in zip(recusados.index[:vagas], recusados.head(vagas).to_dict("records"))
+                )
+    finally:
+        if entrada is not arquivo:
+            entrada.close()
+
+    if completar_cep:
+        # Também na simulação: os CEPs ficam no cache e a importação de verdade sai sem esperar a internet
+        relatorio["ceps"], relatorio["enderecos"] = completar_enderecos(clientes)
+    relatorio["novos"] = len(clientes)
+    if clientes and not simular:
+        ids = dados.inserir_clientes(clientes)
+        relatorio["ids"] = (ids[0], ids[-1])
+    relatorio["segundos"] = round(time.perf_counter() - inicio, 2)
+    return relatorio
+
+
+# Uso: python -m modules.importacao_clientes clientes.csv [--simular] [--cep]
+if __name__ == "__main__":
+    if len(sys.argv) >= 2:
+        resultado = importar_clientes(sys.argv[1], sys.argv[1], completar_cep="--cep" in sys.argv,
+                                      simular="--simular" in sys.argv)
+        exemplos = resultado.pop("exemplos")
+        print(resultado)
+        for exemplo in exemplos[:20]:
+            print(f"  linha {exemplo['linha']}: {exemplo['motivo']} ({exemplo['nome']})")
+    else:
+        print("Uso: python -m modules.importacao_clientes clientes.csv [--simular] [--cep]")
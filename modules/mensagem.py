@@ -0,0 +1,159 @@
+import os
+import re
+import threading
+from urllib.parse import quote
+from modules import dados
+from modules.datas import formatar_br
+from modules.receita import vencimentos_receita
+
+# Modelos de mensagem do WhatsApp (dados/templates_zap.json) com campos do cliente.
+# Cada texto é compilado uma vez num formato posicional do Python: renderizar um
+# cliente é só calcular os campos usados e chamar str.format (feito em C).
+#
+# Sintaxe:  {campo}  ou  {campo|texto se vazio}.  {{ e }} escrevem chaves literais.
+# Campo desconhecido fica no texto como foi escrito (para o erro aparecer na prévia).
+
+ARQUIVO_TEMPLATES = os.path.join(dados.PASTA_DADOS, "templates_zap.json")
+ARQUIVO_CONFIG_LOJA = os.path.join(dados.PASTA_DADOS, "config_loja.json")
+ASSINATURA_PADRAO = "Att, Equipe Fábrica de Óculos JR"
+TEMPLATES_PADRAO = [
+    {"titulo": "Aniversário", "texto": "Parabéns {nome}! 🎂 A Fábrica de Óculos JR deseja muitas felicidades. Venha nos visitar!"},
+    {"titulo": "Óculos Pronto", "texto": "Olá {nome}, seus óculos ficaram prontos! 😎 Pode vir buscar na loja."},
+    {"titulo": "Cobrança Suave", "texto": "Oi {nome}, tudo bem? Vimos que tem uma pendência aqui na ótica. Vamos resolver?"},
+]
+
+_CAMPO = re.compile(r"\{\{|\}\}|\{(\w+)(?:\|([^{}]*))?\}")
+_trava = threading.Lock()
+_compilados = {}           # texto -> Modelo
+LIMITE_COMPILADOS = 256
+
+
+# --- CAMPOS ---
+def primeiro_nome(nome):
+    partes = str(nome or "").split()
+    return partes[0] if partes else ""
+
+
+def _ultima_compra(cliente):
+    vendas = cliente.get("historico_vendas") or []
+    ultima = max((str(v.get("data") or "")[:10] for v in vendas), default="")
+    return formatar_br(ultima) if ultima else ""
+
+
+def _vencimento(cliente, contexto):
+    vencimento = contexto["vencimentos"].get(cliente.get("id"))
+    return formatar_br(vencimento) if vencimento else ""
+
+
+# nome -> função(cliente, contexto) que devolve o texto ('' = usa o padrão do campo)
+# {nome} continua sendo o primeiro nome, como nos modelos já gravados.
+CAMPOS = {
+    "nome": lambda c, ctx: primeiro_nome(c.get("nome")),
+    "primeiro_nome": lambda c, ctx: primeiro_nome(c.get("nome")),
+    "nome_completo": lambda c, ctx: str(c.get("nome") or "").strip(),
+    "vencimento_receita": lambda c, ctx: _vencimento(c, ctx),
+    "ultima_compra": lambda c, ctx: _ultima_compra(c),
+    "assinatura": lambda c, ctx: ctx["assinatura"],
+    "zap_loja": lambda c, ctx: ctx["zap_loja"],
+}
+
+
+# --- COMPILAÇÃO ---
+class Modelo:
+    """Texto compilado: formato posicional ('...{}...') + campos na ordem em que aparecem.
+
+    formato_url é o mesmo texto já codificado para URL (quote de cada trecho fixo),
+    para montar links do WhatsApp codificando só os valores dos campos.
+    """
+
+    __slots__ = ("texto", "formato", "formato_url", "campos", "desconhecidos")
+
+    def __init__(self, texto):
+        self.texto = texto
+        trechos, atual, campos, desconhecidos = [], [], [], []
+        posicao = 0
+        for achado in _CAMPO.finditer(texto):
+            atual.append(texto[posicao:achado.start()])
+            posicao = achado.end()
+            marca, nome, padrao = achado.group(0), achado.group(1), achado.group(2)
+            if nome is None:
+                atual.append(marca[0])  # {{ -> {   }} -> }
+            elif nome in CAMPOS:
+                trechos.append("".join(atual))
+                atual = []
+                campos.append((nome, padrao or ""))
+            else:
+                atual.append(marca)
+                desconhecidos.append(nome)
+        atual.append(texto[posicao:])
+        trechos.append("".join(atual))
+        self.formato = "{}".join(t.replace("{", "{{").replace("}", "}}") for t in trechos)
+        self.formato_url = "{}".join(quote(t) for t in trechos)  # quote já troca { } por %7B %7D
+        self.campos = tuple(campos)
+        self.desconhecidos = tuple(desconhecidos)
+
+
+def compilar(texto):
+    """Modelo do texto (compilado uma vez; o mesmo texto devolve o mesmo Modelo)"""
+    texto = str(texto or "")
+    with _trava:
+        modelo = _compilados.get(texto)
+        if modelo is None:
+            if len(_compilados) >= LIMITE_COMPILADOS:
+                _compilados.clear()
+            modelo = _compilados[texto] = Modelo(texto)
+        return modelo
+
+
+# --- RENDERIZAÇÃO ---
+def contexto_loja():
+    config = carregar_config_loja()
+    return {"assinatura": config.get("assinatura", ASSINATURA_PADRAO) or "", "zap_loja": config.get("zap_loja", "")}
+
+
+def valores_lote(modelo, clientes, contexto=None):
+    """Gera (cliente, valores): a tupla com o valor de cada campo do modelo, já com os padrões"""
+    contexto = contexto if contexto is not None else contexto_loja()
+    if any(nome == "vencimento_receita" for nome, _ in modelo.campos):
+        # Índice das receitas resolvido uma vez para o lote, não a cada cliente
+        contexto = {**contexto, "vencimentos": vencimentos_receita()}
+    campos = [(CAMPOS[nome], padrao) for nome, padrao in modelo.campos]
+    if not campos:
+        for cliente in clientes:
+            yield cliente, ()
+        return
+    for cliente in clientes:
+        yield cliente, tuple(funcao(cliente, contexto) or padrao for funcao, padrao in campos)
+
+
+def renderizar_lote(modelo, clientes, contexto=None):
+    """Gera a mensagem pronta de cada cliente, em fluxo (serve para milhares de uma vez)"""
+    formatar = modelo.formato.format
+    for _, valores in valores_lote(modelo, clientes, contexto):
+        yield formatar(*valores)
+
+
+def renderizar(texto, cliente, contexto=None):
+    """Mensagem de um cliente só (prévia)"""
+    return next(renderizar_lote(compilar(texto), [cliente], contexto))
+
+
+# --- ARQUIVOS ---
+def carregar_templates():
+    if not os.path.exists(ARQUIVO_TEMPLATES):
+        # Cria alguns modelos padrão se não existir
+        salvar_templates(TEMPLATES_PADRAO)
+        return [dict(t) for t in TEMPLATES_PADRAO]
+    return dados.carregar_json(ARQUIVO_TEMPLATES, [])
+
+
+def salvar_templates(lista):
+    dados.salvar_json_atomico(ARQUIVO_TEMPLATES, lista)
+
+
+def carregar_config_loja():
+    return dados.carregar_json(ARQUIVO_CONFIG_LOJA, {"zap_loja": ""})
+
+
+def salvar_config_loja(config):
+    dados.salvar_json_atomico(ARQUIVO_CONFIG_LOJA, config)
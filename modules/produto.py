@@ -0,0 +1,221 @@
+import bisect
+import threading
+from contextlib import contextmanager
+from modules import dados
+from modules.busca import IndiceTexto
+
+# Índices em memória sobre o snapshot compartilhado de produtos
+# (mesmo esquema de modules/cliente.py: remendados só nos ids alterados).
+_trava = threading.Lock()
+_indices = {
+    "base": None,
+    "por_id": {},
+    "por_codigo": {},  # código/SKU normalizado -> set de ids
+    "por_tipo": {},    # faceta: tipo -> set de ids
+    "por_marca": {},   # faceta: marca -> set de ids
+    "texto": IndiceTexto(),  # nome, código e marca
+    "ordens": {},      # campo -> chaves ordenadas do catálogo inteiro (a última posição é o id)
+}
+FACETAS = ("tipo", "marca")
+TIPOS_PRODUTO = ["Armação", "Lente", "Lente Contato", "Acessório"]
+
+# Ordenações da lista do estoque: campo -> chave de ordenação (termina no id, para desempatar)
+ORDENACOES = {
+    "nome": lambda p: (str(p.get("nome", "")).lower(), p["id"]),
+    "quantidade": lambda p: (p["quantidade"], p["id"]),
+    "preco": lambda p: (p["preco"], p["id"]),
+}
+
+
+# --- NORMALIZAÇÃO ---
+def normalizar_codigo(codigo):
+    """Código sem espaços nas pontas e em maiúsculas ('rb-01 ' == 'RB-01')"""
+    return str(codigo or "").strip().upper()
+
+
+def _valor_faceta(produto, faceta):
+    return str(produto.get(faceta) or "").strip()
+
+
+# --- ÍNDICES ---
+def _adicionar_em(nome_indice, chave, id_produto):
+    if chave:
+        _indices[nome_indice].setdefault(chave, set()).add(id_produto)
+
+
+def _retirar_de(nome_indice, chave, id_produto):
+    ids = _indices[nome_indice].get(chave)
+    if ids:
+        ids.discard(id_produto)
+        if not ids:
+            del _indices[nome_indice][chave]
+
+
+def _indexar(produto):
+    _indices["por_id"][produto["id"]] = produto
+    _adicionar_em("por_codigo", normalizar_codigo(produto.get("codigo")), produto["id"])
+    for faceta in FACETAS:
+        _adicionar_em(f"por_{faceta}", _valor_faceta(produto, faceta), produto["id"])
+    _indices["texto"].adicionar(
+        produto["id"],
+        f"{produto.get('nome', '')}, {produto.get('codigo', '')}, {produto.get('marca', '')}",
+    )
+
+
+def _desindexar(id_produto):
+    produto = _indices["por_id"].pop(id_produto, None)
+    if produto is None:
+        return
+    _indices["texto"].remover(id_produto)
+    _retirar_de("por_codigo", normalizar_codigo(produto.get("codigo")), id_produto)
+    for faceta in FACETAS:
+        _retirar_de(f"por_{faceta}", _valor_faceta(produto, faceta), id_produto)
+
+
+def _alcancar(snap):
+    """Põe os índices em dia com `snap` (remenda no lugar). Chamar com _trava presa."""
+    if _indices["base"] is snap.registros:
+        return _indices
+    alterados = snap.alterados_desde(_indices["base"]) if _indices["base"] is not None else None
+    if alterados is not None:
+        for id_produto in alterados:
+            antigo = _indices["por_id"].get(id_produto)
+            _desindexar(id_produto)
+            posicao = snap.posicoes.get(id_produto)
+            novo = snap.registros[posicao] if posicao is not None else None
+            if novo is not None:
+                _indexar(novo)
+            _reordenar(antigo, novo)
+    else:
+        _indices["ordens"] = {}
+        _indices["por_id"] = {}
+        _indices["por_codigo"] = {}
+        for faceta in FACETAS:
+            _indices[f"por_{faceta}"] = {}
+        _indices["texto"] = IndiceTexto()
+        for produto in snap.registros:
+            _indexar(produto)
+    _indices["base"] = snap.registros
+    return _indices
+
+
+@contextmanager
+def _consulta():
+    """Índices em dia com _trava presa durante o bloco: outra sessão gravando
+    não remenda os dicts/sets enquanto a consulta os percorre"""
+    snap = dados.snapshot("produtos")
+    with _trava:
+        yield _alcancar(snap)
+
+
+def _reordenar(antigo, novo):
+    """Tira a chave antiga e põe a nova nas ordenações já montadas (bisect, sem reordenar tudo)"""
+    for campo, chaves in _indices["ordens"].items():
+        if antigo is not None:
+            chave = ORDENACOES[campo](antigo)
+            pos = bisect.bisect_left(chaves, chave)
+            if pos < len(chaves) and chaves[pos] == chave:
+                del chaves[pos]
+        if novo is not None:
+            bisect.insort(chaves, ORDENACOES[campo](novo))
+
+
+# --- CONSULTAS ---
+def obter_produto(id_produto):
+    """Produto pelo id, ou None"""
+    with _consulta() as indices:
+        return indices["por_id"].get(id_produto)
+
+
+def obter_por_codigo(codigo):
+    """Produto pelo código/SKU (o de menor id, se o código estiver repetido), ou None"""
+    with _consulta() as indices:
+        ids = indices["por_codigo"].get(normalizar_codigo(codigo))
+        return indices["por_id"][min(ids)] if ids else None
+
+
+def rotulo_produto(id_produto):
+    """Texto 'código | nome (R$ preço)' usado nas listas de seleção"""
+    p = obter_produto(id_produto)
+    if p is None:
+        return str(id_produto)
+    return f"{p.get('codigo', '')} | {p['nome']} (R$ {p['preco']:.2f})"
+
+
+def facetas():
+    """{'tipo': {valor: qtde de produtos}, 'marca': {...}} para montar os filtros"""
+    with _consulta() as indices:
+        return {
+            faceta: {valor: len(ids) for valor, ids in sorted(indices[f"por_{faceta}"].items())}
+            for faceta in FACETAS
+        }
+
+
+def _ordem_catalogo(indices, campo):
+    """Chaves de todo o catálogo ordenadas por `campo` (montadas na 1ª vez, depois remendadas).
+
+    Chamar com _trava presa: a lista é remendada no lugar a cada gravação.
+    """
+    chaves = indices["ordens"].get(campo)
+    if chaves is None:
+        chaves = indices["ordens"][campo] = sorted(ORDENACOES[campo](p) for p in indices["base"])
+    return chaves
+
+
+def _fatia(sequencia, inicio, fim, decrescente):
+    """Página [inicio:fim] da sequência, lida de trás para frente se `decrescente`"""
+    if not decrescente:
+        return sequencia[inicio:fim]
+    total = len(sequencia)
+    return sequencia[max(total - fim, 0) if fim is not None else 0:max(total - inicio, 0)][::-1]
+
+
+def buscar_produtos(consulta="", tipo=None, marca=None, com_estoque=False, limite=50, inicio=0,
+                    ordem=None, decrescente=False):
+    """Busca por nome, código ou marca, com filtros de faceta.
+
+    Se a consulta for um código cadastrado, devolve só esse produto; senão,
+    os achados por pontuação. Consulta vazia lista por ordem de cadastro.
+    `ordem` ('nome', 'quantidade' ou 'preco') troca a ordem da lista.
+    Devolve (produtos da página, total).
+    """
+    with _consulta() as indices:
+        fim = None if limite is None else inicio + limite
+        filtros = [
+            indices[f"por_{faceta}"].get(valor, set())
+            for faceta, valor in (("tipo", tipo), ("marca", marca)) if valor
+        ]
+        tem_texto = bool(str(consulta or "").strip())
+        if tem_texto:
+            # Código exato (leitor de código de barras) dispensa a busca por texto
+            ids = sorted(indices["por_codigo"].get(normalizar_codigo(consulta), ()))
+            if not ids:
+                ids = [id_produto for _, id_produto in indices["texto"].buscar(consulta)]
+        elif filtros:
+            # Sem texto: parte da menor faceta em vez de varrer o catálogo
+            ids = sorted(min(filtros, key=len))
+        elif not com_estoque:
+            # Catálogo inteiro: só a página sai da ordenação pronta (ou do snapshot, na ordem de cadastro)
+            if ordem:
+                chaves = _ordem_catalogo(indices, ordem)
+                pagina = [indices["por_id"][chave[-1]] for chave in _fatia(chaves, inicio, fim, decrescente)]
+                return pagina, len(chaves)
+            return list(_fatia(indices["base"], inicio, fim, decrescente)), len(indices["base"])
+        else:
+            ids = [p["id"] for p in indices["base"]]
+
+        for permitidos in filtros:
+            ids = [i for i in ids if i in permitidos]
+        if com_estoque:
+            ids = [i for i in ids if indices["por_id"][i]["quantidade"] > 0]
+        if ordem:
+            ids = sorted(ids, key=lambda i: ORDENACOES[ordem](indices["por_id"][i]))
+        return [indices["por_id"][i] for i in _fatia(ids, inicio, fim, decrescente)], len(ids)
+
+
+def resumo_estoque():
+    """Peças em estoque, valor total e nº de SKUs (somados no banco)"""
+    linha = dados.conectar().execute(
+        "SELECT COALESCE(SUM(quantidade), 0), COALESCE(SUM(quantidade * preco), 0), COUNT(*) FROM produtos"
+    ).fetchone()
+    return {"itens": int(linha[0]), "valor": float(linha[1]), "skus": linha[2]}
@@ -0,0 +1,125 @@
+import bisect
+import threading
+from datetime import date, timedelta
+from modules import dados
+
+# Vencimento das receitas: para cada cliente, a data do exame mais recente + 1 ano.
+# Fica numa lista ordenada por vencimento, então "quem vence esta semana" é uma
+# fatia por bisect. Remendada só nos clientes alterados, como os demais índices.
+
+VALIDADE_DIAS = 365
+
+_trava = threading.Lock()
+_indices = {
+    "base": None,
+    "por_cliente": {},  # id do cliente -> vencimento (AAAA-MM-DD)
+    "ordem": [],        # (vencimento, id do cliente), ordenada
+}
+_lista_do_dia = {"data": None, "base": None, "lista": None}
+
+
+# --- ÍNDICE ---
+def _vencimentos(ids=None):
+    """{id do cliente: vencimento} a partir da receita mais recente de cada um (no banco)"""
+    filtro, parametros = dados._filtro_ids("cliente_id", ids)
+    linhas = dados.conectar().execute(
+        f"SELECT cliente_id, MAX(data_exame) AS exame FROM receitas "
+        f"WHERE data_exame != ''{filtro} GROUP BY cliente_id",
+        parametros,
+    ).fetchall()
+    return {
+        linha["cliente_id"]: (date.fromisoformat(linha["exame"]) + timedelta(days=VALIDADE_DIAS)).isoformat()
+        for linha in linhas
+    }
+
+
+def _retirar(id_cliente):
+    vencimento = _indices["por_cliente"].pop(id_cliente, None)
+    if vencimento is not None:
+        ordem = _indices["ordem"]
+        pos = bisect.bisect_left(ordem, (vencimento, id_cliente))
+        if pos < len(ordem) and ordem[pos] == (vencimento, id_cliente):
+            del ordem[pos]
+
+
+def _atualizados():
+    """Devolve o índice em dia com o snapshot atual de clientes"""
+    snap = dados.snapshot("clientes")
+    with _trava:
+        if _indices["base"] is snap.registros:
+            return _indices
+        alterados = snap.alterados_desde(_indices["base"]) if _indices["base"] is not None else None
+        if alterados is not None:
+            novos = _vencimentos(alterados) if alterados else {}
+            for id_cliente in alterados:
+                _retirar(id_cliente)
+                if id_cliente in novos and id_cliente in snap.posicoes:
+                    _indices["por_cliente"][id_cliente] = novos[id_cliente]
+                    bisect.insort(_indices["ordem"], (novos[id_cliente], id_cliente))
+        else:
+            por_cliente = {i: v for i, v in _vencimentos().items() if i in snap.posicoes}
+            _indices["por_cliente"] = por_cliente
+            _indices["ordem"] = sorted((v, i) for i, v in por_cliente.items())
+        _indices["base"] = snap.registros
+        return _indices
+
+
+# --- CONSULTAS ---
+def _dia(valor):
+    return valor if isinstance(valor, date) else date.fromisoformat(str(valor))
+
+
+def vencimentos_receita():
+    """{id do cliente: data (AAAA-MM-DD) em que a receita mais recente vence}.
+
+    Pegue uma vez e consulte quantos clientes quiser (ex: um lote de mensagens):
+    cada chamada confere o snapshot do banco.
+    """
+    return _atualizados()["por_cliente"]
+
+
+def vencimentos_entre(inicio=None, fim=None):
+    """[(vencimento, cliente)] com inicio <= vencimento <= fim, do mais antigo ao mais novo.
+
+    Aceita date ou 'AAAA-MM-DD'; sem `inicio` (ou sem `fim`) a faixa fica aberta.
+    """
+    snap = dados.snapshot("clientes")
+    return [(vencimento, snap.registros[snap.posicoes[i]])
+            for vencimento, i in _fatia(inicio, fim) if i in snap.posicoes]
+
+
+def ids_vencimento_entre(inicio=None, fim=None):
+    """Mesma faixa de vencimentos_entre, só os ids (para cruzar com outros filtros)"""
+    return {i for _, i in _fatia(inicio, fim)}
+
+
+def _fatia(inicio, fim):
+    indices = _atualizados()
+    with _trava:
+        ordem = indices["ordem"]
+        a = bisect.bisect_left(ordem, (_dia(inicio).isoformat(),)) if inicio is not None else 0
+        b = (bisect.bisect_left(ordem, ((_dia(fim) + timedelta(days=1)).isoformat(),))
+             if fim is not None else len(ordem))
+        return ordem[a:b]
+
+
+def lista_do_dia(hoje=None):
+    """Lista de contato do CRM, montada uma vez por dia (e de novo se entrar receita):
+    {"data", "vencidas", "semana", "mes"}, cada uma [(vencimento, cliente)].
+
+    vencidas = já passaram de 1 ano; semana/mes = vencem nos próximos 7/30 dias.
+    """
+    hoje = hoje or date.today()
+    base = _atualizados()["base"]
+    with _trava:
+        if _lista_do_dia["data"] == hoje and _lista_do_dia["base"] is base:
+            return _lista_do_dia["lista"]
+    lista = {
+        "data": hoje.isoformat(),
+        "vencidas": vencimentos_entre(fim=hoje - timedelta(days=1)),
+        "semana": vencimentos_entre(hoje, hoje + timedelta(days=7)),
+        "mes": vencimentos_entre(hoje, hoje + timedelta(days=30)),
+    }
+    with _trava:
+        _lista_do_dia.update(data=hoje, base=base, lista=lista)
+    return lista
@@ -0,0 +1,177 @@
+import bisect
+import os
+import threading
+from datetime import date, timedelta
+from modules import dados
+from modules.busca import normalizar_texto
+from modules.datas import para_dia
+from modules.receita import ids_vencimento_entre
+
+# Públicos de campanha montados por índice, sem varrer os clientes:
+# aniversário (mês, dia), última compra e total gasto (listas ordenadas) e
+# bairro/município. Remendados só nos clientes alterados, como os demais índices.
+
+ARQUIVO_SEGMENTOS = os.path.join(dados.PASTA_DADOS, "segmentos.json")
+
+# Regras aceitas num segmento (todas precisam valer ao mesmo tempo):
+#   aniversario_mes: 1..12 ou "atual"     receita_vencida: True
+#   sem_compra_dias: N (inclui quem nunca comprou)     gasto_minimo: R$
+#   bairro / municipio: texto (sem diferença de acento e maiúsculas)
+SEGMENTOS_PADRAO = [
+    {"nome": "Aniversariantes do mês", "regras": {"aniversario_mes": "atual"}},
+    {"nome": "Receita vencida", "regras": {"receita_vencida": True}},
+    {"nome": "Sem comprar há 1 ano", "regras": {"sem_compra_dias": 365}},
+]
+
+_trava = threading.Lock()
+_indices = {
+    "base": None,
+    "por_id": {},          # id -> (aniversário, última compra, total gasto, bairro, município)
+    "por_aniversario": {}, # (mês, dia) -> set de ids
+    "por_bairro": {},      # bairro normalizado -> set de ids
+    "por_municipio": {},   # município normalizado -> set de ids
+    "ultima_compra": [],   # (AAAA-MM-DD ou '' se nunca comprou, id), ordenada
+    "gasto": [],           # (total gasto, id), ordenada
+}
+_publicos = {}             # (regras, dia) -> (base, ids): refeito só se algum cliente mudar
+LIMITE_PUBLICOS = 64
+
+
+# --- ÍNDICES ---
+def _perfil(cliente):
+    nasc = para_dia(cliente.get("nascimento"))
+    vendas = cliente.get("historico_vendas") or []
+    endereco = cliente.get("endereco") or {}
+    return (
+        (nasc.month, nasc.day) if nasc else None,
+        max((str(v.get("data") or "")[:10] for v in vendas), default=""),
+        round(sum(float(v.get("total") or 0) for v in vendas), 2),
+        normalizar_texto(endereco.get("bairro")).strip(),
+        normalizar_texto(endereco.get("municipio")).strip(),
+    )
+
+
+def _indexar(cliente):
+    id_cliente = cliente["id"]
+    aniversario, ultima, gasto, bairro, municipio = perfil = _perfil(cliente)
+    _indices["por_id"][id_cliente] = perfil
+    for nome_indice, chave in (("por_aniversario", aniversario), ("por_bairro", bairro), ("por_municipio", municipio)):
+        if chave:
+            _indices[nome_indice].setdefault(chave, set()).add(id_cliente)
+    bisect.insort(_indices["ultima_compra"], (ultima, id_cliente))
+    bisect.insort(_indices["gasto"], (gasto, id_cliente))
+
+
+def _desindexar(id_cliente):
+    perfil = _indices["por_id"].pop(id_cliente, None)
+    if perfil is None:
+        return
+    aniversario, ultima, gasto, bairro, municipio = perfil
+    for nome_indice, chave in (("por_aniversario", aniversario), ("por_bairro", bairro), ("por_municipio", municipio)):
+        ids = _indices[nome_indice].get(chave)
+        if ids:
+            ids.discard(id_cliente)
+            if not ids:
+                del _indices[nome_indice][chave]
+    for nome_lista, chave in (("ultima_compra", (ultima, id_cliente)), ("gasto", (gasto, id_cliente))):
+        lista = _indices[nome_lista]
+        pos = bisect.bisect_left(lista, chave)
+        if pos < len(lista) and lista[pos] == chave:
+            del lista[pos]
+
+
+def _atualizados():
+    """Devolve os índices em dia com o snapshot atual de clientes"""
+    snap = dados.snapshot("clientes")
+    with _trava:
+        if _indices["base"] is snap.registros:
+            return _indices
+        alterados = snap.alterados_desde(_indices["base"]) if _indices["base"] is not None else None
+        if alterados is not None:
+            for id_cliente in alterados:
+                _desindexar(id_cliente)
+                posicao = snap.posicoes.get(id_cliente)
+                if posicao is not None:
+                    _indexar(snap.registros[posicao])
+        else:
+            for nome_indice in ("por_id", "por_aniversario", "por_bairro", "por_municipio"):
+                _indices[nome_indice] = {}
+            perfis = []
+            for cliente in snap.registros:
+                perfil = _perfil(cliente)
+                perfis.append((cliente["id"], perfil))
+                _indices["por_id"][cliente["id"]] = perfil
+                for nome_indice, chave in (("por_aniversario", perfil[0]), ("por_bairro", perfil[3]),
+                                           ("por_municipio", perfil[4])):
+                    if chave:
+                        _indices[nome_indice].setdefault(chave, set()).add(cliente["id"])
+            # Carga inteira: ordena uma vez em vez de inserir um a um
+            _indices["ultima_compra"] = sorted((p[1], i) for i, p in perfis)
+            _indices["gasto"] = sorted((p[2], i) for i, p in perfis)
+        _indices["base"] = snap.registros
+        return _indices
+
+
+# --- CONSULTAS ---
+def _aniversario(indices, mes, dia=None):
+    ids = set()
+    for d in ([dia] if dia else range(1, 32)):
+        ids |= indices["por_aniversario"].get((mes, d), set())
+    return ids
+
+
+def aniversariantes(mes, dia=None):
+    """Ids de quem faz aniversário no mês (ou no dia exato, se vier `dia`)"""
+    indices = _atualizados()
+    with _trava:
+        return _aniversario(indices, mes, dia)
+
+
+def _ids_regra(indices, regra, valor, hoje):
+    if regra == "aniversario_mes":
+        return _aniversario(indices, hoje.month if valor == "atual" else int(valor))
+    if regra == "receita_vencida":
+        return ids_vencimento_entre(fim=hoje - timedelta(days=1))
+    if regra == "sem_compra_dias":
+        limite = (hoje - timedelta(days=int(valor))).isoformat()
+        lista = indices["ultima_compra"]
+        return {i for _, i in lista[:bisect.bisect_left(lista, (limite,))]}
+    if regra == "gasto_minimo":
+        lista = indices["gasto"]
+        return {i for _, i in lista[bisect.bisect_left(lista, (float(valor),)):]}
+    if regra in ("bairro", "municipio"):
+        return set(indices[f"por_{regra}"].get(normalizar_texto(valor).strip(), set()))
+    raise ValueError(f"Regra de segmento desconhecida: {regra}")
+
+
+def publico(regras, hoje=None):
+    """Clientes (dicts, por ordem de cadastro) que atendem a todas as regras"""
+    hoje = hoje or date.today()
+    regras = {r: v for r, v in (regras or {}).items() if v not in (None, "", False)}
+    indices = _atualizados()
+    snap = dados.snapshot("clientes")
+    chave = (tuple(sorted((r, str(v)) for r, v in regras.items())), hoje)
+    with _trava:
+        guardado = _publicos.get(chave)
+        if guardado is not None and guardado[0] is indices["base"]:
+            ids = guardado[1]
+        else:
+            if regras:
+                conjuntos = sorted((_ids_regra(indices, r, v, hoje) for r, v in regras.items()), key=len)
+                ids = conjuntos[0].intersection(*conjuntos[1:])
+            else:
+                ids = set(indices["por_id"])
+            ids = sorted(ids, key=lambda i: snap.posicoes.get(i, -1))
+            if len(_publicos) >= LIMITE_PUBLICOS:
+                _publicos.clear()
+            _publicos[chave] = (indices["base"], ids)
+    return [snap.registros[snap.posicoes[i]] for i in ids if i in snap.posicoes]
+
+
+# --- SEGMENTOS SALVOS ---
+def carregar_segmentos():
+    return dados.carregar_json(ARQUIVO_SEGMENTOS, SEGMENTOS_PADRAO)
+
+
+def salvar_segmentos(segmentos):
+    dados.salvar_json_atomico(ARQUIVO_SEGMENTOS, segmentos)
@@ -1,87 +1,183 @@
-import streamlit as st
-import os
-
-def configurar_pagina_padrao():
-    # 1. Configura o Nome na Aba do Navegador
-    st.set_page_config(
-        page_title="Fábrica de Óculos JR Vitória",
-        page_icon="👓",
-        layout="wide",
-        initial_sidebar_state="expanded"
-    )
-    
-    # 2. CSS GLOBAL
-    st.markdown("""
-    <style>
-        /* Fundo da página principal (Cinza Claro) */
-        .stApp { background-color: #f5f5f5; }
-
-        /* --- BARRA LATERAL VERMELHA --- */
-        section[data-testid="stSidebar"] { 
-            background-color: #FF0000; 
-        }
-        
-        /* --- CORREÇÃO DOS LINKS AZUIS (O Pulo do Gato 🐈) --- */
-        /* Força todos os links e textos de navegação a serem BRANCOS */
-        section[data-testid="stSidebar"] a,
-        section[data-testid="stSidebar"] span,
-        [data-testid="stSidebarNav"] a,
-        [data-testid="stSidebarNav"] span {
-            color: #FFFFFF !important;
-            text-decoration: none; /* Tira o sublinhado se tiver */
-        }
-        
-        /* Garante que até o ícone do link seja branco */
-        [data-testid="stSidebarNav"] svg {
-            fill: #FFFFFF !important;
-            color: #FFFFFF !important;
-        }
-
-        /* Inputs (Caixas de texto) continuam pretos para ler o que digita */
-        [data-testid="stSidebar"] input { 
-            color: #000000 !important; 
-        }
-        
-        /* --- MANTER O BOTÃO SAIR FUNCIONANDO (Branco com letras Vermelhas) --- */
-        section[data-testid="stSidebar"] button {
-            background-color: #FFFFFF !important; /* Fundo Branco */
-            border: none !important;
-            width: 100%;
-        }
-        
-        /* Texto VERMELHO dentro do botão (sobrepõe a regra do branco acima) */
-        section[data-testid="stSidebar"] button * {
-            color: #FF0000 !important; 
-            font-weight: bold !important;
-        }
-
-        /* Logo e linhas divisórias */
-        [data-testid="stSidebar"] img { margin-top: 20px; margin-bottom: 10px; }
-        [data-testid="stSidebar"] hr { background-color: #FFFFFF; }
-        
-    </style>
-    """, unsafe_allow_html=True)
-
-    # 3. Conteúdo da Barra Lateral
-    with st.sidebar:
-        # LOGO
-        if os.path.exists("logo.png"):
-            st.image("logo.png", width=150)
-        elif os.path.exists("logo.jpg"):
-            st.image("logo.jpg", width=150)
-        else:
-            st.image("https://cdn-icons-png.flaticon.com/512/3596/3596088.png", width=100)
-        
-        st.markdown("### Fábrica de Óculos JR Vitória")
-        st.markdown("---")
-        
-        # LOGOUT
-        if 'logado' in st.session_state and st.session_state['logado']:
-            st.write(f"👤 **{st.session_state.get('usuario_atual', 'Usuário')}**")
-            st.write("") 
-            
-            if st.button("🚪 SAIR DO SISTEMA"):
-                st.session_state['logado'] = False
-                st.session_state['usuario_atual'] = None
-                st.session_state['perfil'] = None
-                st.rerun()
\ No newline at end of file
+import streamlit as st
+import pandas as pd
+import os
+import html
+from modules.carrinho import adicionar, alterar, remover, linhas
+from modules.cliente import buscar_clientes, rotulo_cliente
+from modules.produto import buscar_produtos, obter_produto, rotulo_produto
+from modules.venda import subtotal_item
+
+def configurar_pagina_padrao():
+    # 1. Configura o Nome na Aba do Navegador
+    st.set_page_config(
+        page_title="Fábrica de Óculos JR Vitória",
+        page_icon="👓",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+    
+    # 2. CSS GLOBAL
+    st.markdown("""
+    <style>
+        /* Fundo da página principal (Cinza Claro) */
+        .stApp { background-color: #f5f5f5; }
+
+        /* --- BARRA LATERAL VERMELHA --- */
+        section[data-testid="stSidebar"] { 
+            background-color: #FF0000; 
+        }
+        
+        /* --- CORREÇÃO DOS LINKS AZUIS (O Pulo do Gato 🐈) --- */
+        /* Força todos os links e textos de navegação a serem BRANCOS */
+        section[data-testid="stSidebar"] a,
+        section[data-testid="stSidebar"] span,
+        [data-testid="stSidebarNav"] a,
+        [data-testid="stSidebarNav"] span {
+            color: #FFFFFF !important;
+            text-decoration: none; /* Tira o sublinhado se tiver */
+        }
+        
+        /* Garante que até o ícone do link seja branco */
+        [data-testid="stSidebarNav"] svg {
+            fill: #FFFFFF !important;
+            color: #FFFFFF !important;
+        }
+
+        /* Inputs (Caixas de texto) continuam pretos para ler o que digita */
+        [data-testid="stSidebar"] input { 
+            color: #000000 !important; 
+        }
+        
+        /* --- MANTER O BOTÃO SAIR FUNCIONANDO (Branco com letras Vermelhas) --- */
+        section[data-testid="stSidebar"] button {
+            background-color: #FFFFFF !important; /* Fundo Branco */
+            border: none !important;
+            width: 100%;
+        }
+        
+        /* Texto VERMELHO dentro do botão (sobrepõe a regra do branco acima) */
+        section[data-testid="stSidebar"] button * {
+            color: #FF0000 !important; 
+            font-weight: bold !important;
+        }
+
+        /* Logo e linhas divisórias */
+        [data-testid="stSidebar"] img { margin-top: 20px; margin-bottom: 10px; }
+        [data-testid="stSidebar"] hr { background-color: #FFFFFF; }
+        
+    </style>
+    """, unsafe_allow_html=True)
+
+    # 3. Conteúdo da Barra Lateral
+    with st.sidebar:
+        # LOGO
+        if os.path.exists("logo.png"):
+            st.image("logo.png", width=150)
+        elif os.path.exists("logo.jpg"):
+            st.image("logo.jpg", width=150)
+        else:
+            st.image("https://cdn-icons-png.flaticon.com/512/3596/3596088.png", width=100)
+        
+        st.markdown("### Fábrica de Óculos JR Vitória")
+        st.markdown("---")
+        
+        # LOGOUT
+        if 'logado' in st.session_state and st.session_state['logado']:
+            st.write(f"👤 **{st.session_state.get('usuario_atual', 'Usuário')}**")
+            st.write("") 
+            
+            if st.button("🚪 SAIR DO SISTEMA"):
+                st.session_state['logado'] = False
+                st.session_state['usuario_atual'] = None
+                st.session_state['perfil'] = None
+                st.rerun()
+
+
+def seletor_cliente(rotulo, key, opcao_vazia=None, limite=20):
+    """Caixa de busca + lista só com os melhores achados (não manda todos os clientes ao navegador).
+
+    Devolve o id escolhido, ou None (opção vazia ou nada encontrado).
+    """
+    busca = st.text_input(rotulo, key=f"{key}_busca", placeholder="🔎 Nome, CPF ou telefone")
+    achados, total = buscar_clientes(busca, limite)
+    opcoes = [c["id"] for c in achados]
+    if opcao_vazia is not None:
+        opcoes = [None] + opcoes
+    if not opcoes:
+        st.caption("Nenhum cliente encontrado.")
+        return None
+
+    escolhido = st.selectbox(
+        rotulo, opcoes, key=key, label_visibility="collapsed",
+        format_func=lambda i: opcao_vazia if i is None else rotulo_cliente(i)
+    )
+    if total > len(achados):
+        st.caption(f"Mostrando {len(achados)} de {total} clientes. Digite mais para refinar.")
+    return escolhido
+
+
+def editor_carrinho(rotulo, carrinho, key, com_estoque=False, limite=30, placeholder=None):
+    """Busca + quantidade para pôr produtos no carrinho, e a tabela editável das linhas.
+
+    `carrinho` (modules/carrinho.py) fica no session_state da página. A tabela
+    devolve só as células mudadas, aplicadas linha a linha no carrinho.
+    """
+    busca = st.text_input(rotulo, key=f"{key}_busca", placeholder=placeholder or "🔎 Nome, código ou marca")
+    achados, total = buscar_produtos(busca, com_estoque=com_estoque, limite=limite)
+    c_prod, c_qtd, c_botao = st.columns([3, 1, 1], vertical_alignment="bottom")
+    escolhido = c_prod.selectbox(
+        rotulo, [p["id"] for p in achados], key=f"{key}_produto", label_visibility="collapsed",
+        format_func=rotulo_produto, placeholder="Nenhum produto encontrado",
+    )
+    quantidade = c_qtd.number_input("Qtd", min_value=1, value=1, step=1, key=f"{key}_qtd")
+    if c_botao.button("➕ Adicionar", key=f"{key}_adicionar", disabled=escolhido is None, use_container_width=True):
+        produto = obter_produto(escolhido)
+        if produto is not None:
+            adicionar(carrinho, produto, quantidade)
+    if total > len(achados):
+        st.caption(f"Mostrando {len(achados)} de {total} produtos. Digite mais para refinar.")
+
+    lista = linhas(carrinho)
+    if not lista:
+        return
+    # A chave muda a cada edição aplicada: a tabela volta a refletir só o carrinho
+    versao = st.session_state.get(f"{key}_versao", 0)
+    chave_tabela = f"{key}_tabela_{versao}"
+
+    def aplicar_edicoes():
+        for posicao, mudancas in st.session_state[chave_tabela]["edited_rows"].items():
+            id_produto = lista[int(posicao)]["produto_id"]
+            if mudancas.get("remover"):
+                remover(carrinho, id_produto)
+            else:
+                alterar(carrinho, id_produto, quantidade=mudancas.get("quantidade"),
+                        preco=mudancas.get("preco"), desconto=mudancas.get("desconto"))
+        st.session_state[f"{key}_versao"] = versao + 1
+
+    st.data_editor(
+        pd.DataFrame([{**linha, "remover": False} for linha in lista],
+                     columns=["nome", "quantidade", "preco", "desconto", "subtotal", "remover"]),
+        key=chave_tabela, on_change=aplicar_edicoes, hide_index=True, use_container_width=True,
+        disabled=["nome", "subtotal"],
+        column_config={
+            "nome": "Item",
+            "quantidade": st.column_config.NumberColumn("Qtd", min_value=0, step=1),
+            "preco": st.column_config.NumberColumn("Preço Un.", min_value=0.0, format="R$ %.2f"),
+            "desconto": st.column_config.NumberColumn("Desconto", min_value=0.0, format="R$ %.2f"),
+            "subtotal": st.column_config.NumberColumn("Subtotal", format="R$ %.2f"),
+            "remover": st.column_config.CheckboxColumn("🗑️"),
+        },
+    )
+
+
+def html_itens_carrinho(itens):
+    """Linhas <tr> do recibo/orçamento: 'Qtd x Item' e o valor da linha (com desconto)"""
+    html_itens = ""
+    for item in itens:
+        valor = subtotal_item(item)
+        detalhe = f"{item['quantidade']} x R$ {item['preco']:.2f}"
+        if item.get("desconto"):
+            detalhe += f" - desc. R$ {item['desconto']:.2f}"
+        html_itens += (f"<tr><td>{html.escape(item['nome'])}<br><small>{detalhe}</small></td>"
+                       f"<td style='text-align:right'>R$ {valor:.2f}</td></tr>")
+    return html_itens
@@ -0,0 +1,87 @@
+import sys
+from modules.dados import conectar, transacao, baixar_estoque, inserir_venda, reconstruir_agregados
+from modules.datas import agora_iso
+from modules.estoque import baixar_reservas
+
+
+# --- REGISTRO DE VENDAS ---
+def montar_item(produto, quantidade=1, preco=None):
+    """Linha da venda a partir de um produto do estoque"""
+    return {
+        "produto_id": produto["id"],
+        "codigo": produto.get("codigo", ""),
+        "nome": produto["nome"],
+        "quantidade": int(quantidade),
+        "preco": float(produto["preco"] if preco is None else preco),
+    }
+
+
+def subtotal_item(item):
+    """Valor da linha: quantidade x preço - desconto, nunca abaixo de zero (carrinho, recibo e livro usam este)"""
+    return round(max(item["quantidade"] * item["preco"] - item.get("desconto", 0), 0.0), 2)
+
+
+def registrar_venda(itens, pagamento, vendedor, id_cliente=None, parcelas=1, obs="", cliente=None):
+    """Baixa o estoque e grava a venda no livro em uma única transação.
+
+    `itens` vem de montar_item() (ou carrinho.itens_venda(), com "desconto"
+    em R$ por linha). Uma linha com quantidade N baixa N peças de uma vez.
+    `cliente` guarda os dados digitados no caixa (útil na venda avulsa,
+    quando não há id). Devolve a venda com id.
+    """
+    venda = {
+        "data": agora_iso(),
+        "itens": itens,
+        "total": round(sum(subtotal_item(i) for i in itens), 2),
+        "pagamento": pagamento,
+        "parcelas": int(parcelas),
+        "vendedor": vendedor,
+        "obs": obs,
+    }
+    if cliente:
+        venda["cliente"] = cliente
+
+    with transacao():
+        venda["id"] = inserir_venda(id_cliente, venda)
+        baixar_estoque([(i["produto_id"], i["quantidade"]) for i in itens],
+                       referencia=f"venda {venda['id']}", usuario=vendedor)
+        if id_cliente is not None:
+            # O que o cliente tinha reservado num orçamento agora saiu de fato
+            baixar_reservas(id_cliente, [(i["produto_id"], i["quantidade"]) for i in itens])
+    venda["cliente_id"] = id_cliente
+    return venda
+
+
+# --- INDICADORES (tabela agregados_vendas, mantida por gatilho a cada venda) ---
+DIMENSOES = ("dia", "mes", "vendedor", "pagamento")
+
+
+def resumo_vendas():
+    """Faturamento, nº de vendas e ticket médio, sem percorrer o livro"""
+    linha = conectar().execute(
+        "SELECT total, qtde FROM agregados_vendas WHERE dimensao='geral'"
+    ).fetchone()
+    total, qtde = (linha["total"], linha["qtde"]) if linha else (0.0, 0)
+    return {"faturamento": total, "qtde": qtde, "ticket_medio": total / qtde if qtde else 0.0}
+
+
+def vendas_por(dimensao, desde=None):
+    """Lista de (chave, total, qtde) de uma dimensão, ordenada pela chave"""
+    if dimensao not in DIMENSOES:
+        raise ValueError(f"Dimensão inválida: {dimensao}")
+    sql = "SELECT chave, total, qtde FROM agregados_vendas WHERE dimensao=?"
+    parametros = [dimensao]
+    if desde:
+        sql += " AND chave>=?"
+        parametros.append(desde)
+    sql += " ORDER BY chave"
+    return [tuple(linha) for linha in conectar().execute(sql, parametros)]
+
+
+# Uso: python -m modules.venda reconstruir
+if __name__ == "__main__":
+    if sys.argv[1:] == ["reconstruir"]:
+        reconstruir_agregados()
+        print("Indicadores recalculados:", resumo_vendas())
+    else:
+        print("Uso: python -m modules.venda reconstruir")
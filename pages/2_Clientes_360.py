@@ -1,266 +1,363 @@
-import streamlit as st
-import pandas as pd
-import requests
-import os
-from datetime import datetime, date
-from geopy.geocoders import ArcGIS
-from modules.dados import carregar_dados, salvar_dados
-from modules.ui import configurar_pagina_padrao
-
-# 1. Aplica o visual vermelho e fundo cinza
-configurar_pagina_padrao()
-
-st.title("👤 Gestão de Clientes 360º")
-
-# --- CONFIGURAÇÕES DE DIRETÓRIO ---
-PASTA_FOTOS = os.path.join("dados", "fotos")
-if not os.path.exists(PASTA_FOTOS):
-    os.makedirs(PASTA_FOTOS)
-
-# --- FUNÇÕES UTILITÁRIAS ---
-
-def busca_cep_api(cep_input):
-    """Consulta a API ViaCEP e retorna os dados do endereço."""
-    cep_limpo = str(cep_input).replace("-", "").replace(".", "").strip()
-    if len(cep_limpo) == 8:
-        try:
-            response = requests.get(f"https://viacep.com.br/ws/{cep_limpo}/json/")
-            data = response.json()
-            if "erro" not in data:
-                return {
-                    "logradouro": data.get("logradouro", ""),
-                    "bairro": data.get("bairro", ""),
-                    "localidade": data.get("localidade", ""),
-                    "uf": data.get("uf", ""),
-                    "pais": "Brasil" # ViaCEP é só Brasil
-                }
-        except:
-            pass
-    return None
-
-def obter_coordenadas(endereco_completo):
-    """Converte endereço em Latitude/Longitude para o mapa."""
-    geolocator = ArcGIS()
-    try:
-        # Tenta geocodificar o endereço
-        location = geolocator.geocode(endereco_completo, timeout=5)
-        if location:
-            return location.latitude, location.longitude
-    except:
-        return None, None
-    return None, None
-
-def salvar_foto_perfil(arquivo_foto, id_cliente):
-    if arquivo_foto is None: return None
-    extensao = arquivo_foto.name.split(".")[-1]
-    nome_arquivo = f"cliente_{id_cliente}.{extensao}"
-    caminho_completo = os.path.join(PASTA_FOTOS, nome_arquivo)
-    with open(caminho_completo, "wb") as f: f.write(arquivo_foto.getbuffer())
-    return nome_arquivo
-
-def formatar_data_br(data_str):
-    """Tenta mostrar a data no formato DD/MM/AAAA"""
-    if not data_str: return "-"
-    try:
-        if "-" in data_str: # Formato ISO YYYY-MM-DD
-            data_obj = datetime.strptime(data_str, "%Y-%m-%d")
-            return data_obj.strftime("%d/%m/%Y")
-        return data_str
-    except:
-        return data_str
-
-# --- CARREGAMENTO DE DADOS ---
-clientes = carregar_dados()
-
-# --- INTERFACE ---
-tab_consulta, tab_novo = st.tabs(["🔍 Consultar & Mapa", "➕ Novo Cadastro Completo"])
-
-# ==================================================
-# ABA 1: CONSULTA E MAPA
-# ==================================================
-with tab_consulta:
-    if not clientes:
-        st.info("Nenhum cliente cadastrado. Vá na aba 'Novo Cadastro' para começar.")
-    else:
-        # Seleção de Cliente
-        opcoes_busca = [f"{c['id']} - {c['nome']}" for c in clientes]
-        selecionado_str = st.selectbox("Selecione o Cliente:", options=opcoes_busca)
-        
-        if selecionado_str:
-            id_selecionado = int(selecionado_str.split(" - ")[0])
-            cliente = next(c for c in clientes if c["id"] == id_selecionado)
-            index_cliente = clientes.index(cliente)
-            
-            st.markdown("---")
-            
-            col_foto, col_dados = st.columns([1, 2])
-            
-            # --- COLUNA DA ESQUERDA: FOTO E MAPA ---
-            with col_foto:
-                # Foto
-                foto_atual = cliente.get("foto")
-                if foto_atual and os.path.exists(os.path.join(PASTA_FOTOS, foto_atual)):
-                    st.image(os.path.join(PASTA_FOTOS, foto_atual), width=200)
-                else:
-                    st.image("https://cdn-icons-png.flaticon.com/512/3135/3135715.png", width=150)
-                
-                # Upload Foto
-                with st.expander("📸 Alterar Foto"):
-                    nova_foto = st.file_uploader("Enviar nova foto", type=["jpg", "png"])
-                    if st.button("Salvar Foto"):
-                        if nova_foto:
-                            nome_salvo = salvar_foto_perfil(nova_foto, cliente['id'])
-                            clientes[index_cliente]["foto"] = nome_salvo
-                            salvar_dados(clientes)
-                            st.rerun()
-
-                # Mapa Automático
-                st.markdown("### 🗺️ Localização")
-                end = cliente.get('endereco', {})
-                endereco_str = f"{end.get('logradouro','')}, {end.get('numero','')}, {end.get('municipio','')}, {end.get('estado','')}, {end.get('pais','Brasil')}"
-                cep_str = end.get('cep', '')
-                
-                # Botão para gerar mapa
-                if st.button("📍 Carregar Mapa no Google"):
-                    with st.spinner("Gerando mapa..."):
-                        # Tenta pelo endereço completo, se falhar tenta pelo CEP
-                        busca_mapa = endereco_str if len(endereco_str) > 15 else f"{cep_str}, Brasil"
-                        lat, lon = obter_coordenadas(busca_mapa)
-                        
-                    if lat and lon:
-                        st.map(pd.DataFrame({'lat': [lat], 'lon': [lon]}), zoom=15)
-                    else:
-                        st.error("Endereço não encontrado no mapa.")
-
-            # --- COLUNA DA DIREITA: DADOS COMPLETOS ---
-            with col_dados:
-                st.subheader(f"Ficha de: {cliente['nome']}")
-                
-                c1, c2, c3 = st.columns(3)
-                c1.markdown(f"**CPF:** {cliente.get('cpf', '-')}")
-                c2.markdown(f"**RG:** {cliente.get('rg', '-')}")
-                c3.markdown(f"**Nascimento:** {formatar_data_br(cliente.get('nascimento', ''))}")
-                
-                st.markdown(f"**Telefone:** {cliente['contato'].get('telefone', '-')}")
-                st.markdown(f"**WhatsApp:** {cliente['contato'].get('whatsapp', '-')}")
-                
-                st.divider()
-                st.markdown("#### 🏠 Endereço")
-                e = cliente.get('endereco', {})
-                st.text(f"CEP: {e.get('cep','-')}")
-                st.text(f"{e.get('logradouro','-')}, {e.get('numero','-')}")
-                st.text(f"Bairro: {e.get('bairro','-')}")
-                st.text(f"{e.get('municipio','-')} - {e.get('estado','-')}")
-                st.text(f"País: {e.get('pais','-')}")
-                
-                # Botão de Exclusão
-                st.markdown("<br>", unsafe_allow_html=True)
-                if st.button("🗑️ Excluir Cliente", type="primary"):
-                    clientes.pop(index_cliente)
-                    salvar_dados(clientes)
-                    st.success("Cliente removido!")
-                    st.rerun()
-
-# ==================================================
-# ABA 2: NOVO CADASTRO
-# ==================================================
-with tab_novo:
-    st.subheader("📝 Ficha Cadastral")
-    
-    with st.form("form_novo_cliente"):
-        # GRUPO 1: DADOS PESSOAIS
-        st.markdown("##### 1. Dados Pessoais")
-        col_nome, col_nasc = st.columns([3, 1])
-        n_nome = col_nome.text_input("Nome Completo *")
-        n_nasc = col_nasc.date_input("Data de Nascimento", min_value=date(1920, 1, 1), format="DD/MM/YYYY")
-        
-        c_cpf, c_rg = st.columns(2)
-        n_cpf = c_cpf.text_input("CPF")
-        n_rg = c_rg.text_input("RG")
-        
-        # GRUPO 2: CONTATO
-        st.markdown("##### 2. Contato")
-        c_tel, c_zap = st.columns(2)
-        n_tel = c_tel.text_input("Telefone Fixo")
-        n_zap = c_zap.text_input("WhatsApp *")
-        
-        # GRUPO 3: ENDEREÇO (COM CEP AUTOMÁTICO)
-        st.markdown("##### 3. Endereço")
-        
-        # Layout para busca de CEP
-        c_cep_in, c_cep_btn = st.columns([3, 1])
-        cep_digitado = c_cep_in.text_input("CEP (Somente números)", key="input_cep_novo")
-        
-        # Variáveis de estado para preencher os campos automaticamente
-        if 'end_auto' not in st.session_state:
-            st.session_state.end_auto = {}
-
-        # Botão de busca de CEP (fora do form para funcionar dinamicamente seria ideal, 
-        # mas dentro do form precisa de submit. Vamos usar um botão "fake" de submit para atualizar)
-        if c_cep_btn.form_submit_button("🔍 Buscar CEP"):
-            dados_cep = busca_cep_api(cep_digitado)
-            if dados_cep:
-                st.session_state.end_auto = dados_cep
-                st.success("Endereço encontrado!")
-            else:
-                st.error("CEP não encontrado.")
-        
-        # Pega valores do estado ou vazio
-        val_rua = st.session_state.end_auto.get("logradouro", "")
-        val_bairro = st.session_state.end_auto.get("bairro", "")
-        val_cidade = st.session_state.end_auto.get("localidade", "")
-        val_uf = st.session_state.end_auto.get("uf", "")
-        val_pais = st.session_state.end_auto.get("pais", "Brasil")
-        
-        c_rua, c_num = st.columns([3, 1])
-        n_rua = c_rua.text_input("Rua / Logradouro", value=val_rua)
-        n_num = c_num.text_input("Número")
-        
-        c_bairro, c_mun = st.columns(2)
-        n_bairro = c_bairro.text_input("Bairro", value=val_bairro)
-        n_mun = c_mun.text_input("Município", value=val_cidade)
-        
-        c_uf, c_pais = st.columns(2)
-        n_uf = c_uf.text_input("Estado (UF)", value=val_uf)
-        n_pais = c_pais.text_input("País", value=val_pais)
-        
-        st.markdown("---")
-        
-        if st.form_submit_button("✅ SALVAR CADASTRO", type="primary"):
-            if n_nome and n_zap:
-                novo_id = 1
-                if clientes:
-                    novo_id = max([c['id'] for c in clientes]) + 1
-                
-                novo_cliente = {
-                    "id": novo_id,
-                    "nome": n_nome,
-                    "cpf": n_cpf,
-                    "rg": n_rg,
-                    "nascimento": n_nasc.strftime("%Y-%m-%d"),
-                    "contato": {
-                        "telefone": n_tel,
-                        "whatsapp": n_zap
-                    },
-                    "endereco": {
-                        "cep": cep_digitado,
-                        "logradouro": n_rua,
-                        "numero": n_num,
-                        "bairro": n_bairro,
-                        "municipio": n_mun,
-                        "estado": n_uf,
-                        "pais": n_pais
-                    },
-                    "historico_vendas": [],
-                    "receitas": []
-                }
-                
-                clientes.append(novo_cliente)
-                salvar_dados(clientes)
-                
-                # Limpa estado do CEP
-                st.session_state.end_auto = {}
-                st.success(f"Cliente {n_nome} cadastrado com sucesso!")
-                st.rerun()
-            else:
-                st.warning("Preencha pelo menos o Nome e o WhatsApp.")
\ No newline at end of file
+import streamlit as st
+import pandas as pd
+from datetime import date
+from concurrent.futures import wait
+from modules.dados import ConflitoVersao
+from modules.cep import buscar_cep_em_segundo_plano
+from modules.geo import coordenadas_cliente, pontos_mapa, total_sem_coordenada, iniciar_lote, estado_lote
+from modules.datas import dia_iso, formatar_br
+from modules.foto import salvar_foto, miniatura
+from modules.cliente import ids_clientes, obter_cliente, cadastrar_cliente, alterar_cliente, excluir_cliente, unir_clientes
+from modules.duplicados import sugestoes
+from modules.importacao_clientes import importar_clientes, COLUNAS as COLUNAS_IMPORTACAO
+from modules.ui import configurar_pagina_padrao, seletor_cliente
+
+# 1. Aplica o visual vermelho e fundo cinza
+configurar_pagina_padrao()
+
+ESPERA_CEP = 0.3  # segundos esperando a consulta antes de soltar a tela (CEP em cache responde na hora)
+
+st.title("👤 Gestão de Clientes 360º")
+
+# --- FUNÇÕES UTILITÁRIAS ---
+def resumo_ficha(cliente):
+    """Linhas curtas para comparar duas fichas lado a lado"""
+    contato = cliente.get("contato", {})
+    end = cliente.get("endereco", {})
+    return (f"**#{cliente['id']} {cliente['nome']}**  \n"
+            f"CPF: {cliente.get('cpf') or '-'} · Nasc.: {formatar_br(cliente.get('nascimento', ''))}  \n"
+            f"WhatsApp: {contato.get('whatsapp') or '-'} · Tel.: {contato.get('telefone') or '-'}  \n"
+            f"{end.get('logradouro') or '-'}, {end.get('numero') or '-'} · {end.get('municipio') or '-'}  \n"
+            f"{len(cliente.get('historico_vendas', []))} vendas · {len(cliente.get('receitas', []))} receitas · "
+            f"{len(cliente.get('historico_orcamentos', []))} orçamentos")
+
+
+def receber_cep(consulta):
+    """Preenche o endereço do cadastro com o resultado da consulta de CEP"""
+    st.session_state.end_auto = consulta.result() or {}
+    st.session_state.aviso_cep = bool(st.session_state.end_auto)
+
+
+@st.fragment(run_every=1)
+def aguardar_cep():
+    """Enquanto o CEP é consultado em segundo plano, confere a cada segundo se a resposta chegou"""
+    consulta = st.session_state.get("cep_pendente")
+    if consulta is None:
+        return
+    if not consulta.done():
+        st.caption("🔍 Consultando o CEP... pode continuar preenchendo a ficha.")
+        return
+    st.session_state.cep_pendente = None
+    receber_cep(consulta)
+    st.rerun()
+
+
+# --- CARREGAMENTO DE DADOS ---
+ids_cadastrados = ids_clientes()
+
+# --- INTERFACE ---
+tab_consulta, tab_novo, tab_mapa, tab_dup = st.tabs(["🔍 Consultar & Mapa", "➕ Novo Cadastro Completo", "🗺️ Mapa de Clientes", "👥 Cadastros Repetidos"])
+
+# ==================================================
+# ABA 1: CONSULTA E MAPA
+# ==================================================
+with tab_consulta:
+    if not ids_cadastrados:
+        st.info("Nenhum cliente cadastrado. Vá na aba 'Novo Cadastro' para começar.")
+    else:
+        # Seleção de Cliente
+        id_selecionado = seletor_cliente("Selecione o Cliente:", key="c360_cli_sel")
+        
+        if id_selecionado is not None:
+            cliente = obter_cliente(id_selecionado)
+            
+            st.markdown("---")
+            
+            col_foto, col_dados = st.columns([1, 2])
+            
+            # --- COLUNA DA ESQUERDA: FOTO E MAPA ---
+            with col_foto:
+                # Foto
+                # Miniatura em cache (alguns KB), nunca a foto original do celular
+                foto_atual = miniatura(cliente.get("foto"), "perfil")
+                if foto_atual:
+                    st.image(foto_atual, width=200)
+                else:
+                    st.image("https://cdn-icons-png.flaticon.com/512/3135/3135715.png", width=150)
+                
+                # Upload Foto
+                with st.expander("📸 Alterar Foto"):
+                    nova_foto = st.file_uploader("Enviar nova foto", type=["jpg", "jpeg", "png"])
+                    if st.button("Salvar Foto"):
+                        if nova_foto:
+                            try:
+                                nome_salvo = salvar_foto(nova_foto.getvalue())
+                            except ValueError:
+                                st.error("Não foi possível ler esta imagem.")
+                                st.stop()
+                            try:
+                                # Só a foto: vendas ou receitas gravadas no meio tempo continuam lá
+                                alterar_cliente(cliente, {"foto": nome_salvo})
+                            except ConflitoVersao:
+                                st.error("A foto foi trocada por outra sessão. Tente novamente.")
+                                st.stop()
+                            st.rerun()
+
+                # Mapa Automático
+                st.markdown("### 🗺️ Localização")
+                
+                # Botão para gerar mapa (usa a coordenada gravada na ficha; só consulta se o endereço mudou)
+                if st.button("📍 Carregar Mapa no Google"):
+                    with st.spinner("Gerando mapa..."):
+                        lat, lon = coordenadas_cliente(cliente)
+                        
+                    if lat and lon:
+                        st.map(pd.DataFrame({'lat': [lat], 'lon': [lon]}), zoom=15)
+                    else:
+                        st.error("Endereço não encontrado no mapa.")
+
+            # --- COLUNA DA DIREITA: DADOS COMPLETOS ---
+            with col_dados:
+                st.subheader(f"Ficha de: {cliente['nome']}")
+                
+                c1, c2, c3 = st.columns(3)
+                c1.markdown(f"**CPF:** {cliente.get('cpf', '-')}")
+                c2.markdown(f"**RG:** {cliente.get('rg', '-')}")
+                c3.markdown(f"**Nascimento:** {formatar_br(cliente.get('nascimento', ''))}")
+                
+                st.markdown(f"**Telefone:** {cliente['contato'].get('telefone', '-')}")
+                st.markdown(f"**WhatsApp:** {cliente['contato'].get('whatsapp', '-')}")
+                
+                st.divider()
+                st.markdown("#### 🏠 Endereço")
+                e = cliente.get('endereco', {})
+                st.text(f"CEP: {e.get('cep','-')}")
+                st.text(f"{e.get('logradouro','-')}, {e.get('numero','-')}")
+                st.text(f"Bairro: {e.get('bairro','-')}")
+                st.text(f"{e.get('municipio','-')} - {e.get('estado','-')}")
+                st.text(f"País: {e.get('pais','-')}")
+                
+                # Botão de Exclusão
+                st.markdown("<br>", unsafe_allow_html=True)
+                if st.button("🗑️ Excluir Cliente", type="primary"):
+                    excluir_cliente(cliente["id"])
+                    st.success("Cliente removido!")
+                    st.rerun()
+
+# ==================================================
+# ABA 2: NOVO CADASTRO
+# ==================================================
+with tab_novo:
+    st.subheader("📝 Ficha Cadastral")
+    if st.session_state.get("cep_pendente") is not None:
+        aguardar_cep()
+    aviso_cep = st.session_state.pop("aviso_cep", None)
+    if aviso_cep:
+        st.success("Endereço encontrado!")
+    elif aviso_cep is not None:
+        st.error("CEP não encontrado.")
+    
+    with st.form("form_novo_cliente"):
+        # GRUPO 1: DADOS PESSOAIS
+        st.markdown("##### 1. Dados Pessoais")
+        col_nome, col_nasc = st.columns([3, 1])
+        n_nome = col_nome.text_input("Nome Completo *")
+        n_nasc = col_nasc.date_input("Data de Nascimento", min_value=date(1920, 1, 1), format="DD/MM/YYYY")
+        
+        c_cpf, c_rg = st.columns(2)
+        n_cpf = c_cpf.text_input("CPF")
+        n_rg = c_rg.text_input("RG")
+        
+        # GRUPO 2: CONTATO
+        st.markdown("##### 2. Contato")
+        c_tel, c_zap = st.columns(2)
+        n_tel = c_tel.text_input("Telefone Fixo")
+        n_zap = c_zap.text_input("WhatsApp *")
+        
+        # GRUPO 3: ENDEREÇO (COM CEP AUTOMÁTICO)
+        st.markdown("##### 3. Endereço")
+        
+        # Layout para busca de CEP
+        c_cep_in, c_cep_btn = st.columns([3, 1])
+        cep_digitado = c_cep_in.text_input("CEP (Somente números)", key="input_cep_novo")
+        
+        # Variáveis de estado para preencher os campos automaticamente
+        if 'end_auto' not in st.session_state:
+            st.session_state.end_auto = {}
+
+        # Botão de busca de CEP (fora do form para funcionar dinamicamente seria ideal, 
+        # mas dentro do form precisa de submit. Vamos usar um botão "fake" de submit para atualizar)
+        # A consulta roda em outra thread: se a internet demorar, a tela não fica presa nela
+        if c_cep_btn.form_submit_button("🔍 Buscar CEP"):
+            consulta = buscar_cep_em_segundo_plano(cep_digitado)
+            wait([consulta], timeout=ESPERA_CEP)
+            if consulta.done():
+                receber_cep(consulta)
+            else:
+                st.session_state.cep_pendente = consulta
+            st.rerun()
+        
+        # Pega valores do estado ou vazio
+        val_rua = st.session_state.end_auto.get("logradouro", "")
+        val_bairro = st.session_state.end_auto.get("bairro", "")
+        val_cidade = st.session_state.end_auto.get("localidade", "")
+        val_uf = st.session_state.end_auto.get("uf", "")
+        val_pais = st.session_state.end_auto.get("pais", "Brasil")
+        
+        c_rua, c_num = st.columns([3, 1])
+        n_rua = c_rua.text_input("Rua / Logradouro", value=val_rua)
+        n_num = c_num.text_input("Número")
+        
+        c_bairro, c_mun = st.columns(2)
+        n_bairro = c_bairro.text_input("Bairro", value=val_bairro)
+        n_mun = c_mun.text_input("Município", value=val_cidade)
+        
+        c_uf, c_pais = st.columns(2)
+        n_uf = c_uf.text_input("Estado (UF)", value=val_uf)
+        n_pais = c_pais.text_input("País", value=val_pais)
+        
+        st.markdown("---")
+        
+        if st.form_submit_button("✅ SALVAR CADASTRO", type="primary"):
+            if n_nome and n_zap:
+                novo_cliente = {
+                    "nome": n_nome,
+                    "cpf": n_cpf,
+                    "rg": n_rg,
+                    "nascimento": dia_iso(n_nasc),
+                    "contato": {
+                        "telefone": n_tel,
+                        "whatsapp": n_zap
+                    },
+                    "endereco": {
+                        "cep": cep_digitado,
+                        "logradouro": n_rua,
+                        "numero": n_num,
+                        "bairro": n_bairro,
+                        "municipio": n_mun,
+                        "estado": n_uf,
+                        "pais": n_pais
+                    },
+                    "historico_vendas": [],
+                    "receitas": []
+                }
+                
+                cadastrar_cliente(novo_cliente)
+                
+                # Limpa estado do CEP
+                st.session_state.end_auto = {}
+                st.success(f"Cliente {n_nome} cadastrado com sucesso!")
+                st.rerun()
+            else:
+                st.warning("Preencha pelo menos o Nome e o WhatsApp.")
+
+    # --- IMPORTAÇÃO EM LOTE (PLANILHA) ---
+    with st.expander("📥 Importar clientes de uma planilha (CSV ou Excel)"):
+        st.caption("Colunas: " + ", ".join(COLUNAS_IMPORTACAO) + ". Precisa de nome e de CPF ou WhatsApp. "
+                   "Quem já está cadastrado (mesmo CPF ou WhatsApp) ou se repete no arquivo é pulado.")
+        arquivo_cli = st.file_uploader("Planilha", type=["csv", "xlsx"], key="upload_clientes")
+        i1, i2 = st.columns(2)
+        completar_cep = i1.checkbox("Completar endereço pelo CEP", value=False,
+                                    help="Consulta cada CEP diferente uma vez (cache, base offline e internet).")
+        simular_cli = i2.checkbox("Só conferir (não grava)", value=True, key="simular_clientes")
+        if arquivo_cli is not None and st.button("🚀 Processar planilha", type="primary", key="importar_clientes"):
+            try:
+                with st.spinner("Lendo, conferindo duplicados" + (" e consultando CEPs..." if completar_cep else "...")):
+                    relatorio = importar_clientes(arquivo_cli, arquivo_cli.name, completar_cep=completar_cep,
+                                                  simular=simular_cli)
+            except ValueError as erro:
+                st.error(str(erro))
+            else:
+                verbo = "seriam cadastrados" if simular_cli else "cadastrados"
+                texto = (f"{relatorio['lidas']} linhas lidas em {relatorio['segundos']} s: "
+                         f"{relatorio['novos']} {verbo}, {relatorio['duplicados']} já existiam ou se repetem.")
+                if completar_cep:
+                    texto += f" {relatorio['enderecos']} endereços completados ({relatorio['ceps']} CEPs consultados)."
+                if relatorio["ids"]:
+                    texto += f" Ids {relatorio['ids'][0]} a {relatorio['ids'][1]}."
+                st.success(texto)
+                if relatorio["recusadas"]:
+                    st.warning(f"{relatorio['recusadas']} linhas não entraram"
+                               + (f" (mostrando {len(relatorio['exemplos'])})" if relatorio["recusadas"] > len(relatorio["exemplos"]) else ""))
+                    st.dataframe(pd.DataFrame(relatorio["exemplos"]), hide_index=True, use_container_width=True)
+
+# ==================================================
+# ABA 3: MAPA DE TODOS OS CLIENTES
+# ==================================================
+with tab_mapa:
+    # Só lê as coordenadas já gravadas nas fichas: nenhuma consulta à internet aqui
+    pontos = pontos_mapa()
+    lote = estado_lote()
+    
+    c_info, c_btn = st.columns([3, 1])
+    c_info.markdown(f"**{len(pontos)} clientes no mapa**")
+    if lote["rodando"]:
+        c_info.progress(lote["feitos"] / lote["total"] if lote["total"] else 0.0,
+                        text=f"Localizando endereços: {lote['feitos']} de {lote['total']}...")
+        if c_btn.button("🔄 Atualizar"):
+            st.rerun()
+    else:
+        pendentes = total_sem_coordenada()
+        if pendentes:
+            c_info.caption(f"{pendentes} clientes com endereço ainda sem localização.")
+            if c_btn.button("📍 Localizar Pendentes"):
+                iniciar_lote()
+                st.rerun()
+        if lote["fim"]:
+            c_info.caption(f"Última localização: {lote['achados']} de {lote['total']} encontrados.")
+    
+    if pontos:
+        st.map(pd.DataFrame(pontos), latitude="lat", longitude="lon")
+    else:
+        st.info("Nenhum cliente localizado ainda.")
+
+
+# ==================================================
+# ABA 4: CADASTROS REPETIDOS
+# ==================================================
+POR_PAGINA_DUP = 20
+
+with tab_dup:
+    st.caption("Compara só quem divide CPF, final do telefone, nome e sobrenome ou nome e nascimento. "
+               "Ao unir, vendas, receitas e orçamentos passam para a ficha mantida e os campos vazios dela "
+               "são completados pela outra.")
+    if st.button("🔎 Procurar cadastros repetidos"):
+        with st.spinner("Comparando cadastros..."):
+            st.session_state.dup_sugestoes = sugestoes()
+        st.session_state.dup_ignorados = set()
+
+    if "dup_sugestoes" in st.session_state:
+        ignorados = st.session_state.setdefault("dup_ignorados", set())
+        # Pares já unidos (um dos lados sumiu) ou marcados como pessoas diferentes saem da lista
+        pendentes_dup = [
+            s for s in st.session_state.dup_sugestoes
+            if s["ids"] not in ignorados and all(obter_cliente(i) for i in s["ids"])
+        ]
+        if not pendentes_dup:
+            st.success("Nenhum cadastro repetido encontrado.")
+        else:
+            st.markdown(f"**{len(pendentes_dup)} possíveis repetições** (mostrando as {min(POR_PAGINA_DUP, len(pendentes_dup))} mais prováveis)")
+        for sugestao in pendentes_dup[:POR_PAGINA_DUP]:
+            id_a, id_b = sugestao["ids"]
+            with st.container(border=True):
+                st.markdown(f"Semelhança **{sugestao['nota']:.0%}**: {', '.join(sugestao['motivos'])}")
+                col_a, col_b = st.columns(2)
+                col_a.markdown(resumo_ficha(obter_cliente(id_a)))
+                col_b.markdown(resumo_ficha(obter_cliente(id_b)))
+                b1, b2, b3 = st.columns(3)
+                manter = None
+                if b1.button(f"⬅️ Manter #{id_a}", key=f"dup_a_{id_a}_{id_b}"):
+                    manter, outro = id_a, id_b
+                if b2.button(f"Manter #{id_b} ➡️", key=f"dup_b_{id_a}_{id_b}"):
+                    manter, outro = id_b, id_a
+                if b3.button("🚫 Não é a mesma pessoa", key=f"dup_n_{id_a}_{id_b}"):
+                    ignorados.add(sugestao["ids"])
+                    st.rerun()
+                if manter is not None:
+                    try:
+                        unir_clientes(manter, [outro])
+                    except ConflitoVersao:
+                        st.error("Um dos cadastros foi alterado por outra sessão. Procure de novo.")
+                        st.stop()
+                    st.success(f"Cadastro #{outro} unido ao #{manter}.")
+                    st.rerun()
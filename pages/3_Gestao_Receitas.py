@@ -1,89 +1,80 @@
-import streamlit as st
-import pandas as pd
-from datetime import datetime, date
-from modules.dados import carregar_dados, salvar_dados
-from modules.ui import configurar_pagina_padrao
-
-configurar_pagina_padrao()
-
-st.title("🩺 Gestão Clínica & Receituário")
-
-clientes = carregar_dados()
-if not clientes:
-    st.error("Cadastre clientes primeiro.")
-    st.stop()
-
-def calcular_idade(data_str):
-    if not data_str: return "?"
-    try: nasc = datetime.strptime(data_str, "%d/%m/%Y").date()
-    except: 
-        try: nasc = datetime.strptime(data_str, "%Y-%m-%d").date()
-        except: return "?"
-    hoje = date.today()
-    return hoje.year - nasc.year - ((hoje.month, hoje.day) < (nasc.month, nasc.day))
-
-aba_nova, aba_crm = st.tabs(["📝 Nova Receita", "🔔 CRM Vencimentos"])
-
-with aba_nova:
-    lista_pacientes = [f"{c['id']} - {c['nome']}" for c in clientes]
-    paciente_sel = st.selectbox("Selecione o Paciente:", lista_pacientes)
-    cliente_obj = next(c for c in clientes if c['id'] == int(paciente_sel.split(" - ")[0]))
-    
-    st.info(f"Paciente: **{cliente_obj['nome']}** | Idade: {calcular_idade(cliente_obj.get('nascimento',''))} anos")
-    
-    with st.form("form_receita"):
-        data_exame = st.date_input("Data do Exame", format="DD/MM/YYYY")
-        medico = st.text_input("Médico Responsável")
-        
-        st.markdown("### 👓 Dioptria")
-        c1, c2 = st.columns(2)
-        with c1:
-            st.markdown("**Olho Direito**")
-            esf_od = st.number_input("Esf OD", step=0.25)
-            cil_od = st.number_input("Cil OD", step=0.25)
-            eixo_od = st.number_input("Eixo OD", step=1)
-        with c2:
-            st.markdown("**Olho Esquerdo**")
-            esf_oe = st.number_input("Esf OE", step=0.25)
-            cil_oe = st.number_input("Cil OE", step=0.25)
-            eixo_oe = st.number_input("Eixo OE", step=1)
-            
-        adicao = st.number_input("Adição", step=0.25)
-        obs = st.text_area("Obs")
-        
-        if st.form_submit_button("💾 Salvar"):
-            nova_receita = {
-                "data": data_exame.strftime("%d/%m/%Y"),
-                "medico": medico,
-                "od": {"esf": esf_od, "cil": cil_od, "eixo": eixo_od},
-                "oe": {"esf": esf_oe, "cil": cil_oe, "eixo": eixo_oe},
-                "adicao": adicao, "obs": obs
-            }
-            if "receitas" not in cliente_obj: cliente_obj["receitas"] = []
-            cliente_obj["receitas"].append(nova_receita)
-            salvar_dados(clientes)
-            st.success("Salvo!")
-
-    st.divider()
-    if "receitas" in cliente_obj and cliente_obj["receitas"]:
-        st.write("Histórico:")
-        for rx in reversed(cliente_obj["receitas"]):
-            st.text(f"📅 {rx['data']} - Dr. {rx.get('medico','-')}")
-
-with aba_crm:
-    st.subheader("🔔 Vencimentos (> 1 ano)")
-    vencidos = []
-    hoje = datetime.now()
-    for c in clientes:
-        if c.get("receitas"):
-            try:
-                dt_str = c["receitas"][-1]["data"]
-                if "/" in dt_str: dt_rx = datetime.strptime(dt_str, "%d/%m/%Y")
-                else: dt_rx = datetime.strptime(dt_str, "%Y-%m-%d")
-                
-                if (hoje - dt_rx).days > 365:
-                    vencidos.append({"Cliente": c["nome"], "WhatsApp": c["contato"]["whatsapp"]})
-            except: pass
-            
-    if vencidos: st.dataframe(pd.DataFrame(vencidos), use_container_width=True)
+import streamlit as st
+import pandas as pd
+from modules.dados import carregar_dados, inserir_receita
+from modules.cliente import obter_cliente
+from modules.receita import lista_do_dia
+from modules.datas import dia_iso, formatar_br, idade
+from modules.ui import configurar_pagina_padrao, seletor_cliente
+
+configurar_pagina_padrao()
+
+st.title("🩺 Gestão Clínica & Receituário")
+
+clientes = carregar_dados()
+if not clientes:
+    st.error("Cadastre clientes primeiro.")
+    st.stop()
+
+aba_nova, aba_crm = st.tabs(["📝 Nova Receita", "🔔 CRM Vencimentos"])
+
+with aba_nova:
+    paciente_sel = seletor_cliente("Selecione o Paciente:", key="rx_cli_sel")
+    cliente_obj = obter_cliente(paciente_sel)
+
+    if cliente_obj is None:
+        st.info("Nenhum paciente encontrado.")
+    else:
+        st.info(f"Paciente: **{cliente_obj['nome']}** | Idade: {idade(cliente_obj.get('nascimento')) or '?'} anos")
+    
+        with st.form("form_receita"):
+            data_exame = st.date_input("Data do Exame", format="DD/MM/YYYY")
+            medico = st.text_input("Médico Responsável")
+        
+            st.markdown("### 👓 Dioptria")
+            c1, c2 = st.columns(2)
+            with c1:
+                st.markdown("**Olho Direito**")
+                esf_od = st.number_input("Esf OD", step=0.25)
+                cil_od = st.number_input("Cil OD", step=0.25)
+                eixo_od = st.number_input("Eixo OD", step=1)
+            with c2:
+                st.markdown("**Olho Esquerdo**")
+                esf_oe = st.number_input("Esf OE", step=0.25)
+                cil_oe = st.number_input("Cil OE", step=0.25)
+                eixo_oe = st.number_input("Eixo OE", step=1)
+            
+            adicao = st.number_input("Adição", step=0.25)
+            obs = st.text_area("Obs")
+        
+            if st.form_submit_button("💾 Salvar"):
+                nova_receita = {
+                    "data": dia_iso(data_exame),
+                    "medico": medico,
+                    "od": {"esf": esf_od, "cil": cil_od, "eixo": eixo_od},
+                    "oe": {"esf": esf_oe, "cil": cil_oe, "eixo": eixo_oe},
+                    "adicao": adicao, "obs": obs
+                }
+                inserir_receita(cliente_obj["id"], nova_receita)
+                # Cópia local para mostrar no histórico sem mexer no cache compartilhado
+                cliente_obj = {**cliente_obj, "receitas": cliente_obj.get("receitas", []) + [nova_receita]}
+                st.success("Salvo!")
+
+        st.divider()
+        if "receitas" in cliente_obj and cliente_obj["receitas"]:
+            st.write("Histórico:")
+            for rx in reversed(cliente_obj["receitas"]):
+                st.text(f"📅 {formatar_br(rx['data'])} - Dr. {rx.get('medico','-')}")
+
+with aba_crm:
+    st.subheader("🔔 Vencimentos (> 1 ano)")
+    # Lista montada uma vez por dia a partir do índice de vencimentos (não percorre os clientes)
+    lista = lista_do_dia()
+    opcoes_crm = {"vencidas": "Já vencidas", "semana": "Vencem em até 7 dias", "mes": "Vencem em até 30 dias"}
+    grupo = st.radio("Mostrar:", list(opcoes_crm), format_func=lambda g: f"{opcoes_crm[g]} ({len(lista[g])})", horizontal=True)
+    linhas_crm = [
+        {"Cliente": c["nome"], "WhatsApp": c.get("contato", {}).get("whatsapp"),
+         "Vencimento": formatar_br(v)}
+        for v, c in lista[grupo]
+    ]
+    if linhas_crm: st.dataframe(pd.DataFrame(linhas_crm), use_container_width=True, hide_index=True)
     else: st.success("Tudo em dia!")
\ No newline at end of file
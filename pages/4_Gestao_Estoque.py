@@ -1,165 +1,364 @@
-import streamlit as st
-import pandas as pd
-from modules.dados import carregar_produtos, salvar_produtos
-from modules.ui import configurar_pagina_padrao
-
-# 1. Aplica o visual vermelho
-configurar_pagina_padrao()
-
-st.title("📦 Almoxarifado & Estoque")
-
-# --- CARREGA DADOS ---
-produtos = carregar_produtos()
-
-# --- METRICAS RÁPIDAS ---
-if produtos:
-    df = pd.DataFrame(produtos)
-    c1, c2, c3 = st.columns(3)
-    c1.metric("Itens Totais", int(df['quantidade'].sum()))
-    c2.metric("Valor em Estoque", f"R$ {(df['quantidade'] * df['preco']).sum():,.2f}")
-    c3.metric("SKUs Cadastrados", len(produtos))
-    st.markdown("---")
-
-# --- CONTROLE DE ESTADO (EDIÇÃO) ---
-if 'prod_edit_id' not in st.session_state:
-    st.session_state.prod_edit_id = None
-
-# --- LAYOUT DIVIDIDO ---
-col_lista, col_form = st.columns([1.5, 1])
-
-# ==================================================
-# COLUNA DA ESQUERDA: LISTA & BUSCA
-# ==================================================
-with col_lista:
-    st.subheader("📋 Lista de Produtos")
-    
-    filtro = st.text_input("🔍 Buscar por Nome ou Código", placeholder="Ex: Rayban...")
-    
-    # Filtra a lista
-    lista_exibicao = []
-    if produtos:
-        for p in produtos:
-            # Garante que as chaves existem para evitar erro
-            p_nome = p.get('nome', '')
-            p_cod = p.get('codigo', '')
-            
-            if filtro.lower() in p_nome.lower() or filtro in p_cod:
-                lista_exibicao.append(p)
-    
-    # Exibe a lista
-    if not lista_exibicao:
-        st.info("Nenhum produto encontrado.")
-    else:
-        # Cabeçalho da Tabela Visual
-        st.markdown(f"**Encontrados: {len(lista_exibicao)} produtos**")
-        
-        for i, prod in enumerate(lista_exibicao):
-            with st.container(border=True):
-                # Layout do Card: [Texto Descrição] [Botão Editar] [Botão Excluir]
-                c_txt, c_btn_edit, c_btn_del = st.columns([4, 1, 1])
-                
-                with c_txt:
-                    st.markdown(f"**{prod['nome']}**")
-                    st.caption(f"Cod: {prod.get('codigo','-')} | Qtd: {prod['quantidade']} | R$ {prod['preco']:.2f}")
-                
-                with c_btn_edit:
-                    if st.button("✏️", key=f"edit_{prod['id']}", help="Editar este produto"):
-                        st.session_state.prod_edit_id = prod['id']
-                        st.rerun()
-                
-                with c_btn_del:
-                    if st.button("🗑️", key=f"del_{prod['id']}", help="Excluir este produto"):
-                        # Remove da lista original
-                        produtos = [p for p in produtos if p['id'] != prod['id']]
-                        salvar_produtos(produtos)
-                        st.success("Deletado!")
-                        st.rerun()
-
-# ==================================================
-# COLUNA DA DIREITA: FORMULÁRIO INTELIGENTE
-# ==================================================
-with col_form:
-    # Verifica se estamos em MODO EDIÇÃO ou MODO NOVO
-    produto_em_edicao = None
-    if st.session_state.prod_edit_id is not None:
-        # Tenta achar o produto pelo ID
-        matches = [p for p in produtos if p['id'] == st.session_state.prod_edit_id]
-        if matches:
-            produto_em_edicao = matches[0]
-    
-    # --- MODO EDIÇÃO ---
-    if produto_em_edicao:
-        st.subheader(f"✏️ Editando Produto")
-        st.info(f"Alterando: {produto_em_edicao['nome']}")
-        
-        with st.form("form_editar_prod"):
-            e_nome = st.text_input("Nome", value=produto_em_edicao['nome'])
-            c1, c2 = st.columns(2)
-            e_cod = c1.text_input("Código", value=produto_em_edicao.get('codigo',''))
-            e_tipo = c2.selectbox("Tipo", ["Armação", "Lente", "Lente Contato", "Acessório"], 
-                                  index=["Armação", "Lente", "Lente Contato", "Acessório"].index(produto_em_edicao.get('tipo', 'Armação')) if produto_em_edicao.get('tipo') in ["Armação", "Lente", "Lente Contato", "Acessório"] else 0)
-            
-            c3, c4 = st.columns(2)
-            e_qtd = c3.number_input("Quantidade", value=int(produto_em_edicao['quantidade']), step=1)
-            e_preco = c4.number_input("Preço (R$)", value=float(produto_em_edicao['preco']), step=10.0)
-            
-            e_marca = st.text_input("Marca", value=produto_em_edicao.get('marca', ''))
-            
-            col_save, col_cancel = st.columns(2)
-            
-            if col_save.form_submit_button("💾 Salvar Alterações", type="primary"):
-                # Atualiza os dados na lista original
-                idx = produtos.index(produto_em_edicao)
-                produtos[idx]['nome'] = e_nome
-                produtos[idx]['codigo'] = e_cod
-                produtos[idx]['tipo'] = e_tipo
-                produtos[idx]['quantidade'] = e_qtd
-                produtos[idx]['preco'] = e_preco
-                produtos[idx]['marca'] = e_marca
-                
-                salvar_produtos(produtos)
-                st.session_state.prod_edit_id = None # Sai do modo edição
-                st.success("Produto atualizado!")
-                st.rerun()
-            
-            if col_cancel.form_submit_button("❌ Cancelar"):
-                st.session_state.prod_edit_id = None
-                st.rerun()
-
-    # --- MODO NOVO CADASTRO ---
-    else:
-        st.subheader("✨ Cadastrar Novo")
-        with st.form("form_novo_prod"):
-            n_nome = st.text_input("Nome do Produto")
-            c1, c2 = st.columns(2)
-            n_cod = c1.text_input("Código / SKU")
-            n_tipo = c2.selectbox("Tipo", ["Armação", "Lente", "Lente Contato", "Acessório"])
-            
-            c3, c4 = st.columns(2)
-            n_qtd = c3.number_input("Estoque Inicial", min_value=1, value=10)
-            n_preco = c4.number_input("Preço de Venda (R$)", min_value=0.0)
-            
-            n_marca = st.text_input("Marca / Fabricante")
-            
-            if st.form_submit_button("Cadastrar Produto"):
-                if n_nome and n_cod:
-                    # Gera um ID novo baseado no maior ID existente
-                    novo_id = 1000
-                    if produtos:
-                        novo_id = max([p['id'] for p in produtos]) + 1
-                    
-                    novo_prod = {
-                        "id": novo_id,
-                        "nome": n_nome,
-                        "codigo": n_cod,
-                        "tipo": n_tipo,
-                        "quantidade": n_qtd,
-                        "preco": n_preco,
-                        "marca": n_marca
-                    }
-                    produtos.append(novo_prod)
-                    salvar_produtos(produtos)
-                    st.success(f"{n_nome} cadastrado!")
-                    st.rerun()
-                else:
-                    st.warning("Preencha Nome e Código pelo menos.")
\ No newline at end of file
+import streamlit as st
+import pandas as pd
+import time
+import os
+from datetime import date, timedelta
+from modules.dados import (inserir_produto, alterar_produto, excluir_produto, movimentar_estoque,
+                           ConflitoVersao, EstoqueInsuficiente, ProdutoNaoEncontrado, TIPOS_MOVIMENTO)
+from modules.estoque import (movimentos, resumo_movimentos, estoque_em, reservas_ativas, listar_reservas,
+                             cancelar_reserva)
+from modules.produto import buscar_produtos, obter_produto, rotulo_produto, facetas, resumo_estoque, TIPOS_PRODUTO
+from modules.catalogo import importar_produtos, exportar_produtos, COLUNAS as COLUNAS_CATALOGO
+from modules.datas import formatar_br
+from modules.ui import configurar_pagina_padrao
+
+# 1. Aplica o visual vermelho
+configurar_pagina_padrao()
+
+st.title("📦 Almoxarifado & Estoque")
+
+ORDENS_LISTA = {None: "Cadastro", "nome": "Nome", "quantidade": "Quantidade", "preco": "Preço"}
+TAMANHOS_PAGINA = [10, 25, 50, 100]
+COLUNAS_GRADE = ["id", "codigo", "nome", "tipo", "marca", "quantidade", "preco"]
+
+# --- METRICAS RÁPIDAS (somadas no banco, sem montar DataFrame do catálogo) ---
+resumo = resumo_estoque()
+if resumo["skus"]:
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Itens Totais", resumo["itens"])
+    c2.metric("Valor em Estoque", f"R$ {resumo['valor']:,.2f}")
+    c3.metric("SKUs Cadastrados", resumo["skus"])
+    st.markdown("---")
+
+usuario_logado = st.session_state.get('usuario_atual', '')
+reservas = reservas_ativas()
+
+# --- CONTROLE DE ESTADO (EDIÇÃO) ---
+if 'prod_edit_id' not in st.session_state:
+    st.session_state.prod_edit_id = None
+
+# --- LAYOUT DIVIDIDO ---
+col_lista, col_form = st.columns([1.5, 1])
+
+# ==================================================
+# COLUNA DA ESQUERDA: LISTA & BUSCA
+# ==================================================
+with col_lista:
+    st.subheader("📋 Lista de Produtos")
+    inicio_render = time.perf_counter()
+    
+    filtro = st.text_input("🔍 Buscar por Nome ou Código", placeholder="Ex: Rayban...")
+    opcoes_filtro = facetas()
+    f_tipo, f_marca = st.columns(2)
+    filtro_tipo = f_tipo.selectbox("Tipo", [""] + list(opcoes_filtro["tipo"]), format_func=lambda v: v or "Todos")
+    filtro_marca = f_marca.selectbox("Marca", [""] + list(opcoes_filtro["marca"]), format_func=lambda v: v or "Todas")
+    
+    f_ordem, f_sentido, f_tam, f_modo = st.columns([1.3, 1, 1, 1.2])
+    ordem = f_ordem.selectbox("Ordenar por", list(ORDENS_LISTA), format_func=ORDENS_LISTA.get)
+    decrescente = f_sentido.selectbox("Sentido", [False, True], format_func=lambda d: "Decrescente" if d else "Crescente")
+    tam_pagina = f_tam.selectbox("Por página", TAMANHOS_PAGINA, index=1)
+    modo_lista = f_modo.radio("Exibir", ["Cartões", "Tabela"], horizontal=True)
+    
+    # Volta para a 1ª página quando a busca/ordem muda
+    assinatura_lista = (filtro, filtro_tipo, filtro_marca, ordem, decrescente, tam_pagina)
+    if st.session_state.get("estoque_assinatura") != assinatura_lista:
+        st.session_state.estoque_assinatura = assinatura_lista
+        st.session_state.estoque_pagina = 0
+    
+    # Só a página atual sai do índice: o nº de widgets não cresce com o catálogo
+    pagina = st.session_state.estoque_pagina
+    lista_exibicao, total_achados = buscar_produtos(
+        filtro, tipo=filtro_tipo, marca=filtro_marca, ordem=ordem, decrescente=decrescente,
+        limite=tam_pagina, inicio=pagina * tam_pagina
+    )
+    total_paginas = max(1, -(-total_achados // tam_pagina))
+    if pagina >= total_paginas:
+        # Ex.: excluiu o último item da última página
+        st.session_state.estoque_pagina = total_paginas - 1
+        st.rerun()
+    
+    # Exibe a lista
+    if not lista_exibicao:
+        st.info("Nenhum produto encontrado.")
+    else:
+        # Cabeçalho da Tabela Visual
+        st.markdown(f"**Encontrados: {total_achados} produtos** — página {pagina + 1} de {total_paginas}")
+        
+        if modo_lista == "Tabela":
+            # Grade compacta: um único widget para a página inteira
+            df_pagina = pd.DataFrame(lista_exibicao)[COLUNAS_GRADE]
+            editado = st.data_editor(
+                df_pagina, hide_index=True, use_container_width=True, disabled=["id"],
+                key=f"grade_estoque_{pagina}", column_config={
+                    "tipo": st.column_config.SelectboxColumn("tipo", options=TIPOS_PRODUTO),
+                    "preco": st.column_config.NumberColumn("preco", format="R$ %.2f", min_value=0.0),
+                    "quantidade": st.column_config.NumberColumn("quantidade", step=1),
+                }
+            )
+            alterados = [
+                (original, novo) for original, novo in zip(lista_exibicao, editado.to_dict("records"))
+                if any(novo[c] != original.get(c) for c in COLUNAS_GRADE)
+            ]
+            if alterados and st.button(f"💾 Salvar {len(alterados)} alteração(ões) da tabela", type="primary"):
+                conflitos = []
+                for original, novo in alterados:
+                    novo = {**novo, "quantidade": int(novo["quantidade"]), "preco": float(novo["preco"])}
+                    try:
+                        # Só as células mudadas: uma venda no meio tempo não é desfeita
+                        alterar_produto(original, {c: novo[c] for c in COLUNAS_GRADE if novo[c] != original.get(c)},
+                                        usuario=usuario_logado)
+                    except (ConflitoVersao, ProdutoNaoEncontrado):
+                        conflitos.append(original['nome'])
+                if conflitos:
+                    st.error(f"Alterados por outra pessoa enquanto você editava (não salvos): {', '.join(conflitos)}")
+                else:
+                    st.success("Tabela salva!")
+                    st.rerun()
+        else:
+            for prod in lista_exibicao:
+                with st.container(border=True):
+                    # Layout do Card: [Texto Descrição] [Botão Editar] [Botão Excluir]
+                    c_txt, c_btn_edit, c_btn_del = st.columns([4, 1, 1])
+                    
+                    with c_txt:
+                        st.markdown(f"**{prod['nome']}**")
+                        reservado = reservas.get(prod['id'])
+                        st.caption(f"Cod: {prod.get('codigo','-')} | Qtd: {prod['quantidade']}"
+                                   + (f" ({reservado} reservada(s))" if reservado else "")
+                                   + f" | R$ {prod['preco']:.2f}")
+                    
+                    with c_btn_edit:
+                        if st.button("✏️", key=f"edit_{prod['id']}", help="Editar este produto"):
+                            st.session_state.prod_edit_id = prod['id']
+                            st.session_state.prod_edit_original = prod
+                            st.rerun()
+                    
+                    with c_btn_del:
+                        if st.button("🗑️", key=f"del_{prod['id']}", help="Excluir este produto"):
+                            excluir_produto(prod['id'], usuario=usuario_logado)
+                            st.success("Deletado!")
+                            st.rerun()
+        
+        # Navegação entre páginas
+        n_ant, n_info, n_prox = st.columns([1, 2, 1])
+        if n_ant.button("◀ Anterior", disabled=pagina == 0, use_container_width=True):
+            st.session_state.estoque_pagina = pagina - 1
+            st.rerun()
+        n_info.markdown(f"<p style='text-align:center'>{pagina + 1} / {total_paginas}</p>", unsafe_allow_html=True)
+        if n_prox.button("Próxima ▶", disabled=pagina + 1 >= total_paginas, use_container_width=True):
+            st.session_state.estoque_pagina = pagina + 1
+            st.rerun()
+    
+    st.caption(f"⏱️ Lista montada em {(time.perf_counter() - inicio_render) * 1000:.0f} ms")
+
+# ==================================================
+# COLUNA DA DIREITA: FORMULÁRIO INTELIGENTE
+# ==================================================
+with col_form:
+    # Verifica se estamos em MODO EDIÇÃO ou MODO NOVO
+    produto_em_edicao = None
+    if st.session_state.prod_edit_id is not None:
+        # Tenta achar o produto pelo ID; o formulário parte dele como estava ao clicar em ✏️
+        if obter_produto(st.session_state.prod_edit_id) is not None:
+            produto_em_edicao = st.session_state.prod_edit_original
+    
+    # --- MODO EDIÇÃO ---
+    if produto_em_edicao:
+        st.subheader(f"✏️ Editando Produto")
+        st.info(f"Alterando: {produto_em_edicao['nome']}")
+        
+        with st.form("form_editar_prod"):
+            e_nome = st.text_input("Nome", value=produto_em_edicao['nome'])
+            c1, c2 = st.columns(2)
+            e_cod = c1.text_input("Código", value=produto_em_edicao.get('codigo',''))
+            e_tipo = c2.selectbox("Tipo", TIPOS_PRODUTO, 
+                                  index=TIPOS_PRODUTO.index(produto_em_edicao.get('tipo', 'Armação')) if produto_em_edicao.get('tipo') in TIPOS_PRODUTO else 0)
+            
+            c3, c4 = st.columns(2)
+            e_qtd = c3.number_input("Quantidade", value=int(produto_em_edicao['quantidade']), step=1)
+            e_preco = c4.number_input("Preço (R$)", value=float(produto_em_edicao['preco']), step=10.0)
+            
+            e_marca = st.text_input("Marca", value=produto_em_edicao.get('marca', ''))
+            
+            col_save, col_cancel = st.columns(2)
+            
+            if col_save.form_submit_button("💾 Salvar Alterações", type="primary"):
+                # Grava só os campos mudados; o que outra sessão mudou nos demais (ex: uma venda) fica
+                campos = {
+                    "nome": e_nome,
+                    "codigo": e_cod,
+                    "tipo": e_tipo,
+                    "quantidade": e_qtd,
+                    "preco": e_preco,
+                    "marca": e_marca
+                }
+                try:
+                    alterar_produto(produto_em_edicao, {c: v for c, v in campos.items() if v != produto_em_edicao.get(c)},
+                                    usuario=usuario_logado)
+                except ConflitoVersao:
+                    st.error("Outra pessoa mudou estes mesmos campos (ex: a quantidade, numa venda) enquanto você editava. "
+                             "Cancele e abra o produto de novo.")
+                    st.stop()
+                st.session_state.prod_edit_id = None # Sai do modo edição
+                st.success("Produto atualizado!")
+                st.rerun()
+            
+            if col_cancel.form_submit_button("❌ Cancelar"):
+                st.session_state.prod_edit_id = None
+                st.rerun()
+
+    # --- MODO NOVO CADASTRO ---
+    else:
+        st.subheader("✨ Cadastrar Novo")
+        with st.form("form_novo_prod"):
+            n_nome = st.text_input("Nome do Produto")
+            c1, c2 = st.columns(2)
+            n_cod = c1.text_input("Código / SKU")
+            n_tipo = c2.selectbox("Tipo", TIPOS_PRODUTO)
+            
+            c3, c4 = st.columns(2)
+            n_qtd = c3.number_input("Estoque Inicial", min_value=1, value=10)
+            n_preco = c4.number_input("Preço de Venda (R$)", min_value=0.0)
+            
+            n_marca = st.text_input("Marca / Fabricante")
+            
+            if st.form_submit_button("Cadastrar Produto"):
+                if n_nome and n_cod:
+                    # O ID é gerado pelo banco (sequência a partir de 1000)
+                    novo_prod = {
+                        "nome": n_nome,
+                        "codigo": n_cod,
+                        "tipo": n_tipo,
+                        "quantidade": n_qtd,
+                        "preco": n_preco,
+                        "marca": n_marca
+                    }
+                    inserir_produto(novo_prod, usuario=usuario_logado)
+                    st.success(f"{n_nome} cadastrado!")
+                    st.rerun()
+                else:
+                    st.warning("Preencha Nome e Código pelo menos.")
+
+# ==================================================
+# IMPORTAÇÃO / EXPORTAÇÃO DO CATÁLOGO (PLANILHA)
+# ==================================================
+st.markdown("---")
+with st.expander("📥 Importar / 📤 Exportar Catálogo (CSV ou Excel)"):
+    col_imp, col_exp = st.columns([1.5, 1])
+    with col_imp:
+        st.markdown("##### 📥 Importar planilha do fornecedor")
+        st.caption("Colunas: " + ", ".join(COLUNAS_CATALOGO) + ". Código já cadastrado atualiza o produto; "
+                   "código novo cadastra. Preço aceita `1.234,56` ou `1234.56`.")
+        arquivo_cat = st.file_uploader("Planilha", type=["csv", "xlsx"], key="upload_catalogo")
+        i1, i2 = st.columns(2)
+        tipo_padrao = i1.selectbox("Tipo para linhas sem tipo", [None] + TIPOS_PRODUTO,
+                                   format_func=lambda t: t or "Rejeitar a linha")
+        simular = i2.checkbox("Só conferir (não grava)", value=True)
+        if arquivo_cat is not None and st.button("🚀 Processar planilha", type="primary"):
+            try:
+                with st.spinner("Lendo e validando..."):
+                    relatorio = importar_produtos(arquivo_cat, arquivo_cat.name, tipo_padrao=tipo_padrao,
+                                                  simular=simular, usuario=usuario_logado)
+            except ValueError as erro:
+                st.error(str(erro))
+            else:
+                verbo = "seriam" if simular else "foram"
+                st.success(f"{relatorio['lidas']} linhas lidas em {relatorio['segundos']} s: "
+                           f"{relatorio['inseridos']} {verbo} cadastrados, {relatorio['atualizados']} {verbo} atualizados, "
+                           f"{relatorio['iguais']} sem mudança.")
+                if relatorio["rejeitadas"]:
+                    st.warning(f"{relatorio['rejeitadas']} linhas rejeitadas"
+                               + (f" (mostrando {len(relatorio['exemplos'])})" if relatorio["rejeitadas"] > len(relatorio["exemplos"]) else ""))
+                    st.dataframe(pd.DataFrame(relatorio["exemplos"]), hide_index=True, use_container_width=True)
+    with col_exp:
+        st.markdown("##### 📤 Exportar catálogo")
+        st.caption("Mesmas colunas da importação: dá para editar no Excel e importar de volta.")
+        formato_cat = st.radio("Formato", ["csv", "xlsx"], horizontal=True, key="formato_catalogo")
+        if st.button("Gerar arquivo", key="exportar_catalogo"):
+            try:
+                caminho_cat, total_cat = exportar_produtos(formato_cat)
+            except ValueError as erro:
+                st.error(str(erro))
+            else:
+                with open(caminho_cat, "rb") as arquivo_exp:
+                    st.download_button(f"📥 Baixar ({total_cat} produtos)", arquivo_exp, os.path.basename(caminho_cat))
+
+# ==================================================
+# MOVIMENTAÇÕES: DIÁRIO, ESTOQUE EM UMA DATA E RESERVAS
+# ==================================================
+st.markdown("---")
+st.subheader("📒 Movimentações do Estoque")
+tab_mov, tab_hist, tab_data, tab_res = st.tabs(["➕ Registrar Movimento", "🗂️ Histórico", "📅 Estoque em uma Data", "🔒 Reservas"])
+
+with tab_mov:
+    busca_mov = st.text_input("Produto", key="mov_busca", placeholder="🔎 Nome, código ou marca")
+    achados_mov, _ = buscar_produtos(busca_mov, limite=30)
+    with st.form("form_movimento"):
+        m_prod = st.selectbox("Produto", [p["id"] for p in achados_mov], format_func=rotulo_produto,
+                              placeholder="Nenhum produto encontrado")
+        c1, c2 = st.columns(2)
+        m_tipo = c1.selectbox("Motivo", ["entrada", "devolucao", "ajuste"], format_func=TIPOS_MOVIMENTO.get)
+        m_qtd = c2.number_input("Quantidade (negativa = saída, só no ajuste)", value=1, step=1)
+        m_ref = st.text_input("Referência (Ex: NF 1234, venda 56)")
+        if st.form_submit_button("💾 Registrar"):
+            if m_prod is None or not m_qtd:
+                st.warning("Escolha o produto e a quantidade.")
+            elif m_tipo != "ajuste" and m_qtd < 0:
+                st.warning("Entrada e devolução somam peças: use quantidade positiva.")
+            else:
+                try:
+                    movimentar_estoque([(m_prod, int(m_qtd))], m_tipo, referencia=m_ref, usuario=usuario_logado)
+                    st.success("Movimento registrado!")
+                    st.rerun()
+                except EstoqueInsuficiente:
+                    st.error("O ajuste deixaria o estoque negativo.")
+                except ProdutoNaoEncontrado:
+                    st.error("Este produto foi excluído por outro usuário.")
+
+with tab_hist:
+    h1, h2 = st.columns(2)
+    periodo = h1.date_input("Período", value=(date.today() - timedelta(days=30), date.today()), format="DD/MM/YYYY")
+    h_tipo = h2.selectbox("Motivo", [""] + list(TIPOS_MOVIMENTO), format_func=lambda t: TIPOS_MOVIMENTO.get(t, "Todos"))
+    if isinstance(periodo, (tuple, list)) and len(periodo) == 2:
+        desde, ate = periodo
+        resumo_mov = resumo_movimentos(desde, ate)
+        if resumo_mov:
+            colunas_resumo = st.columns(len(resumo_mov))
+            for col, (tipo, r) in zip(colunas_resumo, resumo_mov.items()):
+                col.metric(TIPOS_MOVIMENTO.get(tipo, tipo), f"+{r['entrou']} / -{r['saiu']}", f"{r['movimentos']} mov.", delta_color="off")
+        lista_mov = movimentos(desde, ate, tipo=h_tipo or None, limite=500)
+        if lista_mov:
+            df_mov = pd.DataFrame(lista_mov)
+            df_mov["produto"] = df_mov["produto_id"].map(rotulo_produto)
+            df_mov["tipo"] = df_mov["tipo"].map(lambda t: TIPOS_MOVIMENTO.get(t, t))
+            st.dataframe(df_mov[["data", "produto", "tipo", "quantidade", "saldo", "referencia", "usuario"]],
+                         hide_index=True, use_container_width=True)
+            if len(lista_mov) == 500:
+                st.caption("Mostrando os 500 movimentos mais recentes do período.")
+        else:
+            st.info("Nenhum movimento no período.")
+
+with tab_data:
+    dia_consulta = st.date_input("Estoque no fim do dia", value=date.today() - timedelta(days=1), format="DD/MM/YYYY")
+    saldos = estoque_em(dia_consulta)
+    if saldos:
+        st.caption(f"{len(saldos)} produtos com estoque, {sum(saldos.values())} peças.")
+        st.dataframe(
+            pd.DataFrame([{"produto": rotulo_produto(i), "quantidade": q} for i, q in sorted(saldos.items())]),
+            hide_index=True, use_container_width=True,
+        )
+    else:
+        st.info("Nenhum produto com estoque nessa data.")
+
+with tab_res:
+    lista_res = listar_reservas()
+    if not lista_res:
+        st.info("Nenhuma reserva ativa.")
+    for r in lista_res:
+        c_txt, c_btn = st.columns([5, 1])
+        c_txt.markdown(f"**{rotulo_produto(r['produto_id'])}** — {r['quantidade']} peça(s) · {r['referencia']} · "
+                       f"até {formatar_br(r['expira_em'])}")
+        if c_btn.button("Liberar", key=f"lib_res_{r['id']}"):
+            cancelar_reserva(r["id"])
+            st.rerun()
+
@@ -1,209 +1,271 @@
-import streamlit as st
-import pandas as pd
-import json
-import os
-import urllib.parse
-from datetime import datetime
-from modules.dados import carregar_dados
-from modules.ui import configurar_pagina_padrao
-
-# 1. Visual Padrão
-configurar_pagina_padrao()
-
-st.title("📱 Marketing & WhatsApp Inteligente")
-
-# --- CAMINHOS E ARQUIVOS ---
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-FILE_TEMPLATES = os.path.join(BASE_DIR, 'dados', 'templates_zap.json')
-FILE_CONFIG_LOJA = os.path.join(BASE_DIR, 'dados', 'config_loja.json')
-
-# --- FUNÇÕES DE DADOS ---
-def carregar_templates():
-    if not os.path.exists(FILE_TEMPLATES):
-        # Cria alguns modelos padrão se não existir
-        padroes = [
-            {"titulo": "Aniversário", "texto": "Parabéns {nome}! 🎂 A Fábrica de Óculos JR deseja muitas felicidades. Venha nos visitar!"},
-            {"titulo": "Óculos Pronto", "texto": "Olá {nome}, seus óculos ficaram prontos! 😎 Pode vir buscar na loja."},
-            {"titulo": "Cobrança Suave", "texto": "Oi {nome}, tudo bem? Vimos que tem uma pendência aqui na ótica. Vamos resolver?"}
-        ]
-        salvar_templates(padroes)
-        return padroes
-    try:
-        with open(FILE_TEMPLATES, 'r', encoding='utf-8') as f: return json.load(f)
-    except: return []
-
-def salvar_templates(lista):
-    os.makedirs(os.path.dirname(FILE_TEMPLATES), exist_ok=True)
-    with open(FILE_TEMPLATES, 'w', encoding='utf-8') as f: json.dump(lista, f, indent=4, ensure_ascii=False)
-
-def carregar_config_loja():
-    if not os.path.exists(FILE_CONFIG_LOJA): return {"zap_loja": ""}
-    try:
-        with open(FILE_CONFIG_LOJA, 'r', encoding='utf-8') as f: return json.load(f)
-    except: return {"zap_loja": ""}
-
-def salvar_config_loja(dados):
-    with open(FILE_CONFIG_LOJA, 'w', encoding='utf-8') as f: json.dump(dados, f, indent=4)
-
-def limpar_telefone(tel):
-    """Higieniza o telefone para o link do WhatsApp"""
-    if not tel: return None
-    nums = "".join([c for c in tel if c.isdigit()])
-    if len(nums) in [8, 9]: nums = "27" + nums # Assume DDD 27 se não tiver
-    if len(nums) in [10, 11]: nums = "55" + nums # Adiciona DDI Brasil
-    return nums
-
-def gerar_link(telefone, mensagem):
-    tel_limpo = limpar_telefone(telefone)
-    if not tel_limpo: return None
-    msg_encoded = urllib.parse.quote(mensagem)
-    return f"https://wa.me/{tel_limpo}?text={msg_encoded}"
-
-# --- INICIALIZAÇÃO ---
-templates = carregar_templates()
-config_loja = carregar_config_loja()
-clientes = carregar_dados()
-
-# --- INTERFACE ---
-tab_disparo, tab_modelos, tab_config = st.tabs(["🚀 Disparar Mensagens", "📝 Gerenciar Modelos", "⚙️ Configurar Número"])
-
-# ==================================================
-# ABA 1: DISPARO DE MENSAGENS
-# ==================================================
-with tab_disparo:
-    st.subheader("📢 Central de Disparos")
-    
-    col_esq, col_dir = st.columns([1, 2])
-    
-    with col_esq:
-        st.info("1. Escolha o Modelo")
-        opcoes_templates = [t['titulo'] for t in templates]
-        sel_template = st.selectbox("Selecione a Mensagem:", options=opcoes_templates)
-        
-        # Pega o texto do template selecionado
-        texto_base = ""
-        if sel_template:
-            template_obj = next(t for t in templates if t['titulo'] == sel_template)
-            texto_base = template_obj['texto']
-            
-        st.text_area("Prévia da Mensagem (Editável):", value=texto_base, height=150, key="msg_envio_final")
-        st.caption("Dica: Onde tiver `{nome}`, o sistema troca pelo nome do cliente.")
-
-    with col_dir:
-        st.info("2. Selecione os Clientes")
-        filtro_tipo = st.radio("Quem vai receber?", ["Buscar por Nome", "Aniversariantes do Mês", "Todos os Clientes"], horizontal=True)
-        
-        lista_final = []
-        
-        if filtro_tipo == "Buscar por Nome":
-            busca = st.text_input("Digite o nome:")
-            if busca:
-                lista_final = [c for c in clientes if busca.lower() in c['nome'].lower()]
-                
-        elif filtro_tipo == "Aniversariantes do Mês":
-            mes_sel = st.selectbox("Mês:", range(1, 13), index=datetime.now().month - 1)
-            for c in clientes:
-                try:
-                    dt = c.get("nascimento")
-                    if dt:
-                        # Tenta formatos comuns
-                        d_obj = None
-                        if "/" in dt: d_obj = datetime.strptime(dt, "%d/%m/%Y")
-                        elif "-" in dt: d_obj = datetime.strptime(dt, "%Y-%m-%d")
-                        
-                        if d_obj and d_obj.month == mes_sel:
-                            lista_final.append(c)
-                except: pass
-                
-        else: # Todos
-            st.warning("⚠️ Cuidado ao enviar para muitos contatos de uma vez (Risco de Spam).")
-            lista_final = clientes
-
-        # LISTAGEM E BOTÕES
-        st.markdown(f"**Encontrados: {len(lista_final)} clientes**")
-        st.markdown("---")
-        
-        # Paginação simples (top 50)
-        for c in lista_final[:50]:
-            with st.container(border=True):
-                c1, c2 = st.columns([3, 1])
-                zap = c['contato'].get('whatsapp', '')
-                
-                c1.markdown(f"👤 **{c['nome']}**")
-                c1.caption(f"Tel: {zap}")
-                
-                # Processa a mensagem (Troca {nome} pelo nome real)
-                msg_personalizada = st.session_state.msg_envio_final.replace("{nome}", c['nome'].split()[0])
-                
-                link = gerar_link(zap, msg_personalizada)
-                
-                if link:
-                    c2.link_button("📲 Enviar", link, type="secondary")
-                else:
-                    c2.error("Sem Zap")
-
-# ==================================================
-# ABA 2: GERENCIAR MODELOS (CRUD)
-# ==================================================
-with tab_modelos:
-    st.subheader("📝 Criar e Editar Mensagens")
-    
-    # 1. NOVO MODELO
-    with st.expander("➕ Criar Novo Modelo", expanded=False):
-        with st.form("form_novo_template"):
-            novo_titulo = st.text_input("Título do Modelo (Ex: Promoção Dia das Mães)")
-            novo_texto = st.text_area("Texto da Mensagem", placeholder="Olá {nome}, venha conferir...")
-            st.caption("Use `{nome}` para puxar o nome do cliente automaticamente.")
-            
-            if st.form_submit_button("Salvar Modelo"):
-                if novo_titulo and novo_texto:
-                    templates.append({"titulo": novo_titulo, "texto": novo_texto})
-                    salvar_templates(templates)
-                    st.success("Modelo criado!")
-                    st.rerun()
-                else:
-                    st.warning("Preencha título e texto.")
-    
-    st.divider()
-    
-    # 2. LISTA E EDIÇÃO
-    st.markdown("#### Modelos Existentes")
-    if not templates:
-        st.info("Nenhum modelo cadastrado.")
-    else:
-        for i, t in enumerate(templates):
-            with st.container(border=True):
-                col_t1, col_t2 = st.columns([4, 1])
-                col_t1.markdown(f"**{t['titulo']}**")
-                col_t1.text(f"{t['texto'][:60]}...") # Mostra só o começo
-                
-                if col_t2.button("🗑️ Excluir", key=f"del_temp_{i}"):
-                    templates.pop(i)
-                    salvar_templates(templates)
-                    st.rerun()
-                
-                with st.expander(f"✏️ Editar: {t['titulo']}"):
-                    with st.form(f"edit_form_{i}"):
-                        e_titulo = st.text_input("Título", value=t['titulo'])
-                        e_texto = st.text_area("Texto", value=t['texto'])
-                        if st.form_submit_button("Salvar Alterações"):
-                            templates[i] = {"titulo": e_titulo, "texto": e_texto}
-                            salvar_templates(templates)
-                            st.success("Atualizado!")
-                            st.rerun()
-
-# ==================================================
-# ABA 3: CONFIGURAÇÃO DA LOJA
-# ==================================================
-with tab_config:
-    st.subheader("⚙️ Configurações do WhatsApp")
-    st.info("Aqui você cadastra o número da loja. Futuramente, ele poderá ser usado para assinatura automática nas mensagens.")
-    
-    with st.form("config_zap"):
-        zap_input = st.text_input("WhatsApp da Loja (Com DDD)", value=config_loja.get("zap_loja", ""))
-        msg_assinatura = st.text_input("Assinatura Padrão (Opcional)", value=config_loja.get("assinatura", "Att, Equipe Fábrica de Óculos JR"))
-        
-        if st.form_submit_button("💾 Salvar Configurações"):
-            dados_novos = {"zap_loja": zap_input, "assinatura": msg_assinatura}
-            salvar_config_loja(dados_novos)
+import streamlit as st
+import pandas as pd
+import os
+import time
+from datetime import datetime
+from modules.dados import carregar_dados
+from modules.cliente import buscar_clientes
+from modules.campanha import gerar_linhas, exportar_campanha
+from modules.mensagem import (CAMPOS, compilar, renderizar, carregar_templates, salvar_templates,
+                              carregar_config_loja, salvar_config_loja)
+from modules.segmento import publico, carregar_segmentos, salvar_segmentos
+from modules.ui import configurar_pagina_padrao
+
+# 1. Visual Padrão
+configurar_pagina_padrao()
+
+st.title("📱 Marketing & WhatsApp Inteligente")
+
+# --- CONSTANTES ---
+TAMANHOS_PAGINA = [50, 100, 500]
+AJUDA_CAMPOS = ("Campos: " + " ".join(f"`{{{c}}}`" for c in CAMPOS)
+                + ". Texto para campo vazio: `{vencimento_receita|em breve}`. Chaves literais: `{{` e `}}`.")
+
+# --- FUNÇÕES DE APOIO ---
+def descrever_regras(regras):
+    """Texto curto com as regras de um segmento"""
+    partes = []
+    if regras.get("aniversario_mes"):
+        mes = regras["aniversario_mes"]
+        partes.append("aniversário no mês atual" if mes == "atual" else f"aniversário no mês {mes}")
+    if regras.get("receita_vencida"):
+        partes.append("receita vencida")
+    if regras.get("sem_compra_dias"):
+        partes.append(f"sem comprar há {regras['sem_compra_dias']} dias")
+    if regras.get("gasto_minimo"):
+        partes.append(f"gastou ao menos R$ {regras['gasto_minimo']:,.2f}")
+    for campo in ("bairro", "municipio"):
+        if regras.get(campo):
+            partes.append(f"{campo}: {regras[campo]}")
+    return " · ".join(partes) or "todos os clientes"
+
+# --- INICIALIZAÇÃO ---
+templates = carregar_templates()
+config_loja = carregar_config_loja()
+clientes = carregar_dados()
+
+# --- INTERFACE ---
+tab_disparo, tab_segmentos, tab_modelos, tab_config = st.tabs(["🚀 Disparar Mensagens", "🎯 Segmentos", "📝 Gerenciar Modelos", "⚙️ Configurar Número"])
+
+# ==================================================
+# ABA 1: DISPARO DE MENSAGENS
+# ==================================================
+with tab_disparo:
+    st.subheader("📢 Central de Disparos")
+    
+    col_esq, col_dir = st.columns([1, 2])
+    
+    with col_esq:
+        st.info("1. Escolha o Modelo")
+        opcoes_templates = [t['titulo'] for t in templates]
+        sel_template = st.selectbox("Selecione a Mensagem:", options=opcoes_templates)
+        
+        # Pega o texto do template selecionado
+        texto_base = ""
+        if sel_template:
+            template_obj = next(t for t in templates if t['titulo'] == sel_template)
+            texto_base = template_obj['texto']
+            
+        st.text_area("Prévia da Mensagem (Editável):", value=texto_base, height=150, key="msg_envio_final")
+        st.caption(AJUDA_CAMPOS)
+        desconhecidos = compilar(st.session_state.msg_envio_final).desconhecidos
+        if desconhecidos:
+            st.warning("Campos não reconhecidos (ficam no texto como estão): " + ", ".join(f"{{{c}}}" for c in desconhecidos))
+
+    with col_dir:
+        st.info("2. Selecione os Clientes")
+        filtro_tipo = st.radio("Quem vai receber?", ["Buscar por Nome", "Aniversariantes do Mês", "Segmento Salvo", "Todos os Clientes"], horizontal=True)
+        
+        lista_final = []
+        
+        if filtro_tipo == "Buscar por Nome":
+            busca = st.text_input("Digite o nome, CPF ou telefone:")
+            if busca:
+                lista_final, _ = buscar_clientes(busca, limite=None)
+                
+        elif filtro_tipo == "Aniversariantes do Mês":
+            mes_sel = st.selectbox("Mês:", range(1, 13), index=datetime.now().month - 1)
+            # Índice (mês, dia) -> clientes: não percorre a base
+            lista_final = publico({"aniversario_mes": mes_sel})
+        
+        elif filtro_tipo == "Segmento Salvo":
+            segmentos = carregar_segmentos()
+            if not segmentos:
+                st.info("Nenhum segmento salvo. Crie um na aba 'Segmentos'.")
+            else:
+                seg_sel = st.selectbox("Segmento:", range(len(segmentos)), format_func=lambda i: segmentos[i]["nome"])
+                st.caption(descrever_regras(segmentos[seg_sel]["regras"]))
+                lista_final = publico(segmentos[seg_sel]["regras"])
+                
+        else: # Todos
+            st.warning("⚠️ Cuidado ao enviar para muitos contatos de uma vez (Risco de Spam).")
+            lista_final = clientes
+
+        # LISTAGEM PAGINADA (uma tabela só, sem um widget por cliente)
+        total_publico = len(lista_final)
+        c_total, c_tam = st.columns([3, 1])
+        tam_pagina = c_tam.selectbox("Por página", TAMANHOS_PAGINA, index=0)
+        
+        # Volta para a 1ª página quando o público muda
+        assinatura_publico = (filtro_tipo, total_publico, lista_final[0]["id"] if lista_final else None, tam_pagina)
+        if st.session_state.get("disparo_assinatura") != assinatura_publico:
+            st.session_state.disparo_assinatura = assinatura_publico
+            st.session_state.disparo_pagina = 0
+        total_paginas = max(1, -(-total_publico // tam_pagina))
+        pagina = min(st.session_state.disparo_pagina, total_paginas - 1)
+        c_total.markdown(f"**Encontrados: {total_publico} clientes** — página {pagina + 1} de {total_paginas}")
+        st.markdown("---")
+        
+        if lista_final:
+            with st.expander("👁️ Prévia para o primeiro cliente"):
+                st.write(renderizar(st.session_state.msg_envio_final, lista_final[0]))
+            
+            # Mensagens e links só da página exibida
+            fatia = lista_final[pagina * tam_pagina:(pagina + 1) * tam_pagina]
+            linhas_pagina = list(gerar_linhas(fatia, st.session_state.msg_envio_final))
+            st.dataframe(
+                pd.DataFrame(linhas_pagina)[["nome", "telefone", "link"]],
+                hide_index=True, use_container_width=True,
+                column_config={
+                    "nome": "Cliente",
+                    "telefone": "WhatsApp",
+                    "link": st.column_config.LinkColumn("Enviar", display_text="📲 Enviar"),
+                },
+            )
+            
+            n_ant, n_info, n_prox = st.columns([1, 2, 1])
+            if n_ant.button("◀ Anterior", disabled=pagina == 0, use_container_width=True):
+                st.session_state.disparo_pagina = pagina - 1
+                st.rerun()
+            n_info.markdown(f"<p style='text-align:center'>{pagina + 1} / {total_paginas}</p>", unsafe_allow_html=True)
+            if n_prox.button("Próxima ▶", disabled=pagina + 1 >= total_paginas, use_container_width=True):
+                st.session_state.disparo_pagina = pagina + 1
+                st.rerun()
+            
+            # Campanha inteira num arquivo (CSV para planilha, HTML como lista de cliques)
+            st.markdown("##### 📦 Exportar campanha completa")
+            c_csv, c_html = st.columns(2)
+            formato = None
+            if c_csv.button("📄 Gerar CSV", use_container_width=True):
+                formato = "csv"
+            if c_html.button("🌐 Gerar Lista HTML", use_container_width=True):
+                formato = "html"
+            if formato:
+                with st.spinner(f"Gerando {total_publico} mensagens..."):
+                    inicio_export = time.perf_counter()
+                    caminho_camp, total_camp, sem_tel = exportar_campanha(
+                        lista_final, st.session_state.msg_envio_final, formato, titulo=sel_template or "Campanha WhatsApp"
+                    )
+                    segundos = time.perf_counter() - inicio_export
+                st.success(f"{total_camp} mensagens em {segundos:.1f} s ({sem_tel} sem WhatsApp).")
+                with open(caminho_camp, "rb") as arquivo_camp:
+                    st.download_button("📥 Baixar arquivo", arquivo_camp, os.path.basename(caminho_camp),
+                                       "text/csv" if formato == "csv" else "text/html")
+
+# ==================================================
+# ABA 2: SEGMENTOS SALVOS
+# ==================================================
+with tab_segmentos:
+    st.subheader("🎯 Públicos Salvos")
+    st.caption("Cada segmento junta regras (todas precisam valer). A lista é montada pelos índices, sem percorrer a base.")
+    segmentos = carregar_segmentos()
+    
+    with st.expander("➕ Criar Novo Segmento", expanded=False):
+        with st.form("form_novo_segmento"):
+            seg_nome = st.text_input("Nome do Segmento (Ex: Clientes VIP do Centro)")
+            c1, c2 = st.columns(2)
+            seg_mes = c1.selectbox("Aniversário no mês", [None, "atual"] + list(range(1, 13)),
+                                   format_func=lambda m: "Qualquer" if m is None else ("Mês atual" if m == "atual" else str(m)))
+            seg_vencida = c2.checkbox("Só com receita vencida")
+            seg_sem_compra = c1.number_input("Sem comprar há (dias, 0 = ignorar)", min_value=0, step=30)
+            seg_gasto = c2.number_input("Gastou ao menos (R$, 0 = ignorar)", min_value=0.0, step=100.0)
+            seg_bairro = c1.text_input("Bairro")
+            seg_municipio = c2.text_input("Município")
+            if st.form_submit_button("Salvar Segmento"):
+                regras = {"aniversario_mes": seg_mes, "receita_vencida": seg_vencida,
+                          "sem_compra_dias": int(seg_sem_compra), "gasto_minimo": float(seg_gasto),
+                          "bairro": seg_bairro.strip(), "municipio": seg_municipio.strip()}
+                regras = {r: v for r, v in regras.items() if v}
+                if seg_nome and regras:
+                    segmentos.append({"nome": seg_nome, "regras": regras})
+                    salvar_segmentos(segmentos)
+                    st.success("Segmento criado!")
+                    st.rerun()
+                else:
+                    st.warning("Dê um nome e escolha pelo menos uma regra.")
+    
+    for i, seg in enumerate(segmentos):
+        with st.container(border=True):
+            col_s1, col_s2 = st.columns([4, 1])
+            col_s1.markdown(f"**{seg['nome']}** · {len(publico(seg['regras']))} clientes")
+            col_s1.caption(descrever_regras(seg["regras"]))
+            if col_s2.button("🗑️ Excluir", key=f"del_seg_{i}"):
+                segmentos.pop(i)
+                salvar_segmentos(segmentos)
+                st.rerun()
+
+# ==================================================
+# ABA 3: GERENCIAR MODELOS (CRUD)
+# ==================================================
+with tab_modelos:
+    st.subheader("📝 Criar e Editar Mensagens")
+    
+    # 1. NOVO MODELO
+    with st.expander("➕ Criar Novo Modelo", expanded=False):
+        with st.form("form_novo_template"):
+            novo_titulo = st.text_input("Título do Modelo (Ex: Promoção Dia das Mães)")
+            novo_texto = st.text_area("Texto da Mensagem", placeholder="Olá {nome}, venha conferir...")
+            st.caption(AJUDA_CAMPOS)
+            
+            if st.form_submit_button("Salvar Modelo"):
+                if novo_titulo and novo_texto:
+                    templates.append({"titulo": novo_titulo, "texto": novo_texto})
+                    salvar_templates(templates)
+                    st.success("Modelo criado!")
+                    st.rerun()
+                else:
+                    st.warning("Preencha título e texto.")
+    
+    st.divider()
+    
+    # 2. LISTA E EDIÇÃO
+    st.markdown("#### Modelos Existentes")
+    if not templates:
+        st.info("Nenhum modelo cadastrado.")
+    else:
+        for i, t in enumerate(templates):
+            with st.container(border=True):
+                col_t1, col_t2 = st.columns([4, 1])
+                col_t1.markdown(f"**{t['titulo']}**")
+                col_t1.text(f"{t['texto'][:60]}...") # Mostra só o começo
+                
+                if col_t2.button("🗑️ Excluir", key=f"del_temp_{i}"):
+                    templates.pop(i)
+                    salvar_templates(templates)
+                    st.rerun()
+                
+                with st.expander(f"✏️ Editar: {t['titulo']}"):
+                    with st.form(f"edit_form_{i}"):
+                        e_titulo = st.text_input("Título", value=t['titulo'])
+                        e_texto = st.text_area("Texto", value=t['texto'])
+                        if st.form_submit_button("Salvar Alterações"):
+                            templates[i] = {"titulo": e_titulo, "texto": e_texto}
+                            salvar_templates(templates)
+                            st.success("Atualizado!")
+                            st.rerun()
+
+# ==================================================
+# ABA 4: CONFIGURAÇÃO DA LOJA
+# ==================================================
+with tab_config:
+    st.subheader("⚙️ Configurações do WhatsApp")
+    st.info("Aqui você cadastra o número da loja. Nas mensagens, use `{zap_loja}` e `{assinatura}` para incluir o número e a assinatura.")
+    
+    with st.form("config_zap"):
+        zap_input = st.text_input("WhatsApp da Loja (Com DDD)", value=config_loja.get("zap_loja", ""))
+        msg_assinatura = st.text_input("Assinatura Padrão (Opcional)", value=config_loja.get("assinatura", "Att, Equipe Fábrica de Óculos JR"))
+        
+        if st.form_submit_button("💾 Salvar Configurações"):
+            dados_novos = {"zap_loja": zap_input, "assinatura": msg_assinatura}
+            salvar_config_loja(dados_novos)
             st.success("Configurações salvas!")
\ No newline at end of file
@@ -1,176 +1,269 @@
-import streamlit as st
-import json
-import os
-import pandas as pd
-import time
-from modules.ui import configurar_pagina_padrao
-
-# 1. Aplica o visual vermelho
-configurar_pagina_padrao()
-
-st.title("⚙️ Configurações do Sistema")
-
-# --- SEGURANÇA (Apenas Admin) ---
-if st.session_state.get('perfil') != 'admin':
-    st.error("⛔ Acesso Negado: Área restrita para Administradores.")
-    st.stop()
-
-# --- CAMINHOS DOS ARQUIVOS ---
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-FILE_USUARIOS = os.path.join(BASE_DIR, 'dados', 'usuarios.json')
-FILE_CLIENTES = os.path.join(BASE_DIR, 'dados', 'clientes.json')
-FILE_PRODUTOS = os.path.join(BASE_DIR, 'dados', 'produtos.json')
-
-# --- FUNÇÕES DE BANCO DE DADOS ---
-def carregar_usuarios():
-    if not os.path.exists(FILE_USUARIOS): return []
-    try:
-        with open(FILE_USUARIOS, 'r', encoding='utf-8') as f: return json.load(f)
-    except: return []
-
-def salvar_usuarios(lista):
-    with open(FILE_USUARIOS, 'w', encoding='utf-8') as f: 
-        json.dump(lista, f, indent=4, ensure_ascii=False)
-
-# --- INICIALIZAÇÃO DE ESTADO ---
-if 'editando_user' not in st.session_state:
-    st.session_state.editando_user = None
-
-# --- LISTA DE PERFIS DISPONÍVEIS ---
-LISTA_PERFIS = ["vendedor", "tecnico", "medico", "admin"]
-
-# --- INTERFACE ---
-tab_equipe, tab_backup = st.tabs(["👥 Gestão de Equipe", "💾 Backup & Dados"])
-
-# ==================================================
-# ABA 1: GESTÃO DE EQUIPE
-# ==================================================
-with tab_equipe:
-    users = carregar_usuarios()
-    
-    col_esquerda, col_direita = st.columns([1.5, 1])
-    
-    # --- LADO ESQUERDO: LISTA ---
-    with col_esquerda:
-        st.subheader("Usuários Ativos")
-        
-        if users:
-            for i, u in enumerate(users):
-                with st.container(border=True):
-                    c1, c2, c3 = st.columns([3, 1, 1])
-                    with c1:
-                        st.markdown(f"**{u['nome']}**")
-                        st.caption(f"Login: `{u['usuario']}` | Perfil: {u['perfil'].upper()}")
-                    
-                    with c2:
-                        # Botão EDITAR
-                        if st.button("✏️", key=f"btn_edit_{i}", help="Editar Usuário"):
-                            st.session_state.editando_user = i
-                            st.rerun()
-                    
-                    with c3:
-                        # Botão EXCLUIR
-                        if str(u['usuario']).lower() == 'admin':
-                            st.button("⛔", disabled=True, key=f"btn_del_{i}")
-                        else:
-                            if st.button("🗑️", key=f"btn_del_{i}", help="Excluir Usuário"):
-                                users.pop(i)
-                                salvar_usuarios(users)
-                                st.success("Removido!")
-                                time.sleep(0.5)
-                                st.rerun()
-        else:
-            st.info("Nenhum usuário cadastrado.")
-
-    # --- LADO DIREITO: FORMULÁRIO ---
-    with col_direita:
-        # MODO EDIÇÃO
-        if st.session_state.editando_user is not None:
-            idx = st.session_state.editando_user
-            if idx < len(users):
-                usuario_atual = users[idx]
-                st.subheader(f"✏️ Editando: {usuario_atual['nome']}")
-                
-                with st.form("form_editar"):
-                    e_nome = st.text_input("Nome", value=usuario_atual['nome'])
-                    e_login = st.text_input("Login", value=usuario_atual['usuario'], disabled=True)
-                    e_senha = st.text_input("Nova Senha", value=usuario_atual['senha'], type="password")
-                    
-                    idx_perfil = 0
-                    if usuario_atual['perfil'] in LISTA_PERFIS:
-                        idx_perfil = LISTA_PERFIS.index(usuario_atual['perfil'])
-                        
-                    e_perfil = st.selectbox("Perfil", LISTA_PERFIS, index=idx_perfil)
-                    
-                    c_salvar, c_cancelar = st.columns(2)
-                    if c_salvar.form_submit_button("💾 Salvar Alterações"):
-                        users[idx]['nome'] = e_nome
-                        users[idx]['senha'] = e_senha
-                        users[idx]['perfil'] = e_perfil
-                        salvar_usuarios(users)
-                        st.session_state.editando_user = None
-                        st.success("Atualizado!")
-                        st.rerun()
-                    
-                    if c_cancelar.form_submit_button("❌ Cancelar"):
-                        st.session_state.editando_user = None
-                        st.rerun()
-            else:
-                st.session_state.editando_user = None
-                st.rerun()
-
-        # MODO NOVO CADASTRO
-        else:
-            st.subheader("➕ Novo Cadastro")
-            with st.form("form_novo"):
-                n_nome = st.text_input("Nome Completo")
-                n_login = st.text_input("Login de Acesso")
-                n_senha = st.text_input("Senha", type="password")
-                n_perfil = st.selectbox("Perfil", LISTA_PERFIS)
-                
-                if st.form_submit_button("Cadastrar Usuário"):
-                    if any(u['usuario'] == n_login for u in users):
-                        st.error("Login já existe!")
-                    elif n_nome and n_login and n_senha:
-                        users.append({
-                            "usuario": n_login,
-                            "senha": n_senha,
-                            "nome": n_nome,
-                            "perfil": n_perfil
-                        })
-                        salvar_usuarios(users)
-                        st.success("Criado!")
-                        time.sleep(1)
-                        st.rerun()
-                    else:
-                        st.warning("Preencha tudo.")
-
-# ==================================================
-# ABA 2: BACKUP (CORRIGIDA)
-# ==================================================
-with tab_backup:
-    st.subheader("Segurança da Informação")
-    st.markdown("Faça o download periódico dos seus dados.")
-    
-    c1, c2, c3 = st.columns(3)
-    
-    # Bloco Clientes
-    if os.path.exists(FILE_CLIENTES):
-        with open(FILE_CLIENTES, "r", encoding='utf-8') as f:
-            c1.download_button("📥 Baixar Clientes", f, "backup_clientes.json", "application/json")
-    else:
-        c1.warning("Sem clientes.")
-
-    # Bloco Estoque
-    if os.path.exists(FILE_PRODUTOS):
-        with open(FILE_PRODUTOS, "r", encoding='utf-8') as f:
-            c2.download_button("📥 Baixar Estoque", f, "backup_estoque.json", "application/json")
-    else:
-        c2.warning("Sem estoque.")
-            
-    # Bloco Usuários
-    if os.path.exists(FILE_USUARIOS):
-        with open(FILE_USUARIOS, "r", encoding='utf-8') as f:
-            c3.download_button("📥 Baixar Usuários", f, "backup_usuarios.json", "application/json")
-    else:
-        c3.warning("Sem usuários.")
\ No newline at end of file
+import streamlit as st
+import json
+import pandas as pd
+import time
+import os
+from modules.dados import carregar_dados, carregar_produtos, carregar_usuarios, salvar_usuarios, reconstruir_agregados
+from modules.backup import criar_backup, listar_backups, verificar_backup, restaurar_backup, BackupInvalido
+from modules.backup_incremental import (
+    carregar_config as carregar_config_snapshots, salvar_config as salvar_config_snapshots,
+    listar_snapshots, comparar_snapshots, restaurar_snapshot, executar_agora, estado_agendador,
+)
+from modules.ui import configurar_pagina_padrao
+
+# 1. Aplica o visual vermelho
+configurar_pagina_padrao()
+
+st.title("⚙️ Configurações do Sistema")
+
+# --- SEGURANÇA (Apenas Admin) ---
+if st.session_state.get('perfil') != 'admin':
+    st.error("⛔ Acesso Negado: Área restrita para Administradores.")
+    st.stop()
+
+# --- FUNÇÕES DE BACKUP ---
+def exportar_json(lista):
+    """Exporta os registros do banco no mesmo formato dos antigos .json"""
+    return json.dumps(lista, indent=4, ensure_ascii=False)
+
+# --- INICIALIZAÇÃO DE ESTADO ---
+if 'editando_user' not in st.session_state:
+    st.session_state.editando_user = None
+
+# --- LISTA DE PERFIS DISPONÍVEIS ---
+LISTA_PERFIS = ["vendedor", "tecnico", "medico", "admin"]
+
+# Acima disso o backup não é oferecido para download pelo navegador
+LIMITE_DOWNLOAD_MB = 200
+
+# --- INTERFACE ---
+tab_equipe, tab_backup = st.tabs(["👥 Gestão de Equipe", "💾 Backup & Dados"])
+
+# ==================================================
+# ABA 1: GESTÃO DE EQUIPE
+# ==================================================
+with tab_equipe:
+    users = carregar_usuarios()
+    
+    col_esquerda, col_direita = st.columns([1.5, 1])
+    
+    # --- LADO ESQUERDO: LISTA ---
+    with col_esquerda:
+        st.subheader("Usuários Ativos")
+        
+        if users:
+            for i, u in enumerate(users):
+                with st.container(border=True):
+                    c1, c2, c3 = st.columns([3, 1, 1])
+                    with c1:
+                        st.markdown(f"**{u['nome']}**")
+                        st.caption(f"Login: `{u['usuario']}` | Perfil: {u['perfil'].upper()}")
+                    
+                    with c2:
+                        # Botão EDITAR
+                        if st.button("✏️", key=f"btn_edit_{i}", help="Editar Usuário"):
+                            st.session_state.editando_user = i
+                            st.rerun()
+                    
+                    with c3:
+                        # Botão EXCLUIR
+                        if str(u['usuario']).lower() == 'admin':
+                            st.button("⛔", disabled=True, key=f"btn_del_{i}")
+                        else:
+                            if st.button("🗑️", key=f"btn_del_{i}", help="Excluir Usuário"):
+                                users.pop(i)
+                                salvar_usuarios(users)
+                                st.success("Removido!")
+                                time.sleep(0.5)
+                                st.rerun()
+        else:
+            st.info("Nenhum usuário cadastrado.")
+
+    # --- LADO DIREITO: FORMULÁRIO ---
+    with col_direita:
+        # MODO EDIÇÃO
+        if st.session_state.editando_user is not None:
+            idx = st.session_state.editando_user
+            if idx < len(users):
+                usuario_atual = users[idx]
+                st.subheader(f"✏️ Editando: {usuario_atual['nome']}")
+                
+                with st.form("form_editar"):
+                    e_nome = st.text_input("Nome", value=usuario_atual['nome'])
+                    e_login = st.text_input("Login", value=usuario_atual['usuario'], disabled=True)
+                    e_senha = st.text_input("Nova Senha", value=usuario_atual['senha'], type="password")
+                    
+                    idx_perfil = 0
+                    if usuario_atual['perfil'] in LISTA_PERFIS:
+                        idx_perfil = LISTA_PERFIS.index(usuario_atual['perfil'])
+                        
+                    e_perfil = st.selectbox("Perfil", LISTA_PERFIS, index=idx_perfil)
+                    
+                    c_salvar, c_cancelar = st.columns(2)
+                    if c_salvar.form_submit_button("💾 Salvar Alterações"):
+                        users[idx]['nome'] = e_nome
+                        users[idx]['senha'] = e_senha
+                        users[idx]['perfil'] = e_perfil
+                        salvar_usuarios(users)
+                        st.session_state.editando_user = None
+                        st.success("Atualizado!")
+                        st.rerun()
+                    
+                    if c_cancelar.form_submit_button("❌ Cancelar"):
+                        st.session_state.editando_user = None
+                        st.rerun()
+            else:
+                st.session_state.editando_user = None
+                st.rerun()
+
+        # MODO NOVO CADASTRO
+        else:
+            st.subheader("➕ Novo Cadastro")
+            with st.form("form_novo"):
+                n_nome = st.text_input("Nome Completo")
+                n_login = st.text_input("Login de Acesso")
+                n_senha = st.text_input("Senha", type="password")
+                n_perfil = st.selectbox("Perfil", LISTA_PERFIS)
+                
+                if st.form_submit_button("Cadastrar Usuário"):
+                    if any(u['usuario'] == n_login for u in users):
+                        st.error("Login já existe!")
+                    elif n_nome and n_login and n_senha:
+                        users.append({
+                            "usuario": n_login,
+                            "senha": n_senha,
+                            "nome": n_nome,
+                            "perfil": n_perfil
+                        })
+                        salvar_usuarios(users)
+                        st.success("Criado!")
+                        time.sleep(1)
+                        st.rerun()
+                    else:
+                        st.warning("Preencha tudo.")
+
+# ==================================================
+# ABA 2: BACKUP COMPLETO E RESTAURAÇÃO
+# ==================================================
+with tab_backup:
+    st.subheader("Segurança da Informação")
+    st.markdown("Gere periodicamente um backup completo (banco, configurações e fotos) em um único arquivo compactado.")
+    
+    # --- BACKUP COMPLETO ---
+    if st.button("📦 Gerar Backup Completo", type="primary"):
+        with st.spinner("Gerando backup..."):
+            caminho_bkp, manifesto_bkp = criar_backup()
+        st.success(f"Backup criado com {len(manifesto_bkp['arquivos'])} arquivos: `{os.path.basename(caminho_bkp)}`")
+    
+    backups = listar_backups()
+    if not backups:
+        st.info("Nenhum backup gerado ainda.")
+    else:
+        opcoes_bkp = {caminho: f"{os.path.basename(caminho)} ({tamanho / 1024 / 1024:.1f} MB)" for caminho, tamanho, _ in backups}
+        bkp_sel = st.selectbox("Backups salvos na pasta `backups/`:", list(opcoes_bkp), format_func=opcoes_bkp.get)
+        tamanho_sel = next(t for c, t, _ in backups if c == bkp_sel)
+        
+        c1, c2 = st.columns(2)
+        # O Streamlit monta o download inteiro na memória a cada execução da página: o arquivo
+        # só é lido quando pedido, e arquivos muito grandes só pela pasta
+        if tamanho_sel <= LIMITE_DOWNLOAD_MB * 1024 * 1024:
+            if c1.button("📥 Preparar Download"):
+                with open(bkp_sel, "rb") as arquivo_bkp:
+                    c1.download_button("📥 Baixar este Backup", arquivo_bkp, os.path.basename(bkp_sel), "application/octet-stream")
+        else:
+            c1.caption(f"Arquivo acima de {LIMITE_DOWNLOAD_MB} MB: copie direto da pasta `backups/` do servidor.")
+        
+        if c2.button("🔎 Verificar Backup"):
+            try:
+                manifesto_bkp = verificar_backup(bkp_sel)
+                st.success(f"Backup íntegro: {len(manifesto_bkp['arquivos'])} arquivos, criado em {manifesto_bkp['criado_em']}.")
+            except BackupInvalido as erro:
+                st.error(f"Backup com problema: {erro}")
+        
+        with st.expander("♻️ Restaurar Backup"):
+            st.warning("Todos os dados atuais serão substituídos pelos do backup selecionado. "
+                       "A pasta atual é guardada como `dados.antes_...` ao lado da original.")
+            confirmado = st.checkbox("Entendo e quero restaurar este backup")
+            if st.button("♻️ Restaurar Agora", disabled=not confirmado):
+                try:
+                    with st.spinner("Conferindo e restaurando..."):
+                        pasta_antiga = restaurar_backup(bkp_sel)
+                    st.success(f"Dados restaurados! Os anteriores estão em `{os.path.basename(pasta_antiga)}`.")
+                except BackupInvalido as erro:
+                    st.error(f"Restauração cancelada, nada foi alterado: {erro}")
+    
+    # --- EXPORTAÇÃO EM JSON (montada só quando pedida) ---
+    with st.expander("📄 Exportar registros em JSON"):
+        c1, c2, c3 = st.columns(3)
+        for coluna, rotulo, carregar, nome_arquivo in [
+            (c1, "Clientes", carregar_dados, "backup_clientes.json"),
+            (c2, "Estoque", carregar_produtos, "backup_estoque.json"),
+            (c3, "Usuários", carregar_usuarios, "backup_usuarios.json"),
+        ]:
+            if coluna.button(f"Preparar {rotulo}"):
+                registros = carregar()
+                if registros:
+                    coluna.download_button(f"📥 Baixar {rotulo}", exportar_json(registros), nome_arquivo, "application/json")
+                else:
+                    coluna.warning(f"Sem {rotulo.lower()}.")
+
+    # --- SNAPSHOTS AUTOMÁTICOS (incrementais) ---
+    st.divider()
+    st.markdown("#### 🕒 Snapshots Automáticos")
+    st.caption("Cópias incrementais da pasta de dados: só o que mudou desde o último snapshot ocupa espaço novo.")
+    config_snap = carregar_config_snapshots()
+    with st.form("config_snapshots"):
+        c1, c2 = st.columns(2)
+        ativo = c1.checkbox("Tirar snapshots automaticamente", value=config_snap["ativo"])
+        intervalo = c2.number_input("Intervalo (minutos)", min_value=5, step=5, value=int(config_snap["intervalo_minutos"]))
+        c1, c2, c3 = st.columns(3)
+        manter_horas = c1.number_input("Manter por hora (últimas N horas)", min_value=0, value=int(config_snap["manter_horas"]))
+        manter_dias = c2.number_input("Manter por dia (últimos N dias)", min_value=0, value=int(config_snap["manter_dias"]))
+        manter_semanas = c3.number_input("Manter por semana (últimas N semanas)", min_value=0, value=int(config_snap["manter_semanas"]))
+        if st.form_submit_button("💾 Salvar Agenda"):
+            salvar_config_snapshots({"ativo": ativo, "intervalo_minutos": intervalo, "manter_horas": manter_horas,
+                                     "manter_dias": manter_dias, "manter_semanas": manter_semanas})
+            st.success("Agenda salva!")
+    
+    estado_snap = estado_agendador()
+    if estado_snap["erro"]:
+        st.error(f"Último snapshot automático falhou: {estado_snap['erro']}")
+    if st.button("📸 Tirar Snapshot Agora"):
+        with st.spinner("Gravando o que mudou..."):
+            resumo_snap = executar_agora()
+        if estado_agendador()["erro"]:
+            st.error(estado_agendador()["erro"])
+        elif resumo_snap:
+            st.success(f"Snapshot {resumo_snap['id']} criado ({resumo_snap['gravados'] / 1024:.0f} KB novos).")
+        else:
+            st.info("Nada mudou desde o último snapshot.")
+    
+    snapshots = listar_snapshots()
+    if snapshots:
+        st.dataframe(pd.DataFrame([{
+            "Snapshot": s["id"], "Criado em": s["criado_em"], "Arquivos": s["arquivos"],
+            "Dados (MB)": round(s["tamanho"] / 1024 / 1024, 1), "Novos (KB)": round(s["gravados"] / 1024),
+        } for s in snapshots]), hide_index=True, use_container_width=True)
+        with st.expander("♻️ Restaurar Snapshot"):
+            snap_sel = st.selectbox("Snapshot:", [s["id"] for s in snapshots])
+            if snap_sel != snapshots[0]["id"] and st.button("🔎 Ver o que mudou até o mais recente"):
+                diferenca = comparar_snapshots(snap_sel, snapshots[0]["id"])
+                st.write(f"Arquivos novos: {len(diferenca['adicionados'])} · removidos: {len(diferenca['removidos'])} · "
+                         f"alterados: {len(diferenca['alterados'])}")
+                for tabela, (novas, antigas) in diferenca["tabelas"].items():
+                    st.caption(f"{tabela}: {novas} linhas novas/alteradas, {antigas} apagadas/substituídas")
+            confirmado_snap = st.checkbox("Entendo e quero voltar os dados para este snapshot")
+            if st.button("♻️ Restaurar Snapshot", disabled=not confirmado_snap):
+                try:
+                    with st.spinner("Remontando e restaurando..."):
+                        pasta_antiga = restaurar_snapshot(snap_sel)
+                    st.success(f"Dados restaurados! Os anteriores estão em `{os.path.basename(pasta_antiga)}`.")
+                except BackupInvalido as erro:
+                    st.error(f"Restauração cancelada, nada foi alterado: {erro}")
+    
+    st.divider()
+    st.markdown("#### 📊 Indicadores do Dashboard")
+    st.caption("Use se os totais do Painel Gerencial parecerem diferentes do livro de vendas (ex: após importar dados).")
+    if st.button("🔄 Recalcular Indicadores"):
+        reconstruir_agregados()
+        st.success("Indicadores recalculados a partir de todas as vendas!")
\ No newline at end of file
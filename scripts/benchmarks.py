@@ -0,0 +1,152 @@
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# Medições de desempenho citadas nos commits, para conferir de novo na máquina da loja.
+# Tudo roda num banco temporário: a pasta dados/ de verdade não é tocada.
+#
+# Uso: python scripts/benchmarks.py escrita | mensagens | catalogo
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import dados  # noqa: E402
+from modules.datas import agora_iso  # noqa: E402
+
+TAMANHOS = (1000, 10000, 100000)
+
+
+def banco_temporario():
+    """Aponta o banco para uma pasta temporária (apagada no fim) e devolve a pasta"""
+    pasta = tempfile.mkdtemp(prefix="bench_otica_")
+    dados.PASTA_DADOS = pasta
+    dados.ARQUIVO_BANCO = os.path.join(pasta, "otica.db")
+    return pasta
+
+
+def cliente_exemplo(i):
+    """Ficha com o tamanho típico de um cadastro completo"""
+    return {
+        "nome": f"Cliente {i} da Silva", "cpf": f"{random.randrange(10**10, 10**11)}", "rg": "1234567",
+        "nascimento": f"19{random.randint(40, 99)}-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
+        "contato": {"telefone": "2733334444", "whatsapp": f"279{random.randrange(10**7, 10**8)}"},
+        "endereco": {"cep": "29000-000", "logradouro": "Rua das Flores", "numero": str(i), "bairro": "Centro",
+                     "municipio": "Vitória", "estado": "ES", "pais": "Brasil"},
+        "historico_vendas": [], "receitas": [],
+    }
+
+
+def cronometrar(funcao, repeticoes=1):
+    """Menor tempo (s) entre `repeticoes` execuções"""
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        gasto = time.perf_counter() - inicio
+        melhor = gasto if melhor is None else min(melhor, gasto)
+    return melhor
+
+
+# --- ESCRITA (salvar_json_atomico e uma venda no SQLite) ---
+def bench_escrita():
+    pasta = banco_temporario()
+    try:
+        caminho = os.path.join(pasta, "clientes.json")
+        gravados = 0
+        for total in TAMANHOS:
+            clientes = [cliente_exemplo(i) for i in range(total)]
+            sem_bak = cronometrar(lambda: dados.salvar_json_atomico(caminho, clientes, backups=0), 3)
+            com_bak = cronometrar(lambda: dados.salvar_json_atomico(caminho, clientes), 3)
+            mb = os.path.getsize(caminho) / 1e6
+
+            # Clientes no banco até chegar a `total`, e então vendas uma a uma
+            dados.inserir_clientes(clientes[gravados:])
+            gravados = total
+            tempos = []
+            for _ in range(200):
+                inicio = time.perf_counter()
+                dados.inserir_venda(random.randint(1, total), {"data": agora_iso(), "total": 100.0, "itens": []})
+                tempos.append(time.perf_counter() - inicio)
+            print(f"{total:>7} clientes ({mb:5.1f} MB de JSON): salvar_json_atomico {sem_bak * 1000:7.0f} ms, "
+                  f"com .bak {com_bak * 1000:7.0f} ms | inserir_venda mediana {statistics.median(tempos) * 1000:.3f} ms")
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+# --- MENSAGENS (modelos compilados e links da campanha) ---
+def bench_mensagens(total_clientes=20000, mensagens=100000):
+    from modules.campanha import gerar_linhas
+    from modules.mensagem import compilar, renderizar_lote
+
+    pasta = banco_temporario()
+    try:
+        dados.inserir_clientes([cliente_exemplo(i) for i in range(total_clientes)])
+        clientes = dados.carregar_dados()
+        publico = [clientes[i % len(clientes)] for i in range(mensagens)]
+        contexto = {"assinatura": "Att, Equipe", "zap_loja": "27999990000"}
+        modelos = {
+            "4 campos": "Olá {primeiro_nome}! Sua receita vence em {vencimento_receita|breve}. "
+                        "Última compra: {ultima_compra|-}. {assinatura}",
+            "só {nome}": "Olá {nome}, seus óculos ficaram prontos!",
+        }
+        for rotulo, texto in modelos.items():
+            modelo = compilar(texto)
+            gasto = cronometrar(lambda: sum(1 for _ in renderizar_lote(modelo, publico, contexto)), 3)
+            print(f"{rotulo:>10}: {mensagens / gasto:>10,.0f} mensagens/s ({mensagens} em {gasto:.2f} s)")
+        gasto = cronometrar(lambda: sum(1 for _ in gerar_linhas(publico, modelos["4 campos"], contexto)), 3)
+        print(f"{'com link':>10}: {mensagens / gasto:>10,.0f} mensagens/s ({mensagens} em {gasto:.2f} s)")
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+# --- CATÁLOGO (importação/exportação em planilha) ---
+def planilha_catalogo(caminho, linhas, ruins=0.008):
+    """CSV de fornecedor com `linhas` produtos, ~`ruins` delas com algum erro"""
+    tipos = ["Armação", "Lente", "Lente Contato", "Acessório"]
+    with open(caminho, "w", encoding="utf-8") as saida:
+        saida.write("SKU;Descrição;Categoria;Fabricante;Qtd;Preço\n")
+        for i in range(linhas):
+            preco = f"{random.randint(10, 2000)},{random.randint(0, 99):02d}"
+            if random.random() < ruins:
+                preco = "abc"
+            saida.write(f"F{i:06d};Produto {i};{random.choice(tipos)};Marca {i % 40};{random.randint(0, 50)};{preco}\n")
+
+
+def bench_catalogo(linhas=100000):
+    from modules import catalogo
+
+    pasta = banco_temporario()
+    catalogo.PASTA_EXPORTACOES = os.path.join(pasta, "exportacoes")
+    try:
+        caminho = os.path.join(pasta, "catalogo.csv")
+        planilha_catalogo(caminho, linhas)
+        for rotulo, simular in (("simulação", True), ("importação", False), ("reimportação", False)):
+            relatorio = catalogo.importar_produtos(caminho, caminho, simular=simular)
+            print(f"{rotulo:>14}: {relatorio['segundos']:.2f} s (inseridos {relatorio['inseridos']}, "
+                  f"atualizados {relatorio['atualizados']}, iguais {relatorio['iguais']}, "
+                  f"rejeitadas {relatorio['rejeitadas']})")
+        for formato in ("csv", "xlsx"):
+            if formato == "xlsx" and catalogo.openpyxl is None:
+                print("  exportação xlsx: openpyxl não instalado")
+                continue
+            gasto = cronometrar(lambda: catalogo.exportar_produtos(formato))
+            print(f"{'exportação ' + formato:>14}: {gasto:.2f} s")
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+BENCHMARKS = {
+    "escrita": bench_escrita,
+    "mensagens": bench_mensagens,
+    "catalogo": bench_catalogo,
+}
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2 and sys.argv[1] in BENCHMARKS:
+        random.seed(1)
+        BENCHMARKS[sys.argv[1]]()
+    else:
+        print("Uso: python scripts/benchmarks.py " + "|".join(BENCHMARKS))
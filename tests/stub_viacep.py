@@ -0,0 +1,66 @@
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Servidor local que responde como o ViaCEP (GET /ws/<cep>/json/), para testes e
+# para usar a loja sem internet:
+#
+#   python tests/stub_viacep.py 8765
+#   URL_VIACEP=http://127.0.0.1:8765/ws/{cep}/json/ streamlit run Home.py
+#
+# CEP fora de ENDERECOS responde {"erro": true}, como o ViaCEP faz com CEP inexistente.
+
+ENDERECOS = {
+    "29000100": {"logradouro": "Avenida Jerônimo Monteiro", "bairro": "Centro", "localidade": "Vitória", "uf": "ES"},
+    "29100200": {"logradouro": "Rua Henrique Moscoso", "bairro": "Praia da Costa", "localidade": "Vila Velha", "uf": "ES"},
+    "01310100": {"logradouro": "Avenida Paulista", "bairro": "Bela Vista", "localidade": "São Paulo", "uf": "SP"},
+}
+
+
+class _Manipulador(BaseHTTPRequestHandler):
+    def do_GET(self):
+        servidor = self.server
+        with servidor.trava:
+            servidor.consultas += 1
+        if servidor.atraso:
+            time.sleep(servidor.atraso)  # simula o ViaCEP lento (testa o timeout)
+        partes = self.path.strip("/").split("/")
+        if len(partes) != 3 or partes[0] != "ws" or partes[2] != "json":
+            self.send_error(404)
+            return
+        cep = partes[1]
+        endereco = servidor.enderecos.get(cep)
+        resposta = {"cep": f"{cep[:5]}-{cep[5:]}", **endereco} if endereco else {"erro": True}
+        corpo = json.dumps(resposta, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass  # sem log a cada consulta
+
+
+def iniciar(porta=0, enderecos=None):
+    """Sobe o servidor numa thread e devolve-o (url, consultas, atraso ajustável; parar com shutdown())"""
+    servidor = ThreadingHTTPServer(("127.0.0.1", porta), _Manipulador)
+    servidor.daemon_threads = True
+    servidor.enderecos = dict(ENDERECOS if enderecos is None else enderecos)
+    servidor.consultas = 0
+    servidor.atraso = 0.0
+    servidor.trava = threading.Lock()
+    servidor.url = f"http://127.0.0.1:{servidor.server_address[1]}/ws/{{cep}}/json/"
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+if __name__ == "__main__":
+    servidor = iniciar(int(sys.argv[1]) if len(sys.argv) > 1 else 8765)
+    print("ViaCEP local em", servidor.url, "(Ctrl+C para parar)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
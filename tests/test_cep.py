@@ -0,0 +1,96 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+# Consulta de CEP (modules/cep.py) contra o ViaCEP local de tests/stub_viacep.py,
+# num banco temporário.  Rodar: python -m pytest tests  (ou python -m unittest discover tests)
+# Precisa das dependências da loja: pip install -r requirements.txt (requests).
+
+PASTA_TESTES = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(PASTA_TESTES))
+sys.path.insert(0, PASTA_TESTES)
+
+try:
+    from modules import cep, dados  # noqa: E402
+except ImportError as erro:  # sem requests: pula em vez de quebrar a coleta dos testes
+    raise unittest.SkipTest(f"dependência ausente ({erro}); rode pip install -r requirements.txt")
+import stub_viacep  # noqa: E402
+
+
+class TestBuscarCep(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pasta = tempfile.mkdtemp(prefix="teste_cep_")
+        cls.addClassCleanup(shutil.rmtree, cls.pasta, ignore_errors=True)
+        cls.servidor = stub_viacep.iniciar()
+        cls.addClassCleanup(cls.servidor.shutdown)
+        cls.provedores = list(cep.PROVEDORES)
+        cls.addClassCleanup(cep.usar_provedores, cls.provedores)
+        cls.addClassCleanup(cep.limpar_memoria)
+        # Cleanups rodam de trás para frente: o banco volta ao de antes e só então é reaberto
+        cls.addClassCleanup(dados.reabrir_banco)
+        for alvo, nome, valor in [
+            (dados, "PASTA_DADOS", cls.pasta),
+            (dados, "ARQUIVO_BANCO", os.path.join(cls.pasta, "otica.db")),
+            (cep, "URL_VIACEP", cls.servidor.url),
+            (cep, "TIMEOUT", (0.5, 0.3)),
+        ]:
+            troca = mock.patch.object(alvo, nome, valor)
+            troca.start()
+            cls.addClassCleanup(troca.stop)
+        dados.reabrir_banco()
+
+    def setUp(self):
+        cep.limpar_memoria()
+        cep.usar_provedores(self.provedores)
+        self.servidor.atraso = 0.0
+        self.servidor.consultas = 0
+
+    def test_consulta_e_cache(self):
+        endereco = cep.buscar_cep("29000-100")
+        self.assertEqual(endereco["localidade"], "Vitória")
+        self.assertEqual(endereco["cep"], "29000-100")
+        self.assertEqual(self.servidor.consultas, 1)
+        # Repetição: memória; depois de limpar a memória: banco. Nenhuma nova ida à rede.
+        self.assertEqual(cep.buscar_cep("29000100"), endereco)
+        cep.limpar_memoria()
+        self.assertEqual(cep.buscar_cep("29000100"), endereco)
+        self.assertEqual(self.servidor.consultas, 1)
+
+    def test_cep_inexistente_fica_guardado(self):
+        self.assertIsNone(cep.buscar_cep("99999-999"))
+        self.assertIsNone(cep.buscar_cep("99999-999"))
+        self.assertEqual(self.servidor.consultas, 1)
+
+    def test_cep_invalido_nem_consulta(self):
+        self.assertIsNone(cep.buscar_cep("123"))
+        self.assertEqual(self.servidor.consultas, 0)
+
+    def test_timeout_devolve_endereco_vencido(self):
+        endereco = cep.buscar_cep("29100-200")
+        with dados.transacao() as db:
+            db.execute("UPDATE ceps SET atualizado_em=0 WHERE cep='29100200'")  # venceu
+        cep.limpar_memoria()
+        self.servidor.atraso = 2.0
+        inicio = time.perf_counter()
+        self.assertEqual(cep.buscar_cep("29100-200"), endereco)
+        self.assertLess(time.perf_counter() - inicio, 1.5)  # não esperou o servidor lento
+
+    def test_timeout_passa_para_o_proximo_provedor(self):
+        reserva = cep._endereco("01310100", "Av. Paulista (reserva)", "Bela Vista", "São Paulo", "SP")
+        cep.usar_provedores([("viacep", cep.provedor_viacep), ("reserva", lambda c, sessao, timeout: reserva)])
+        self.servidor.atraso = 2.0
+        self.assertEqual(cep.buscar_cep("01310-100"), reserva)
+        self.assertEqual(cep._ler_banco("01310100")[1], "reserva")
+
+    def test_sem_internet_so_usa_o_cache(self):
+        self.assertIsNone(cep.buscar_cep("29000-200", usar_internet=False))
+        self.assertEqual(self.servidor.consultas, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()